@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Indexing throughput benchmark
+
+Generates a synthetic repository, runs the production indexing path
+(load_documents_robustly → split → token count → embed → bulk write into a
+temporary Chroma collection) and prints a JSON report with wall time, peak
+RSS and files/s + chunks/s per stage.
+
+Usage:
+    python benchmark_indexing.py --files 2000 --embedder fake
+    python benchmark_indexing.py --files 500 --mix py=3,ts=2,md=1 --embedder both --output report.json
+
+The fake embedder is deterministic and nearly free, so it measures the
+pipeline itself; the real embedder uses the configured local model
+(ST_EMBEDDING_MODEL) and measures what an indexing node will actually do.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import psutil
+from langchain_core.embeddings import Embeddings
+
+# main reads its configuration at import time; the benchmark never clones anything
+os.environ.setdefault("REPO_URL", "https://example.com/benchmark/synthetic.git")
+os.environ.setdefault("EMBEDDING_PROVIDER", "sentence-transformers")
+os.environ.setdefault("EMBEDDING_CACHE", "false")
+
+DEFAULT_MIX = {"py": 4, "ts": 3, "js": 2, "md": 2, "java": 1, "json": 1, "yaml": 1}
+
+_WORDS = (
+    "index repository chunk vector embedding query server client request response cache "
+    "token model batch worker queue file path branch commit config document search"
+).split()
+
+
+def _identifier(rng: random.Random) -> str:
+    return "_".join(rng.sample(_WORDS, 2))
+
+
+def _camel(rng: random.Random) -> str:
+    return "".join(word.capitalize() for word in rng.sample(_WORDS, 2))
+
+
+def _python_file(rng: random.Random, units: int) -> str:
+    parts = ["import os\nimport json\n"]
+    for _ in range(units):
+        name = _identifier(rng)
+        parts.append(
+            f"\n\ndef {name}_{rng.randint(0, 9999)}(path, options=None):\n"
+            f'    """Handles {" ".join(rng.sample(_WORDS, 5))}"""\n'
+            f"    result = {{}}\n"
+            f"    for item in os.listdir(path):\n"
+            f"        if item.endswith('.{rng.choice(_WORDS)}'):\n"
+            f"            result[item] = {rng.randint(1, 500)}\n"
+            f"    return json.dumps(result)\n"
+        )
+    return "".join(parts)
+
+
+def _typescript_file(rng: random.Random, units: int) -> str:
+    parts = ["import { readFile } from 'fs';\n"]
+    for _ in range(units):
+        parts.append(
+            f"\nexport async function {_camel(rng)}{rng.randint(0, 9999)}(id: string): Promise<number> {{\n"
+            f"  // {' '.join(rng.sample(_WORDS, 6))}\n"
+            f"  const data = await readFile(`/data/${{id}}.{rng.choice(_WORDS)}`, 'utf-8');\n"
+            f"  return data.length * {rng.randint(1, 99)};\n"
+            f"}}\n"
+        )
+    return "".join(parts)
+
+
+def _javascript_file(rng: random.Random, units: int) -> str:
+    parts = ["'use strict';\n"]
+    for _ in range(units):
+        parts.append(
+            f"\nfunction {_camel(rng)}{rng.randint(0, 9999)}(items) {{\n"
+            f"  return items.filter((x) => x.{rng.choice(_WORDS)} > {rng.randint(0, 50)})"
+            f".map((x) => x.{rng.choice(_WORDS)});\n"
+            f"}}\n"
+        )
+    return "".join(parts)
+
+
+def _java_file(rng: random.Random, units: int) -> str:
+    name = _camel(rng)
+    parts = [f"package com.example.{rng.choice(_WORDS)};\n\npublic class {name} {{\n"]
+    for _ in range(units):
+        parts.append(
+            f"    public int {_identifier(rng)}{rng.randint(0, 9999)}(int value) {{\n"
+            f"        // {' '.join(rng.sample(_WORDS, 6))}\n"
+            f"        return value * {rng.randint(2, 99)};\n"
+            f"    }}\n\n"
+        )
+    parts.append("}\n")
+    return "".join(parts)
+
+
+def _markdown_file(rng: random.Random, units: int) -> str:
+    parts = [f"# {' '.join(rng.sample(_WORDS, 3)).title()}\n"]
+    for _ in range(units):
+        sentences = [" ".join(rng.sample(_WORDS, 8)).capitalize() + "." for _ in range(4)]
+        parts.append(f"\n## {rng.choice(_WORDS).title()}\n\n{' '.join(sentences)}\n")
+    return "".join(parts)
+
+
+def _json_file(rng: random.Random, units: int) -> str:
+    return json.dumps(
+        {_identifier(rng): {"value": rng.randint(0, 1000), "tags": rng.sample(_WORDS, 3)} for _ in range(units)},
+        indent=2
+    )
+
+
+def _yaml_file(rng: random.Random, units: int) -> str:
+    return "".join(
+        f"{_identifier(rng)}:\n  enabled: {str(rng.random() > 0.5).lower()}\n  limit: {rng.randint(1, 100)}\n"
+        for _ in range(units)
+    )
+
+
+_GENERATORS = {
+    "py": _python_file,
+    "ts": _typescript_file,
+    "js": _javascript_file,
+    "java": _java_file,
+    "md": _markdown_file,
+    "json": _json_file,
+    "yaml": _yaml_file,
+}
+
+
+def generate_synthetic_repo(
+    path: str,
+    num_files: int,
+    language_mix: Optional[Dict[str, float]] = None,
+    avg_units: int = 12,
+    seed: int = 42
+) -> Dict[str, int]:
+    """
+    Writes a deterministic synthetic source tree
+
+    Args:
+        path: Target directory (created if missing)
+        num_files: Number of files to generate
+        language_mix: Relative weight per extension (keys of _GENERATORS)
+        avg_units: Average functions/sections per file; sizes vary around it
+        seed: Random seed (same seed → identical tree)
+
+    Returns:
+        Number of files written per extension
+    """
+    language_mix = language_mix or DEFAULT_MIX
+    unknown = set(language_mix) - set(_GENERATORS)
+    if unknown:
+        raise ValueError(f"Unsupported languages in mix: {sorted(unknown)}")
+
+    rng = random.Random(seed)
+    extensions = list(language_mix)
+    weights = [language_mix[ext] for ext in extensions]
+    counts = defaultdict(int)
+    for i in range(num_files):
+        ext = rng.choices(extensions, weights)[0]
+        # Mostly small files with a long tail of large ones, like real repositories
+        units = max(1, int(rng.lognormvariate(0, 0.8) * avg_units))
+        directory = os.path.join(path, f"pkg{i % 17}", f"mod{i % 5}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file_{i}.{ext}"), "w", encoding="utf-8") as f:
+            f.write(_GENERATORS[ext](rng, units))
+        counts[ext] += 1
+    return dict(counts)
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hash-based vectors, so the benchmark measures the pipeline, not a model"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.model_name = f"fake-{dimension}"
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128.0 for i in range(self.dimension)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class PeakRSSSampler:
+    """Samples resident memory of this process and its children (embedding workers)"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> int:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_bytes = self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._sample())
+
+
+class TimedIterator:
+    """Wraps the document generator to measure time spent loading (inside next())"""
+
+    def __init__(self, iterable: Iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def close(self):
+        if hasattr(self._iterator, "close"):
+            self._iterator.close()
+
+
+def _rate(count: int, seconds: float) -> Optional[float]:
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def run_benchmark(repo_path: str, embeddings: Embeddings, label: str, verbose: bool = False) -> dict:
+    """
+    Indexes repo_path into a temporary Chroma collection through main.index_documents
+
+    Returns:
+        Report for this run (counts, wall time, peak RSS, per-stage throughput)
+    """
+    import main
+    from langchain_chroma import Chroma
+    from document_loader import load_documents_robustly
+
+    db_dir = tempfile.mkdtemp(prefix="bench-chroma-")
+    processed, discarded = defaultdict(int), defaultdict(int)
+    progress = {}
+    try:
+        vectorstore = Chroma(persist_directory=db_dir, embedding_function=embeddings)
+        output = io.StringIO()
+        with PeakRSSSampler() as rss:
+            started = time.perf_counter()
+            documents = TimedIterator(load_documents_robustly(repo_path, processed, discarded, progress=progress))
+            # The production path logs every batch; keep the JSON report readable
+            with contextlib.redirect_stdout(sys.stdout if verbose else output):
+                stats = main.index_documents(vectorstore, documents)
+            wall = time.perf_counter() - started
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    files = progress.get("files_total", 0)
+    chunks = stats["chunks"]
+    stage_seconds = {
+        "load": documents.seconds,
+        "split": stats["split_seconds"],
+        "token_count": stats["count_seconds"],
+        "embed": stats["embed_seconds"],
+        "write": stats["write_seconds"],
+    }
+    return {
+        "embedder": label,
+        "files": files,
+        "documents": stats["documents"],
+        "chunks": chunks,
+        "chunks_stored": stats["chunks_stored"],
+        "duplicate_chunks": stats.get("duplicate_chunks", 0),
+        "wall_seconds": round(wall, 3),
+        "first_write_seconds": round(stats["first_write_seconds"], 3) if stats["first_write_seconds"] else None,
+        "peak_rss_mb": round(rss.peak_bytes / (1024 * 1024), 1),
+        "files_per_second": _rate(files, wall),
+        "chunks_per_second": _rate(chunks, wall),
+        # Busy time per stage; embed is summed over its workers
+        "stages": {
+            stage: {
+                "seconds": round(seconds, 3),
+                "files_per_second": _rate(files, seconds),
+                "chunks_per_second": _rate(chunks, seconds),
+            }
+            for stage, seconds in stage_seconds.items()
+        },
+    }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parses 'py=3,ts=2,md=1' into a weight dict"""
+    mix = {}
+    for part in value.split(","):
+        ext, _, weight = part.partition("=")
+        mix[ext.strip().lstrip(".")] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark repository indexing throughput")
+    parser.add_argument("--files", type=int, default=1000, help="Number of synthetic files")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Language weights, e.g. py=3,ts=2,md=1")
+    parser.add_argument("--avg-units", type=int, default=12, help="Average functions/sections per file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embedder", choices=["fake", "real", "both"], default="fake")
+    parser.add_argument("--repo", help="Benchmark an existing directory instead of generating one")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the indexing log")
+    args = parser.parse_args(argv)
+
+    repo_dir = args.repo or tempfile.mkdtemp(prefix="bench-repo-")
+    report = {
+        "config": {
+            "files": args.files if not args.repo else None,
+            "language_mix": args.mix if not args.repo else None,
+            "avg_units": args.avg_units,
+            "seed": args.seed,
+            "repo": args.repo,
+            "cpu_count": os.cpu_count(),
+            "memory_gb": round(psutil.virtual_memory().total / (1024 ** 3), 1),
+        },
+        "runs": [],
+    }
+    try:
+        if not args.repo:
+            started = time.perf_counter()
+            report["config"]["generated"] = generate_synthetic_repo(
+                repo_dir, args.files, args.mix, args.avg_units, args.seed
+            )
+            report["config"]["generation_seconds"] = round(time.perf_counter() - started, 3)
+
+        if args.embedder in ("fake", "both"):
+            report["runs"].append(run_benchmark(repo_dir, FakeEmbeddings(), "fake", args.verbose))
+        if args.embedder in ("real", "both"):
+            from embedding_config import EmbeddingProvider
+            embeddings = EmbeddingProvider.get_embeddings(os.environ["EMBEDDING_PROVIDER"])
+            try:
+                report["runs"].append(run_benchmark(repo_dir, embeddings, "real", args.verbose))
+            finally:
+                if hasattr(embeddings, "close"):
+                    embeddings.close()
+    finally:
+        if not args.repo:
+            shutil.rmtree(repo_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Duplicate chunk elimination before embedding
+
+Repositories carry many identical chunks (vendored libraries, copied
+configs, generated clients, license headers). Exact duplicates are found by
+hashing the chunk text; near-duplicates optionally by MinHash signatures
+bucketed with LSH. Only the first occurrence is embedded and stored; the
+paths of every copy are collected so they can be recorded in its metadata.
+"""
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"\w+")
+# Mersenne prime for the universal hash family; 32-bit inputs keep a*x+b within uint64
+_PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """MinHash signatures over word shingles, indexed by LSH bands"""
+
+    def __init__(self, threshold: float, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at which two chunks are duplicates
+            num_perm: Number of hash permutations per signature
+            shingle_size: Words per shingle
+            seed: Seed for the permutation coefficients
+        """
+        import numpy as np
+
+        self._np = np
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        # Pick the band layout whose S-curve threshold (1/b)^(1/r) is closest to the target
+        self.bands, self.rows = min(
+            ((b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0),
+            key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold)
+        )
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+
+    def signature(self, text: str):
+        np = self._np
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        k = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def query_and_insert(self, key, text: str):
+        """Returns the key of a stored near-duplicate, or stores text under key and returns None"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        band_keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        for buckets, band_key in zip(self._buckets, band_keys):
+            for candidate in buckets.get(band_key, ()):
+                if (self._signatures[candidate] == signature).mean() >= self.threshold:
+                    return candidate
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(key)
+        self._signatures[key] = signature
+        return None
+
+
+class ChunkDeduplicator:
+    """Remembers the first occurrence of every chunk seen during one indexing run"""
+
+    def __init__(self, near_threshold: float = 0.0):
+        """
+        Args:
+            near_threshold: Jaccard similarity for near-duplicate detection
+                (0 disables MinHash/LSH and only exact duplicates are removed)
+        """
+        self._canonical: Dict[bytes, Tuple[str, str]] = {}
+        # Stored chunk id -> (source, own chunk id, near-duplicate) of every copy, first copy first
+        self._copies: Dict[str, List[Tuple[str, str, bool]]] = {}
+        self._near = MinHashLSH(near_threshold) if near_threshold > 0 else None
+        self._lock = threading.Lock()
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def add(self, chunk, chunk_id: str) -> Optional[str]:
+        """
+        Registers a chunk
+
+        Returns:
+            The id of the chunk it duplicates, or None if it is new and must be stored
+        """
+        source = chunk.metadata.get("source", "")
+        text = chunk.page_content.strip()
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        with self._lock:
+            canonical = self._canonical.get(digest)
+            near = False
+            if canonical is not None:
+                self.exact_duplicates += 1
+            elif self._near is not None:
+                canonical = self._near.query_and_insert((chunk_id, source), text)
+                if canonical is not None:
+                    self.near_duplicates += 1
+                    near = True
+            if canonical is None:
+                self._canonical[digest] = (chunk_id, source)
+                return None
+
+            canonical_id, canonical_source = canonical
+            copies = self._copies.setdefault(canonical_id, [(canonical_source, canonical_id, False)])
+            if all(copy_source != source for copy_source, _, _ in copies):
+                copies.append((source, chunk_id, near))
+            return canonical_id
+
+    def duplicate_sources(self) -> Dict[str, List[str]]:
+        """Maps each stored chunk id that had duplicates to the paths of every copy"""
+        with self._lock:
+            return {chunk_id: [source for source, _, _ in copies] for chunk_id, copies in self._copies.items()}
+
+    def duplicate_copies(self) -> Dict[str, List[Tuple[str, str, bool]]]:
+        """
+        Maps each stored chunk id that had duplicates to (source, chunk id, near) per copy
+
+        The chunk id of a copy is the one it would have been stored under,
+        so the chunk can move to it when the first copy's file goes away.
+        """
+        with self._lock:
+            return {chunk_id: list(copies) for chunk_id, copies in self._copies.items()}
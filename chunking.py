@@ -0,0 +1,369 @@
+"""
+Language-aware chunking
+
+A single character splitter cuts functions, classes and SQL statements in
+half. Here the separators are chosen from the file extension (class/def
+boundaries for Python, resource blocks for Terraform, headings for
+Markdown, ...), each language can have its own chunk size, and anything
+without a known language falls back to the generic splitter.
+
+Python is chunked from its syntax tree instead: one chunk per top-level
+function or class (oversized classes per method), tagged with the symbol
+name, kind and line range, and without overlap between chunks.
+
+Sizes are in characters, but with a token budget a chunk is also closed
+once it holds as many tokens as the embedding model reads, so dense code
+is not silently truncated at embedding time.
+"""
+import ast
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+DEFAULT_CHUNK_SIZE = 1500
+DEFAULT_CHUNK_OVERLAP = 200
+
+LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".ts": "ts", ".tsx": "ts",
+    ".js": "js", ".jsx": "js",
+    ".md": "markdown",
+    ".java": "java",
+    ".go": "go",
+    ".rs": "rust",
+    ".cpp": "cpp",
+    ".c": "c", ".h": "c",
+    ".cs": "csharp",
+    ".php": "php",
+    ".rb": "ruby",
+    ".swift": "swift",
+    ".html": "html",
+    ".sql": "sql",
+    ".tf": "terraform", ".tfvars": "terraform", ".hcl": "terraform",
+}
+
+# Notebook kernels report full names ("python", "javascript", ...)
+_LANGUAGE_ALIASES = {
+    "javascript": "js",
+    "typescript": "ts",
+    "c++": "cpp",
+    "c#": "csharp",
+}
+
+# Languages langchain has no separators for (regular expressions, case-insensitive keywords)
+_CUSTOM_SEPARATORS = {
+    "sql": [
+        r"\n(?i:create|alter|drop)\s",
+        r"\n(?i:insert|update|delete|with|select)\s",
+        r";\n",
+        r"\n\n",
+        r"\n",
+        r" ",
+        r"",
+    ],
+    "terraform": [
+        r"\n(?:resource|data|module|variable|output|locals|provider|terraform)\b",
+        r"\n\n",
+        r"\n",
+        r" ",
+        r"",
+    ],
+}
+
+
+def parse_chunk_sizes(spec: str) -> Dict[str, Tuple[int, Optional[int]]]:
+    """
+    Parses "python=2000:250,markdown=1000" into {language: (size, overlap)}
+
+    The overlap is optional (None). "default" sets the generic splitter.
+    """
+    sizes = {}
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        language, sep, value = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid chunk size entry '{entry}' (expected language=size[:overlap])")
+        size, _, overlap = value.partition(":")
+        language = language.strip().lower()
+        sizes[_LANGUAGE_ALIASES.get(language, language)] = (
+            int(size), int(overlap) if overlap.strip() else None
+        )
+    return sizes
+
+
+def detect_language(metadata: dict) -> Optional[str]:
+    """Language of a loaded document, from its source extension (notebook cells from their type)"""
+    if metadata.get("type") == "notebook":
+        if metadata.get("cell_type") == "markdown":
+            return "markdown"
+        language = str(metadata.get("language", "")).lower()
+        return _LANGUAGE_ALIASES.get(language, language) or None
+    ext = os.path.splitext(metadata.get("source", ""))[1].lower()
+    return LANGUAGE_BY_EXTENSION.get(ext)
+
+
+class BudgetedLength:
+    """
+    Length function bounding chunks by characters and by model tokens
+
+    Tokens are scaled to the character size, so a text fits chunk_size
+    exactly when it has at most chunk_size characters and at most
+    token_budget.max_tokens tokens.
+    """
+
+    def __init__(self, chunk_size: int, token_budget):
+        self.chunk_size = chunk_size
+        self.token_budget = token_budget
+
+    def __call__(self, text: str) -> int:
+        if not text:
+            return 0
+        return self.from_counts(len(text), self.token_budget.count(text))
+
+    def from_counts(self, chars: int, tokens: int) -> int:
+        """Length of a text with this many characters and tokens"""
+        return max(chars, -(-tokens * self.chunk_size // self.token_budget.max_tokens))
+
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _first_line(node: ast.stmt) -> int:
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+class _Segmenter:
+    """
+    Walks one parsed module; segments holds (text, metadata) in file order
+
+    Each line is measured once and line ranges are sized from running
+    totals, so growing a range does not re-tokenize it. length_function is
+    a BudgetedLength or adds up over lines (len).
+    """
+
+    def __init__(self, source: str, chunk_size: int, length_function: Callable[[str], int]):
+        self.lines = source.splitlines(keepends=True)
+        self.chunk_size = chunk_size
+        self.length_function = length_function
+        self.segments = []
+        budgeted = isinstance(length_function, BudgetedLength)
+        # _units[i] / _tokens[i]: totals over the first i lines
+        self._units, self._tokens = [0], [0] if budgeted else None
+        for line in self.lines:
+            self._units.append(self._units[-1] + (len(line) if budgeted else length_function(line)))
+            if budgeted:
+                self._tokens.append(self._tokens[-1] + length_function.token_budget.count(line))
+
+    def text(self, start: int, end: int) -> str:
+        return "".join(self.lines[start - 1:end])
+
+    def length(self, start: int, end: int) -> int:
+        units = self._units[end] - self._units[start - 1]
+        if self._tokens is None:
+            return units
+        return self.length_function.from_counts(units, self._tokens[end] - self._tokens[start - 1])
+
+    def fits(self, start: int, end: int) -> bool:
+        return self.length(start, end) <= self.chunk_size
+
+    def body(self, body: List[ast.stmt], first: int, last: int, scope: str, kind: str, group: List[int]) -> None:
+        # group = [start, end] of consecutive plain statements not yet emitted
+        for i, node in enumerate(body):
+            start = first if i == 0 else body[i - 1].end_lineno + 1
+            end = node.end_lineno if i < len(body) - 1 else last
+            if start > end:
+                # Several statements on one line (a; b) already covered
+                continue
+            if isinstance(node, _DEFINITIONS):
+                self.flush(group, scope, kind)
+                self.definition(node, start, end, scope)
+            elif not group:
+                group[:] = [start, end]
+            elif self.fits(group[0], end):
+                group[1] = end
+            else:
+                self.flush(group, scope, kind)
+                group[:] = [start, end]
+        self.flush(group, scope, kind)
+
+    def definition(self, node: ast.stmt, start: int, end: int, scope: str) -> None:
+        symbol = f"{scope}.{node.name}" if scope else node.name
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        else:
+            kind = "method" if scope else "function"
+        if kind != "class" or self.fits(start, end):
+            self.emit(start, end, symbol, kind)
+            return
+        # Oversized class: header, docstring and attributes together, each method on its own
+        body_start = _first_line(node.body[0])
+        if body_start > start:
+            self.body(node.body, body_start, end, symbol, "class", [start, body_start - 1])
+        else:
+            self.body(node.body, start, end, symbol, "class", [])
+
+    def flush(self, group: List[int], scope: str, kind: str) -> None:
+        if group:
+            self.emit(group[0], group[1], scope, kind)
+            group.clear()
+
+    def emit(self, start: int, end: int, symbol: str, kind: str) -> None:
+        # Trim blank lines so the line range matches the chunk text
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+        for piece_start, piece_end in self.pack_lines(start, end):
+            self.segments.append((
+                self.text(piece_start, piece_end).rstrip("\n"),
+                {"symbol": symbol, "kind": kind, "start_line": piece_start, "end_line": piece_end}
+            ))
+
+    def pack_lines(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Consecutive line ranges of at most chunk_size each (a longer single line stays alone)"""
+        if self.fits(start, end):
+            return [(start, end)]
+        pieces, piece_start = [], start
+        for line in range(start + 1, end + 1):
+            if not self.fits(piece_start, line):
+                pieces.append((piece_start, line - 1))
+                piece_start = line
+        pieces.append((piece_start, end))
+        return pieces
+
+
+class PythonAstSplitter:
+    """Splits Python source at function, class and method boundaries"""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        fallback: RecursiveCharacterTextSplitter,
+        length_function: Callable[[str], int] = len
+    ):
+        """
+        Args:
+            chunk_size: Largest chunk, in length_function units; bigger
+                definitions are split per method or, failing that, by lines
+            fallback: Splitter used for sources that do not parse and for
+                single lines longer than chunk_size
+            length_function: Measures chunk text
+        """
+        self.chunk_size = chunk_size
+        self.fallback = fallback
+        self.length_function = length_function
+
+    def segments(self, source: str) -> List[Tuple[str, dict]]:
+        """
+        (text, metadata) per chunk of source; raises SyntaxError if it does not parse
+
+        Comments and blank lines between statements belong to the statement
+        that follows them, so the segments cover the whole file.
+        """
+        tree = ast.parse(source)
+        segmenter = _Segmenter(source, self.chunk_size, self.length_function)
+        segmenter.body(tree.body, 1, len(segmenter.lines), "", "module", [])
+        return segmenter.segments
+
+    def split_documents(self, documents: Iterable) -> List:
+        chunks = []
+        for doc in documents:
+            try:
+                segments = self.segments(doc.page_content)
+            except (SyntaxError, ValueError, RecursionError):
+                # Python 2 sources, notebook magics, templates named *.py
+                chunks.extend(self.fallback.split_documents([doc]))
+                continue
+            if not segments and doc.page_content.strip():
+                # Only comments (license headers, commented-out config): no statements to chunk
+                chunks.extend(self.fallback.split_documents([doc]))
+                continue
+            for text, metadata in segments:
+                chunk = Document(page_content=text, metadata={**doc.metadata, **metadata})
+                if self.length_function(text) > self.chunk_size:
+                    chunks.extend(self.fallback.split_documents([chunk]))
+                else:
+                    chunks.append(chunk)
+        return chunks
+
+
+class LanguageAwareSplitter:
+    """Drop-in replacement for a text splitter that picks separators per document language"""
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        sizes: Optional[Dict[str, Tuple[int, Optional[int]]]] = None,
+        python_ast: bool = True,
+        token_budget=None
+    ):
+        """
+        Args:
+            chunk_size: Characters per chunk for languages without their own size
+            chunk_overlap: Overlap for languages without their own size
+            sizes: Optional {language: (size, overlap)}; a None overlap keeps
+                the default overlap-to-size ratio. "default" overrides the
+                two arguments above.
+            python_ast: Chunk Python per function/class from its syntax tree
+                (the Python separators are the fallback)
+            token_budget: Optional token_utils.TokenBudget; chunks then also
+                stay within the embedding model's input length
+        """
+        sizes = dict(sizes or {})
+        if "default" in sizes:
+            chunk_size, overlap = sizes.pop("default")
+            if overlap is not None:
+                chunk_overlap = overlap
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.sizes = sizes
+        self.token_budget = token_budget
+        self.generic = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=self._length_function(chunk_size)
+        )
+        # Built up front: splitters are stateless and split_documents may be called from several threads
+        self._splitters = {
+            language: self._build(language)
+            for language in set(LANGUAGE_BY_EXTENSION.values()) | set(sizes)
+        }
+        if python_ast:
+            size = self._size_for("python")[0]
+            self._splitters["python"] = PythonAstSplitter(size, self._splitters["python"], self._length_function(size))
+
+    def _length_function(self, chunk_size: int) -> Callable[[str], int]:
+        return BudgetedLength(chunk_size, self.token_budget) if self.token_budget else len
+
+    def _size_for(self, language: str) -> Tuple[int, int]:
+        size, overlap = self.sizes.get(language, (self.chunk_size, None))
+        if overlap is None:
+            overlap = self.chunk_overlap * size // self.chunk_size
+        return size, overlap
+
+    def _build(self, language: str) -> RecursiveCharacterTextSplitter:
+        size, overlap = self._size_for(language)
+        options = {"chunk_size": size, "chunk_overlap": overlap, "length_function": self._length_function(size)}
+        if language in _CUSTOM_SEPARATORS:
+            return RecursiveCharacterTextSplitter(
+                separators=_CUSTOM_SEPARATORS[language], is_separator_regex=True, **options
+            )
+        try:
+            return RecursiveCharacterTextSplitter.from_language(Language(language), **options)
+        except ValueError:
+            # Size configured for a language without separators of its own
+            return RecursiveCharacterTextSplitter(**options)
+
+    def splitter_for(self, metadata: dict) -> RecursiveCharacterTextSplitter:
+        """The splitter used for a document with this metadata"""
+        return self._splitters.get(detect_language(metadata), self.generic)
+
+    def split_documents(self, documents: Iterable) -> List:
+        chunks = []
+        for doc in documents:
+            chunks.extend(self.splitter_for(doc.metadata).split_documents([doc]))
+        return chunks
@@ -1,12 +1,22 @@
+import importlib
+import json
+import multiprocessing
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from langchain_community.document_loaders import JSONLoader, PyPDFLoader
+import re
+import signal
+from fnmatch import fnmatch
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from stat import S_ISREG
+
+from repo_utils import GitBlobReader, list_git_blobs, list_git_files
 
 EXTENSOES_SUPORTADAS = [
     ".md", ".ts", ".js", ".tsx", ".jsx", ".py", ".java", ".html", ".css", ".txt", ".json", ".pdf", 
     ".yml", ".yaml", ".xml", ".sql", ".sh", ".bash", ".dockerfile", ".env", ".gitignore", 
     ".vue", ".svelte", ".go", ".rs", ".cpp", ".c", ".h", ".cs", ".php", ".rb", ".swift",
     ".tf", ".tfvars", ".hcl",  # Terraform/HCL files
+    ".ipynb",  # Jupyter notebooks (cells only, outputs dropped)
     ""
 ]
 
@@ -17,100 +27,688 @@ SPECIAL_FILES = [
     "MAKEFILE", "RAKEFILE", "GEMFILE", "PROCFILE"
 ]
 
-def process_file(full_path, ext):
-    try:
-        if ext == ".json":
-            # Try JSONLoader first, fallback to manual processing if it fails
-            try:
-                loader = JSONLoader(full_path, jq_schema='.', text_content=False)
-                docs = list(loader.lazy_load())
-                if docs:
-                    return ext, docs, None
-            except Exception:
-                # Fallback: processar JSON manualmente
-                import json
-                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                    try:
-                        json_data = json.load(f)
-                        # Converter JSON para texto legível
-                        content = json.dumps(json_data, indent=2, ensure_ascii=False)
-                        from langchain_core.documents import Document
-                        doc = Document(page_content=content, metadata={"source": full_path, "type": "json"})
-                        return ext, [doc], None
-                    except json.JSONDecodeError:
-                        # Se não for JSON válido, tratar como texto
-                        f.seek(0)
-                        content = f.read()
-                        from langchain_core.documents import Document
-                        doc = Document(page_content=content, metadata={"source": full_path, "type": "json_text"})
-                        return ext, [doc], None
-        elif ext == ".pdf":
-            loader = PyPDFLoader(full_path)
+# Size ceiling for extensions whose bulk is dropped while loading (the default is 5MB)
+MAX_FILE_SIZES = {
+    ".ipynb": 50 * 1024 * 1024,  # mostly outputs and embedded images
+}
+
+# Inline images in markdown cells (![](data:image/png;base64,...))
+_DATA_URI = re.compile(r"data:[\w.+-]+/[\w.+-]+;base64,[A-Za-z0-9+/=]+")
+
+# Parsers flagged heavy in the loader registry run in a process pool
+DEFAULT_HEAVY_TIMEOUT = 120
+DEFAULT_HEAVY_MEMORY_MB = 2048
+
+# Bytes inspected to decide whether a file is text
+SNIFF_BYTES = 8192
+# Control characters that still occur in text files (BEL, BS, TAB, LF, FF, CR, ESC)
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+# Returned as the error of process_file for files whose content is not text
+BINARY_CONTENT = "binary content"
+
+# Low-value files: valid text, but chunks of them only add noise and vectors
+LOCKFILE_NAMES = {
+    "package-lock.json", "npm-shrinkwrap.json", "pnpm-lock.yaml", "yarn.lock", "bun.lockb",
+    "poetry.lock", "pipfile.lock", "pdm.lock", "uv.lock", "cargo.lock", "go.sum",
+    "composer.lock", "gemfile.lock", "podfile.lock", "packages.lock.json", "mix.lock", "flake.lock"
+}
+MINIFIED_NAME_GLOBS = ["*.min.js", "*.min.css", "*-min.js", "*.bundle.js", "*.chunk.js"]
+GENERATED_NAME_GLOBS = [
+    "*.pb.go", "*.pb.cc", "*.pb.h", "*_pb2.py", "*_pb2_grpc.py", "*.pb.swift",
+    "*_generated.go", "*.gen.go", "*.gen.ts", "*.generated.*", "*.g.cs", "*.designer.cs"
+]
+# Markers generators put in the leading comment block: '@generated', or "generated"
+# together with "do not edit" ("Code generated by protoc-gen-go. DO NOT EDIT.",
+# "Generated by the protocol buffer compiler.  DO NOT EDIT!", OpenAPI Generator headers)
+_GENERATED_MARKER = re.compile(
+    r"@generated\b|\bgenerated\b[\s\S]*\bdo not edit\b|\bdo not edit\b[\s\S]*\bgenerated\b",
+    re.IGNORECASE
+)
+_LINE_COMMENT_PREFIXES = ("#", "//", "--", ";", "%")
+GENERATED_HEADER_BYTES = 2048
+GENERATED_HEADER_LINES = 30
+# Average line length above which code is considered minified (prose wraps paragraphs on one line)
+MINIFIED_LINE_LENGTH = 300
+PROSE_EXTENSIONS = {".md", ".txt", ""}
+# Returned as the error of process_file for text whose content is low-value
+MINIFIED_CONTENT = "minified content"
+GENERATED_CONTENT = "generated content"
+_LOW_VALUE_CONTENT = {MINIFIED_CONTENT: "minified", GENERATED_CONTENT: "generated"}
+
+def classify_low_value_name(fname):
+    """Returns 'lockfile', 'minified' or 'generated' when the file name alone says so, else None"""
+    lower = fname.lower()
+    if lower in LOCKFILE_NAMES:
+        return "lockfile"
+    if any(fnmatch(lower, pattern) for pattern in MINIFIED_NAME_GLOBS):
+        return "minified"
+    if any(fnmatch(lower, pattern) for pattern in GENERATED_NAME_GLOBS):
+        return "generated"
+    return None
+
+def _leading_comment_block(text):
+    """Comment lines at the top of a file, up to the first line of code"""
+    lines, closing = [], None
+    for line in text.splitlines()[:GENERATED_HEADER_LINES]:
+        stripped = line.strip()
+        if closing:
+            lines.append(stripped)
+            if closing in stripped:
+                closing = None
+        elif stripped.startswith(("/*", "<!--")):
+            lines.append(stripped)
+            opening, closing = ("/*", "*/") if stripped.startswith("/*") else ("<!--", "-->")
+            if closing in stripped[len(opening):]:
+                closing = None
+        elif stripped.startswith(_LINE_COMMENT_PREFIXES):
+            lines.append(stripped)
+        elif stripped:
+            break
+    return "\n".join(lines)
+
+def classify_low_value_content(ext, data):
+    """
+    Returns MINIFIED_CONTENT or GENERATED_CONTENT for low-value text, else None
+
+    Prose is never classified: READMEs quote generator headers and keep
+    paragraphs on one line.
+    """
+    if ext in PROSE_EXTENSIONS:
+        return None
+    header = data[:GENERATED_HEADER_BYTES].decode("utf-8", errors="ignore")
+    if _GENERATED_MARKER.search(_leading_comment_block(header)):
+        return GENERATED_CONTENT
+    if len(data) > 2 * MINIFIED_LINE_LENGTH:
+        if len(data) / (data.count(b"\n") + 1) > MINIFIED_LINE_LENGTH:
+            return MINIFIED_CONTENT
+    return None
+
+def is_binary(sample: bytes) -> bool:
+    """
+    Content sniff: a null byte, or more than 30% non-text bytes, means binary
+
+    Bytes >= 0x80 count as text so UTF-8 and Latin-1 files are not rejected.
+    """
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    return len(sample.translate(None, _TEXT_BYTES)) / len(sample) > 0.3
+
+# Vendored, generated and build trees pruned during traversal unless overridden
+DEFAULT_EXCLUDE_GLOBS = [
+    "node_modules", "dist", "build", "vendor", ".venv", "target", "__pycache__"
+]
+
+class PathFilter:
+    """
+    Include/exclude globs applied to paths relative to the repository root
+
+    A pattern without '/' matches any single path component (so 'node_modules'
+    prunes that directory at every depth and '*.min.js' matches file names);
+    a pattern with '/' matches the whole relative path ('docs/generated/*').
+    Exclusions win over inclusions; with no include patterns every file that
+    is not excluded is kept.
+    """
+
+    def __init__(self, include_globs=None, exclude_globs=None):
+        self.include_globs = list(include_globs or [])
+        self.exclude_globs = list(DEFAULT_EXCLUDE_GLOBS if exclude_globs is None else exclude_globs)
+        self.pruned_files = 0
+        self.pruned_dirs = 0
+
+    @staticmethod
+    def _matches(rel_path, patterns):
+        parts = rel_path.split("/")
+        for pattern in patterns:
+            if "/" in pattern:
+                if fnmatch(rel_path, pattern.strip("/")):
+                    return True
+            elif any(fnmatch(part, pattern) for part in parts):
+                return True
+        return False
+
+    def prune_dir(self, rel_dir):
+        """True (and counted) if the directory is excluded and must not be descended into"""
+        if self.exclude_globs and self._matches(rel_dir, self.exclude_globs):
+            self.pruned_dirs += 1
+            return True
+        return False
+
+    def accept_file(self, rel_path):
+        """True if the file is kept; excluded files are counted as pruned"""
+        if self.exclude_globs and self._matches(rel_path, self.exclude_globs):
+            self.pruned_files += 1
+            return False
+        if self.include_globs and not self._matches(rel_path, self.include_globs):
+            self.pruned_files += 1
+            return False
+        return True
+
+# Third-party loaders imported on first use (module attribute access or _lazy)
+_LAZY_IMPORTS = {
+    "JSONLoader": "langchain_community.document_loaders",
+    "PyPDFLoader": "langchain_community.document_loaders",
+}
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _lazy(name):
+    """Returns a lazily imported name, honouring a value patched onto the module"""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+def _read_file(full_path):
+    with open(full_path, "rb") as f:
+        return f.read()
+
+def _decode_text(data):
+    """Decodes file bytes the way a utf-8 text-mode read with errors='ignore' would"""
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+class _LoaderEntry:
+    """A registered loader; 'module:function' targets are imported on first use"""
+
+    def __init__(self, target, heavy):
+        self.target = target
+        self.heavy = heavy
+        self._function = None if isinstance(target, str) else target
+
+    def resolve(self):
+        if self._function is None:
+            module_name, _, attribute = self.target.partition(":")
+            self._function = getattr(importlib.import_module(module_name), attribute)
+        return self._function
+
+# Loaders by extension and by file-name glob (checked first); anything else is plain text
+_LOADERS_BY_EXTENSION = {}
+_LOADERS_BY_NAME = []
+
+def register_loader(loader, extensions=(), names=(), heavy=False):
+    """
+    Registers a loader for file extensions and/or file-name globs
+
+    Args:
+        loader: Callable (full_path, data) -> list of Documents, or a
+            'package.module:function' string imported when a matching file is
+            first loaded. data is the file content in bytes when it was
+            already read (git blobs), otherwise None and the loader reads
+            full_path itself; raising reports the file as failed
+        extensions: Extensions such as '.proto' (added to EXTENSOES_SUPORTADAS)
+        names: Case-insensitive file-name globs such as 'jenkinsfile'
+        heavy: Run in the parser process pool (CPU-bound or crash-prone
+            parsers); the loader must then be importable by the workers
+    """
+    entry = _LoaderEntry(loader, heavy)
+    for ext in extensions:
+        ext = ext.lower()
+        _LOADERS_BY_EXTENSION[ext] = entry
+        if ext not in EXTENSOES_SUPORTADAS:
+            EXTENSOES_SUPORTADAS.append(ext)
+    for pattern in names:
+        _LOADERS_BY_NAME.append((pattern.lower(), entry))
+
+def get_loader(fname, ext):
+    """Returns the registered loader entry for a file, or None for the plain text loader"""
+    lower = fname.lower()
+    for pattern, entry in _LOADERS_BY_NAME:
+        if fnmatch(lower, pattern):
+            return entry
+    return _LOADERS_BY_EXTENSION.get(ext)
+
+def load_json(full_path, data):
+    """JSONLoader when jq is available, else the JSON re-serialized as indented text"""
+    from langchain_core.documents import Document
+    # Try JSONLoader first, fallback to manual processing if it fails
+    if data is None:
+        try:
+            loader = _lazy("JSONLoader")(full_path, jq_schema='.', text_content=False)
             docs = list(loader.lazy_load())
-            return ext, docs, None
+            if docs:
+                return docs
+        except Exception:
+            pass
+        data = _read_file(full_path)
+    # Fallback: processar JSON manualmente
+    text = _decode_text(data)
+    try:
+        json_data = json.loads(text)
+        # Converter JSON para texto legível
+        content = json.dumps(json_data, indent=2, ensure_ascii=False)
+        return [Document(page_content=content, metadata={"source": full_path, "type": "json"})]
+    except json.JSONDecodeError:
+        # Se não for JSON válido, tratar como texto
+        return [Document(page_content=text, metadata={"source": full_path, "type": "json_text"})]
+
+def load_pdf(full_path, data):
+    """One document per page, parsed with pypdf"""
+    if data is None:
+        return list(_lazy("PyPDFLoader")(full_path).lazy_load())
+    from langchain_community.document_loaders.blob_loaders import Blob
+    from langchain_community.document_loaders.parsers import PyPDFParser
+    return list(PyPDFParser().lazy_parse(Blob.from_data(data, path=full_path)))
+
+def _cell_text(cell, key):
+    text = cell.get(key, "")
+    return "".join(text) if isinstance(text, list) else str(text)
+
+def load_notebook(full_path, data):
+    """
+    Turns a Jupyter notebook into one document per code/markdown cell
+
+    Outputs, attachments and inline base64 images are dropped; each document
+    records its position in the notebook as 'cell_index'.
+    """
+    if data is None:
+        data = _read_file(full_path)
+    notebook = json.loads(_decode_text(data))
+    cells = notebook.get("cells")
+    if cells is None:
+        # nbformat 3 keeps cells in worksheets and code in 'input'
+        cells = [cell for sheet in notebook.get("worksheets", []) for cell in sheet.get("cells", [])]
+    metadata = notebook.get("metadata", {})
+    language = (
+        metadata.get("language_info", {}).get("name")
+        or metadata.get("kernelspec", {}).get("language")
+    )
+
+    from langchain_core.documents import Document
+    docs = []
+    for index, cell in enumerate(cells):
+        cell_type = cell.get("cell_type")
+        if cell_type == "code":
+            text = _cell_text(cell, "source" if "source" in cell else "input")
+        elif cell_type == "markdown":
+            text = _DATA_URI.sub("data:,", _cell_text(cell, "source"))
         else:
-            # Use um loader simples para texto, markdown, código, etc.
-            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            # Simule um objeto Document do LangChain
-            from langchain_core.documents import Document
-            doc = Document(page_content=content, metadata={"source": full_path})
-            return ext, [doc], None
+            continue
+        if not text.strip():
+            continue
+        cell_metadata = {"source": full_path, "type": "notebook", "cell_index": index, "cell_type": cell_type}
+        if cell_type == "code" and language:
+            cell_metadata["language"] = language
+        docs.append(Document(page_content=text, metadata=cell_metadata))
+    return docs
+
+register_loader(load_json, extensions=[".json"])
+register_loader(load_pdf, extensions=[".pdf"], heavy=True)
+register_loader(load_notebook, extensions=[".ipynb"])
+
+def process_file(full_path, ext, data=None, skip_low_value=False, loader=None):
+    """
+    Loads one file into LangChain documents
+
+    Args:
+        full_path: Path of the file (also used as the 'source' metadata)
+        ext: Lower-cased extension of the file
+        data: Content already read elsewhere (e.g. a git blob); the file is
+            read from full_path when None
+        skip_low_value: Reject minified or generated text (returned as
+            MINIFIED_CONTENT / GENERATED_CONTENT)
+        loader: Loader to use instead of the registry lookup (a callable or
+            'module:function' string, as accepted by register_loader)
+
+    Returns:
+        Tuple of (ext, documents, error message or None)
+    """
+    try:
+        entry = _LoaderEntry(loader, False) if loader is not None else get_loader(os.path.basename(full_path), ext)
+        if entry is not None:
+            return ext, entry.resolve()(full_path, data), None
+
+        # Use um loader simples para texto, markdown, código, etc.
+        # Read once: sniff the first bytes, then decode the same buffer
+        if data is None:
+            data = _read_file(full_path)
+        if is_binary(data[:SNIFF_BYTES]):
+            return ext, [], BINARY_CONTENT
+        if skip_low_value:
+            low_value = classify_low_value_content(ext, data)
+            if low_value:
+                return ext, [], low_value
+        from langchain_core.documents import Document
+        doc = Document(page_content=_decode_text(data), metadata={"source": full_path})
+        return ext, [doc], None
     except Exception as e:
         return ext, [], f"AVISO: Erro ao processar '{full_path}': {e}"
 
+def _init_heavy_worker(memory_mb):
+    """Caps the address space of a parser process so a runaway file fails with MemoryError"""
+    if not memory_mb:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+# Blob reader of a parser process, opened on its first git blob
+_worker_blob_reader = None
+
+def _read_blob_in_worker(repo_path, sha):
+    global _worker_blob_reader
+    if _worker_blob_reader is None:
+        _worker_blob_reader = GitBlobReader(repo_path)
+    return _worker_blob_reader.read(sha)
+
+def _load_blob(reader, full_path, ext, sha, skip_low_value=False):
+    """Reads a git blob and loads it with process_file (thread path of git ingestion)"""
+    try:
+        data = reader.read(sha)
+    except Exception as e:
+        return ext, [], f"AVISO: Erro ao processar '{full_path}': {e}"
+    return process_file(full_path, ext, data, skip_low_value)
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("parser timed out")
+
+def _process_heavy_file(full_path, ext, timeout, blob=None, loader=None):
+    """
+    Runs process_file inside a parser process, aborting it after `timeout` seconds
+
+    The alarm interrupts pure-Python parsers such as pypdf; the resulting
+    TimeoutError is reported by process_file like any other parse error.
+    blob is an optional (repository path, blob SHA) to read the content from;
+    loader is the registered loader, passed along because the worker's own
+    registry lacks loaders registered at runtime in the parent.
+    """
+    def run():
+        if blob is None:
+            return process_file(full_path, ext, loader=loader)
+        try:
+            data = _read_blob_in_worker(*blob)
+        except Exception as e:
+            return ext, [], f"AVISO: Erro ao processar '{full_path}': {e}"
+        return process_file(full_path, ext, data, loader=loader)
+
+    if not timeout or not hasattr(signal, "setitimer"):
+        return run()
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return run()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _scandir_walk(path, path_filter):
+    """
+    Yields (full_path, None) for every file under path, skipping .git and
+    excluded directories before descending (size is stat-ed later, once)
+    """
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        try:
+            entries = list(os.scandir(os.path.join(path, rel_dir)))
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".git" and not path_filter.prune_dir(rel_path):
+                        pending.append(rel_path)
+                elif entry.is_file() and path_filter.accept_file(rel_path):
+                    yield os.path.abspath(entry.path), None
+            except OSError:
+                continue
+
+def _iter_candidate_files(path, path_filter, file_paths=None, git_ref=None):
+    """
+    Yields (full_path, size, blob_sha) for every candidate file; size is None
+    when unknown and blob_sha is only set when listing git_ref
+
+    With git_ref the files of that commit are listed from the object database
+    (no working tree needed). Otherwise git work trees are enumerated with
+    `git ls-files` (respecting .gitignore), anything else with a scandir walk.
+    file_paths restricts the result to the given paths relative to `path`.
+    Paths rejected by path_filter are skipped (and counted by it).
+    """
+    if git_ref is not None:
+        blobs = list_git_blobs(path, git_ref)
+        if blobs is None:
+            raise Exception(f"Cannot list '{git_ref}' in git repository {path}")
+        if file_paths is not None:
+            wanted = {rel_path.replace(os.sep, "/") for rel_path in file_paths}
+            blobs = {rel_path: blob for rel_path, blob in blobs.items() if rel_path in wanted}
+        for rel_path, (sha, size) in blobs.items():
+            if path_filter.accept_file(rel_path):
+                yield os.path.abspath(os.path.join(path, rel_path)), size, sha
+        return
+
+    if file_paths is not None:
+        for rel_path in file_paths:
+            if not path_filter.accept_file(rel_path.replace(os.sep, "/")):
+                continue
+            full_path = os.path.abspath(os.path.join(path, rel_path))
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            if S_ISREG(stat.st_mode):
+                yield full_path, stat.st_size, None
+        return
+
+    git_files = list_git_files(path)
+    if git_files is None:
+        for full_path, size in _scandir_walk(path, path_filter):
+            yield full_path, size, None
+        return
+    for rel_path, size in git_files.items():
+        if not path_filter.accept_file(rel_path):
+            continue
+        yield os.path.abspath(os.path.join(path, rel_path)), size, None
+
 def load_documents_robustly(
     path: str,
     extensoes_processadas,
     extensoes_descartadas,
-    max_load_workers=None
+    max_load_workers=None,
+    file_paths=None,
+    exclude_paths=None,
+    progress=None,
+    include_globs=None,
+    exclude_globs=None,
+    heavy_workers=None,
+    heavy_timeout=DEFAULT_HEAVY_TIMEOUT,
+    heavy_memory_mb=DEFAULT_HEAVY_MEMORY_MB,
+    git_ref=None,
+    max_in_flight=None,
+    ordered=False,
+    skip_low_value=True
 ):
+    """
+    Loads documents from a directory in parallel, yielding them as they complete
+
+    Args:
+        path: Root directory of the repository
+        extensoes_processadas: Counter of processed documents per extension
+        extensoes_descartadas: Counter of discarded files per extension/reason
+        max_load_workers: Number of loader threads
+        file_paths: Optional paths relative to `path` to load instead of walking
+            the whole tree (used for incremental re-indexing)
+        exclude_paths: Optional set of absolute paths to skip (files already
+            indexed by an interrupted build that is being resumed)
+        progress: Optional dict receiving 'files_total' once enumeration is done
+        include_globs: Optional globs a file must match to be loaded
+        exclude_globs: Globs of files and directories to prune (default
+            DEFAULT_EXCLUDE_GLOBS; an empty list prunes nothing). Pruned files
+            are counted under '[pruned]' and directories skipped by the walk
+            under '[pruned_dirs]' in extensoes_descartadas
+        heavy_workers: Parser processes for files of heavy loaders (default
+            min(4, cpu count); 0 parses them on the loader threads)
+        heavy_timeout: Seconds a heavy file may take before it is abandoned
+        heavy_memory_mb: Address-space limit of each parser process (0 = none)
+        git_ref: Read the files of this commit from the git object database
+            (through one `git cat-file --batch` process) instead of the
+            working tree, so clones need no checkout. Documents get the
+            file's 'blob_sha' in their metadata
+        max_in_flight: Files submitted to the loader threads at once (default
+            4 per thread; parser processes get 2 each), so memory stays flat
+            however large the repository is
+        ordered: Yield documents in scheduling order instead of completion
+            order, making the output (and the index built from it) identical
+            across runs
+        skip_low_value: Skip lockfiles, minified and generated files (by name
+            while enumerating, by content once read), counted under
+            '[lockfile]', '[minified]' and '[generated]'
+
+    Files are scheduled largest first, so big files do not straggle at the
+    end of the load stage.
+
+    Text files whose content sniffs as binary are discarded as '<ext>_binary'.
+    """
     if max_load_workers is None:
         max_load_workers = min(8, (os.cpu_count() or 1) + 4)
+    if heavy_workers is None:
+        heavy_workers = min(4, os.cpu_count() or 1)
     files_to_process = []
-    for root, _, files in os.walk(path):
-        for fname in files:
-            ext = os.path.splitext(fname)[1].lower()
-            full_path = os.path.abspath(os.path.join(root, fname))
-            
-            # Check if it's a special file without extension
-            if ext == "" and fname.upper() in SPECIAL_FILES:
-                # Check file size (maximum 10MB)
-                try:
-                    if os.path.getsize(full_path) > 10 * 1024 * 1024:
-                        extensoes_descartadas[f"{ext}_too_large"] += 1
-                        continue
-                except OSError:
-                    continue
-                files_to_process.append((full_path, ext))
+    path_filter = PathFilter(include_globs, exclude_globs)
+    for full_path, file_size, blob_sha in _iter_candidate_files(path, path_filter, file_paths, git_ref):
+        fname = os.path.basename(full_path)
+        ext = os.path.splitext(fname)[1].lower()
+        if exclude_paths and full_path in exclude_paths:
+            continue
+        if skip_low_value:
+            low_value = classify_low_value_name(fname)
+            if low_value:
+                extensoes_descartadas[f"[{low_value}]"] += 1
                 continue
-            
-            if ext not in EXTENSOES_SUPORTADAS:
-                extensoes_descartadas[ext] += 1
-                continue
-            
-            # Check file size (maximum 5MB for files with extension)
+        if file_size is None:
             try:
                 file_size = os.path.getsize(full_path)
-                if file_size > 5 * 1024 * 1024:
-                    extensoes_descartadas[f"{ext}_too_large"] += 1
-                    continue
-                # Pular arquivos muito pequenos (provavelmente vazios)
-                if file_size < 10:
-                    extensoes_descartadas[f"{ext}_too_small"] += 1
-                    continue
             except OSError:
                 continue
-                
-            files_to_process.append((full_path, ext))
+        
+        # Check if it's a special file without extension
+        if ext == "" and fname.upper() in SPECIAL_FILES:
+            # Check file size (maximum 10MB)
+            if file_size > 10 * 1024 * 1024:
+                extensoes_descartadas[f"{ext}_too_large"] += 1
+                continue
+            files_to_process.append((full_path, ext, blob_sha, file_size))
+            continue
+        
+        if ext not in EXTENSOES_SUPORTADAS and get_loader(fname, ext) is None:
+            extensoes_descartadas[ext] += 1
+            continue
+        
+        # Check file size (maximum 5MB for files with extension)
+        if file_size > MAX_FILE_SIZES.get(ext, 5 * 1024 * 1024):
+            extensoes_descartadas[f"{ext}_too_large"] += 1
+            continue
+        # Pular arquivos muito pequenos (provavelmente vazios)
+        if file_size < 10:
+            extensoes_descartadas[f"{ext}_too_small"] += 1
+            continue
+            
+        files_to_process.append((full_path, ext, blob_sha, file_size))
+
+    if path_filter.pruned_files:
+        extensoes_descartadas["[pruned]"] += path_filter.pruned_files
+    if path_filter.pruned_dirs:
+        extensoes_descartadas["[pruned_dirs]"] += path_filter.pruned_dirs
 
-    with ThreadPoolExecutor(max_workers=max_load_workers) as load_executor:
-        load_futures = [load_executor.submit(process_file, fp, ext) for fp, ext in files_to_process]
-        for future in as_completed(load_futures):
+    if progress is not None:
+        progress["files_total"] = len(files_to_process)
+
+    # Largest first; the path breaks ties so the schedule is deterministic
+    files_to_process.sort(key=lambda item: (-item[3], item[0]))
+    if max_in_flight is None:
+        max_in_flight = max_load_workers * 4
+    heavy_loaders = {}
+    for fp, ext, _, _ in files_to_process:
+        entry = get_loader(os.path.basename(fp), ext)
+        if entry is not None and entry.heavy:
+            heavy_loaders[fp] = entry.target
+    has_heavy = bool(heavy_loaders)
+    heavy_pool = None
+    if has_heavy and heavy_workers > 0:
+        heavy_pool = ProcessPoolExecutor(
+            max_workers=heavy_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_heavy_worker,
+            initargs=(heavy_memory_mb,)
+        )
+    blob_reader = GitBlobReader(path) if git_ref is not None else None
+
+    # Heavy files have their own queue and window, so a backlog of PDFs never
+    # starves the loader threads (and vice versa)
+    queues = {"light": deque(), "heavy": deque()}
+    windows = {"light": max(1, max_in_flight), "heavy": heavy_workers * 2}
+    for position, item in enumerate(files_to_process):
+        kind = "heavy" if heavy_pool is not None and item[0] in heavy_loaders else "light"
+        queues[kind].append((position, kind) + item)
+    # Slots held per queue: running futures, plus finished ones waiting their turn when ordered
+    held = {"light": 0, "heavy": 0}
+    running = {}
+    finished = {}
+    next_position = 0
+
+    def submit(position, kind, fp, ext, sha, size):
+        if kind == "heavy":
+            blob = (path, sha) if sha else None
+            future = heavy_pool.submit(_process_heavy_file, fp, ext, heavy_timeout, blob, heavy_loaders[fp])
+        elif sha:
+            future = load_executor.submit(_load_blob, blob_reader, fp, ext, sha, skip_low_value)
+        else:
+            future = load_executor.submit(process_file, fp, ext, None, skip_low_value)
+        running[future] = (position, kind, fp, sha)
+        held[kind] += 1
+
+    def collect(future):
+        position, kind, full_path, sha = running.pop(future)
+        try:
             ext, docs, error = future.result()
-            if error:
-                print(error, flush=True)
-            else:
-                extensoes_processadas[ext] += len(docs)
-                for doc in docs:
-                    yield doc
\ No newline at end of file
+        except Exception as e:
+            # The parser process died (e.g. killed by the OOM killer)
+            ext, docs, error = os.path.splitext(full_path)[1].lower(), [], f"AVISO: Erro ao processar '{full_path}': {e}"
+        if sha:
+            for doc in docs:
+                doc.metadata["blob_sha"] = sha
+        return position, kind, ext, docs, error
+
+    def report(ext, docs, error):
+        if error == BINARY_CONTENT:
+            extensoes_descartadas[f"{ext}_binary"] += 1
+        elif error in _LOW_VALUE_CONTENT:
+            extensoes_descartadas[f"[{_LOW_VALUE_CONTENT[error]}]"] += 1
+        elif error:
+            print(error, flush=True)
+        else:
+            extensoes_processadas[ext] += len(docs)
+            return docs
+        return []
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_load_workers) as load_executor:
+            while running or finished or any(queues.values()):
+                for kind, pending in queues.items():
+                    while pending and held[kind] < windows[kind]:
+                        submit(*pending.popleft())
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position, kind, ext, docs, error = collect(future)
+                    if not ordered:
+                        held[kind] -= 1
+                        yield from report(ext, docs, error)
+                    else:
+                        finished[position] = (kind, ext, docs, error)
+
+                while next_position in finished:
+                    kind, ext, docs, error = finished.pop(next_position)
+                    held[kind] -= 1
+                    next_position += 1
+                    yield from report(ext, docs, error)
+    finally:
+        if heavy_pool is not None:
+            heavy_pool.shutdown(cancel_futures=True)
+        if blob_reader is not None:
+            blob_reader.close()
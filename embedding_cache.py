@@ -0,0 +1,225 @@
+"""
+Persistent content-addressed embedding cache (SQLite)
+
+Vectors are keyed by sha256(chunk text) plus the embedding model id (model
+name + normalization flag), so unchanged chunks are never embedded twice,
+even across rebuilds, branches or re-chunking of other file types.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = "/app/chroma_db/embedding_cache.sqlite3"
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+def get_embedding_model_id(embeddings) -> str:
+    """
+    Builds a stable identifier for an embeddings instance
+
+    Combines the class (or the embedding_family it declares), the model
+    name and the normalization flag, since each of them changes the
+    produced vectors.
+
+    Args:
+        embeddings: LangChain embeddings instance
+
+    Returns:
+        Identifier such as 'SentenceTransformerEmbeddings:all-MiniLM-L6-v2:normalize=True'
+    """
+    model = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or "default"
+    encode_kwargs = getattr(embeddings, "encode_kwargs", None) or {}
+    normalize = bool(encode_kwargs.get("normalize_embeddings", False))
+    family = getattr(embeddings, "embedding_family", None) or type(embeddings).__name__
+    return f"{family}:{model}:normalize={normalize}"
+
+
+def hash_text(text: str) -> str:
+    """Returns the sha256 hex digest of a chunk text"""
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed vector store keyed by (text hash, model id) with LRU eviction"""
+
+    def __init__(self, path: str, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        """
+        Args:
+            path: SQLite file path (':memory:' for a throwaway cache)
+            max_size_mb: Approximate upper bound of stored vector bytes
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " text_hash TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (text_hash, model))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._size_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, hashes: List[str], model: str) -> Dict[str, List[float]]:
+        """
+        Looks up vectors for the given text hashes
+
+        Returns:
+            Dict mapping each cached hash to its vector (misses are absent)
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE text_hash = ? AND model = ?",
+                    [(now, text_hash, model) for text_hash in found]
+                )
+                self._conn.commit()
+            hit_count = sum(1 for h in hashes if h in found)
+            self.hits += hit_count
+            self.misses += len(hashes) - hit_count
+        return found
+
+    def put_many(self, items: Dict[str, List[float]], model: str) -> None:
+        """Stores vectors keyed by text hash, evicting least recently used entries if needed"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(text_hash, model, array("f", vector).tobytes(), now) for text_hash, vector in items.items()]
+        with self._lock:
+            added = 0
+            for row in rows:
+                # A hash already stored (two workers missed on the same text) keeps its
+                # row, written just as recently, and must not be counted twice
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (text_hash, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    added += len(row[2])
+            self._conn.commit()
+            self._size_bytes += added
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache is at 90% of its budget"""
+        target = int(self.max_bytes * 0.9)
+        to_delete = []
+        freed = 0
+        cursor = self._conn.execute(
+            "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        for rowid, size in cursor:
+            if self._size_bytes - freed <= target:
+                break
+            to_delete.append((rowid,))
+            freed += size
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", to_delete)
+        self._conn.commit()
+        self._size_bytes -= freed
+        self.evictions += len(to_delete)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "size_mb": round(self._size_bytes / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that consults an EmbeddingCache before calling the model"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_id: Optional[str] = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_id = model_id or get_embedding_model_id(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [hash_text(text) for text in texts]
+        cached = self.cache.get_many(hashes, self.model_id)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed, self.model_id)
+            cached.update(computed)
+
+        return [cached[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are short and rarely repeated; no point caching them
+        return self.embeddings.embed_query(text)
+
+
+def get_cached_embeddings(embeddings: Embeddings) -> Embeddings:
+    """
+    Wraps embeddings with the persistent cache if enabled via environment
+
+    Environment Variables:
+        EMBEDDING_CACHE: 'true' (default) or 'false'
+        EMBEDDING_CACHE_PATH: SQLite file (default under /app/chroma_db)
+        EMBEDDING_CACHE_MAX_MB: Size budget in MB (default 2048)
+    """
+    if os.getenv("EMBEDDING_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return embeddings
+    try:
+        cache = EmbeddingCache(
+            os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH),
+            int(os.getenv("EMBEDDING_CACHE_MAX_MB", DEFAULT_MAX_SIZE_MB))
+        )
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"AVISO: Embedding cache disabled: {e}", flush=True)
+        return embeddings
+    return CachedEmbeddings(embeddings, cache)
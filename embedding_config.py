@@ -2,8 +2,7 @@
 Configuração de embeddings com suporte a modelos locais e externos
 """
 import os
-from typing import Union
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 try:
     from langchain_huggingface import HuggingFaceEmbeddings
 except ImportError:
@@ -11,11 +10,13 @@ except ImportError:
 
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 
+from embedding_optimizer import get_embedding_process_config, get_processing_strategy
+
 class EmbeddingProvider:
     """Factory para diferentes provedores de embedding"""
     
     @staticmethod
-    def get_embeddings(provider: str = None) -> Union[OpenAIEmbeddings, HuggingFaceEmbeddings, SentenceTransformerEmbeddings]:
+    def get_embeddings(provider: str = None) -> Embeddings:
         """
         Retorna o provedor de embeddings configurado
         
@@ -32,11 +33,23 @@ class EmbeddingProvider:
         if provider == "openai":
             if "OPENAI_API_KEY" not in os.environ:
                 raise ValueError("OPENAI_API_KEY not found to use OpenAI embeddings")
-            return OpenAIEmbeddings()
+            from openai_embedding_client import AsyncOpenAIEmbeddings, DEFAULT_MODEL
+            strategy = get_processing_strategy("openai")
+            return AsyncOpenAIEmbeddings(
+                model=os.getenv("OPENAI_EMBEDDING_MODEL", DEFAULT_MODEL),
+                tokens_per_minute=int(os.getenv("OPENAI_TPM_LIMIT", strategy["token_limit_per_minute"])),
+                requests_per_minute=int(os.getenv("OPENAI_RPM_LIMIT", "3000")),
+                max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+                retry_attempts=strategy["retry_attempts"],
+                retry_delay=strategy["retry_delay"]
+            )
         
         elif provider == "huggingface":
             # Modelo multilíngue e eficiente
             model_name = os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+            pool = EmbeddingProvider._get_process_pool(model_name)
+            if pool is not None:
+                return pool
             return HuggingFaceEmbeddings(
                 model_name=model_name,
                 model_kwargs={'device': 'cpu'},  # Usar GPU se disponível: 'cuda'
@@ -46,6 +59,9 @@ class EmbeddingProvider:
         elif provider == "sentence-transformers":
             # Modelo local rápido e gratuito
             model_name = os.getenv("ST_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+            pool = EmbeddingProvider._get_process_pool(model_name)
+            if pool is not None:
+                return pool
             return SentenceTransformerEmbeddings(
                 model_name=model_name,
                 model_kwargs={'device': 'cpu'},
@@ -55,6 +71,25 @@ class EmbeddingProvider:
         else:
             raise ValueError(f"Embedding provider not supported: {provider}")
 
+    @staticmethod
+    def _get_process_pool(model_name: str):
+        """
+        Returns a multi-process embedding pool when EMBEDDING_PROCESSES is set
+        
+        Args:
+            model_name: sentence-transformers model to load in each worker
+        """
+        num_processes, torch_threads = get_embedding_process_config(os.getenv("EMBEDDING_PROCESSES", "0"))
+        if num_processes == 0:
+            return None
+        from local_embedding_pool import LocalEmbeddingPool
+        return LocalEmbeddingPool(
+            model_name=model_name,
+            num_workers=num_processes,
+            torch_threads=torch_threads,
+            normalize=True
+        )
+
     @staticmethod
     def get_available_providers() -> dict:
         """Returns available providers and their configurations"""
@@ -57,6 +57,87 @@ def get_optimal_config(provider: str, total_documents: int) -> Tuple[int, int]:
     
     return batch_size, max_workers
 
+def get_streaming_config(provider: str) -> Tuple[int, int, int]:
+    """
+    Returns configuration for the streaming indexing pipeline
+    
+    The total number of chunks is unknown while streaming, so batches are
+    sized for memory and latency (first vectors stored quickly) rather than
+    as a fraction of the corpus.
+    
+    Args:
+        provider: Embedding provider ('openai', 'sentence-transformers', etc.)
+    
+    Returns:
+        Tuple[batch_size, max_workers, queue_depth]
+    """
+    
+    cpu_count = os.cpu_count() or 1
+    memory_gb = psutil.virtual_memory().total / (1024**3)
+    
+    if provider == "openai":
+        # I/O bound: the shared client paces requests against the rate limits
+        # and splits each batch into concurrent API requests
+        batch_size = 400
+        max_workers = 4
+    
+    elif provider in ["sentence-transformers", "huggingface"]:
+        if memory_gb >= 16:
+            batch_size = 256
+        elif memory_gb >= 8:
+            batch_size = 128
+        else:
+            batch_size = 64
+        
+        if cpu_count >= 8:
+            max_workers = min(8, cpu_count)
+        elif cpu_count >= 4:
+            max_workers = min(6, cpu_count + 2)
+        else:
+            max_workers = min(4, cpu_count + 1)
+    
+    else:
+        batch_size = 128
+        max_workers = min(4, cpu_count)
+    
+    # Enough queued work to keep every worker busy, no more
+    queue_depth = max_workers * 2
+    
+    return batch_size, max_workers, queue_depth
+
+def get_embedding_process_config(setting: str) -> Tuple[int, int]:
+    """
+    Returns the process layout for the local embedding pool
+    
+    Each process holds its own model copy, so the process count is capped by
+    memory (~1 GB per worker) and the CPU cores are divided between them to
+    avoid torch thread oversubscription.
+    
+    Args:
+        setting: EMBEDDING_PROCESSES value ('0' disables, 'auto', or a number)
+    
+    Returns:
+        Tuple[num_processes, torch_threads] (num_processes 0 = in-process model)
+    """
+    
+    cpu_count = os.cpu_count() or 1
+    memory_gb = psutil.virtual_memory().total / (1024**3)
+    
+    setting = (setting or "0").strip().lower()
+    if setting == "auto":
+        num_processes = min(max(1, cpu_count // 2), max(1, int(memory_gb // 1)))
+    else:
+        try:
+            num_processes = max(0, int(setting))
+        except ValueError:
+            num_processes = 0
+    
+    if num_processes == 0:
+        return 0, cpu_count
+    
+    torch_threads = max(1, cpu_count // num_processes)
+    return num_processes, torch_threads
+
 def get_processing_strategy(provider: str) -> dict:
     """
     Returns processing strategy based on provider
@@ -0,0 +1,167 @@
+"""
+Persistent state of the vector index (commit it was built from, etc.)
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+STATE_FILENAME = "index_state.json"
+
+
+def get_state_path(db_path: str) -> str:
+    """
+    Returns the path of the state file stored inside the Chroma directory
+
+    Args:
+        db_path: Chroma persist directory
+
+    Returns:
+        Path of the JSON state file
+    """
+    return os.path.join(db_path, STATE_FILENAME)
+
+
+def load_index_state(db_path: str) -> dict:
+    """
+    Loads the index state, returning an empty dict if it does not exist
+
+    Args:
+        db_path: Chroma persist directory
+
+    Returns:
+        Dict with the saved state (e.g. {"commit": "...", "branch": "main"})
+    """
+    try:
+        with open(get_state_path(db_path), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_index_state(db_path: str, state: dict) -> None:
+    """
+    Atomically writes the index state next to the vector database
+
+    Args:
+        db_path: Chroma persist directory
+        state: State to persist
+    """
+    os.makedirs(db_path, exist_ok=True)
+    state_path = get_state_path(db_path)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def get_indexed_commit(db_path: str) -> Optional[str]:
+    """
+    Returns the commit SHA the index was built from, if recorded
+
+    Args:
+        db_path: Chroma persist directory
+    """
+    return load_index_state(db_path).get("commit")
+
+
+STATUS_BUILDING = "building"
+STATUS_COMPLETE = "complete"
+COMPLETED_FILES_LOG = "completed_files.log"
+
+
+class BuildManifest:
+    """
+    Tracks the progress of an index build so an interrupted build can resume
+
+    The small JSON state (status, commit, counters) lives in index_state.json;
+    fully stored files are appended to completed_files.log, one path per line,
+    so recording progress stays cheap even for hundreds of thousands of files.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.log_path = os.path.join(db_path, COMPLETED_FILES_LOG)
+        self.state = load_index_state(db_path)
+        self._log = None
+        self._lock = threading.Lock()
+
+    def is_building(self) -> bool:
+        """True if a build was started and never marked complete"""
+        return self.state.get("status") == STATUS_BUILDING
+
+    def load_completed(self) -> set:
+        """Returns the set of source paths whose chunks are all stored"""
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                return {line.rstrip("\n") for line in f if line.strip()}
+        except OSError:
+            return set()
+
+    def start(self, commit: Optional[str], branch: str, resume: bool = False) -> None:
+        """
+        Marks the index as being built
+
+        Args:
+            commit: Commit being indexed
+            branch: Branch being indexed
+            resume: Keep the completed-files log of a previous attempt
+        """
+        self.close()
+        os.makedirs(self.db_path, exist_ok=True)
+        if not resume and os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.state = {
+            **(self.state if resume else {}),
+            "status": STATUS_BUILDING,
+            "commit": commit,
+            "branch": branch,
+            "started_at": self.state.get("started_at") if resume else time.time()
+        }
+        save_index_state(self.db_path, self.state)
+
+    def forget_files(self, sources) -> None:
+        """Removes sources from the completed log so they are indexed again"""
+        sources = set(sources)
+        remaining = self.load_completed() - sources
+        self.close()
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{source}\n" for source in sorted(remaining))
+        os.replace(tmp_path, self.log_path)
+
+    def mark_files_complete(self, sources) -> None:
+        """Appends fully stored sources to the completed log (called from worker threads)"""
+        if not sources:
+            return
+        with self._lock:
+            if self._log is None:
+                self._log = open(self.log_path, "a", encoding="utf-8")
+            self._log.writelines(f"{source}\n" for source in sources)
+            self._log.flush()
+
+    def update(self, **fields) -> None:
+        """Merges counters/fields into the persisted state"""
+        self.state.update(fields)
+        save_index_state(self.db_path, self.state)
+
+    def complete(self, commit: Optional[str], branch: str) -> None:
+        """Marks the build as complete and drops the completed-files log"""
+        self.close()
+        self.state.update({
+            "status": STATUS_COMPLETE,
+            "commit": commit,
+            "branch": branch,
+            "indexed_at": time.time()
+        })
+        save_index_state(self.db_path, self.state)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
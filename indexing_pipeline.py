@@ -0,0 +1,628 @@
+"""
+Bounded streaming indexing pipeline
+
+Documents flow through load → split → token count/batching → embed → write
+stages, each running in its own thread(s) and connected by bounded queues.
+A full queue blocks the stage upstream of it (backpressure), so peak memory
+is proportional to the queue depth instead of the repository size and the
+first batches reach the vector store while files are still being loaded.
+
+Embedding workers only compute vectors; a single writer thread stores them
+with bulk upserts, so workers never contend on the vector store's locks and
+a slow write does not stall embedding.
+
+Splitting can fan out to a process pool; results are consumed in document
+order, so chunk ids and per-file bookkeeping are the same as in-thread.
+"""
+import hashlib
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from token_utils import count_tokens
+
+_SENTINEL = object()
+
+# Documents handed to a split worker per task, bounded by count and size
+SPLIT_TASK_DOCS = 32
+SPLIT_TASK_CHARS = 256 * 1024
+
+# Splitter and token budget installed once per split worker by _init_split_worker
+_worker_splitter = None
+_worker_token_budget = None
+
+
+def split_document(text_splitter, token_budget, doc):
+    """Returns (chunks, number of chunks longer than the token budget, seconds spent)"""
+    started = time.time()
+    chunks = text_splitter.split_documents([doc])
+    truncated = 0
+    if token_budget is not None:
+        truncated = sum(token_budget.is_truncated(chunk.page_content) for chunk in chunks)
+    return chunks, truncated, time.time() - started
+
+
+def _init_split_worker(text_splitter, token_budget) -> None:
+    global _worker_splitter, _worker_token_budget
+    _worker_splitter, _worker_token_budget = text_splitter, token_budget
+
+
+def _split_in_worker(docs: List) -> List:
+    return [split_document(_worker_splitter, _worker_token_budget, doc) for doc in docs]
+
+
+def make_chunk_id(source: str, doc_index: int, chunk_index: int) -> str:
+    """
+    Deterministic vector id for a chunk
+
+    Re-indexing the same file content yields the same ids, so writes are
+    idempotent upserts and a resumed build overwrites partially stored files
+    instead of duplicating them.
+    """
+    return hashlib.sha1(f"{source}\0{doc_index}\0{chunk_index}".encode("utf-8")).hexdigest()
+
+
+class _SourceTracker:
+    """Counts chunks still waiting to be stored per source file"""
+
+    def __init__(self, track_outcomes: bool = False):
+        self._pending = Counter()
+        self._sealed = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+        # Deduplicated chunks: a dropped copy is stored once its canonical chunk is
+        self._track_outcomes = track_outcomes
+        self._outcomes = {}
+        self._awaiting = {}
+
+    def add(self, source: str, count: int) -> None:
+        with self._lock:
+            self._pending[source] += count
+
+    def add_duplicate(self, canonical_id: str, source: str) -> None:
+        """Makes source wait for the write of the chunk its dropped copy duplicates"""
+        with self._lock:
+            outcome = self._outcomes.get(canonical_id)
+            if outcome is False:
+                self._failed.add(source)
+            elif outcome is None:
+                self._pending[source] += 1
+                self._awaiting.setdefault(canonical_id, Counter())[source] += 1
+
+    def seal(self, source: str) -> List[str]:
+        """Marks that no more chunks will arrive for source; returns it if already fully stored"""
+        with self._lock:
+            self._sealed.add(source)
+            return self._collect([source])
+
+    def stored(self, sources: Counter, ids: Iterable[str] = ()) -> List[str]:
+        """Records stored chunks; returns sources that became complete"""
+        with self._lock:
+            sources = sources + self._resolve(ids, True)
+            self._pending.subtract(sources)
+            return self._collect(sources)
+
+    def failed(self, sources: Counter, ids: Iterable[str] = ()) -> None:
+        with self._lock:
+            sources = sources + self._resolve(ids, False)
+            self._failed.update(sources)
+            self._pending.subtract(sources)
+
+    def _resolve(self, ids: Iterable[str], outcome: bool) -> Counter:
+        """Records the outcome of canonical chunks; returns the duplicate sources waiting on them"""
+        waiting = Counter()
+        if self._track_outcomes:
+            for chunk_id in ids:
+                self._outcomes[chunk_id] = outcome
+                waiting.update(self._awaiting.pop(chunk_id, Counter()))
+        return waiting
+
+    def _collect(self, sources) -> List[str]:
+        completed = []
+        for source in sources:
+            if source in self._sealed and self._pending[source] <= 0 and source not in self._failed:
+                completed.append(source)
+                self._sealed.discard(source)
+                del self._pending[source]
+        return completed
+
+
+class IndexingPipeline:
+    """Streams documents into a vector store through bounded queues"""
+
+    def __init__(
+        self,
+        text_splitter,
+        batch_size: int,
+        max_workers: int,
+        embed_batch: Callable[[List, int], Optional[List[List[float]]]],
+        write_batch: Callable[[List, List[str], List[List[float]]], int],
+        write_batch_size: Optional[int] = None,
+        queue_depth: Optional[int] = None,
+        token_count_method: str = "local",
+        length_bucket_batches: int = 0,
+        deduplicator=None,
+        token_budget=None,
+        split_workers: int = 0,
+        retry_attempts: int = 0,
+        retry_delay: float = 0,
+        on_files_complete: Optional[Callable[[List[str]], None]] = None,
+        on_batch_stored: Optional[Callable[[dict], None]] = None
+    ):
+        """
+        Args:
+            text_splitter: Splitter exposing split_documents(list_of_documents)
+            batch_size: Chunks per batch handed to the embedding workers
+            max_workers: Number of concurrent embedding workers
+            embed_batch: Callable(batch, batch_num) returning one vector per
+                chunk, or None if the batch could not be embedded
+            write_batch: Callable(chunks, ids, vectors) storing precomputed
+                vectors, returning the number of chunks stored. Only ever
+                called from the single writer thread
+            write_batch_size: Chunks the writer accumulates per write
+                (default 4 * batch_size)
+            queue_depth: Max items waiting between two stages (default 2 * workers)
+            token_count_method: Method passed to count_tokens
+            length_bucket_batches: When > 0, chunks are buffered in windows of
+                this many batches and batched by token length, so a model
+                batch does not pad short snippets to the longest code chunk.
+                Ids travel with their chunks, so vectors are still written
+                under the right ids
+            deduplicator: Optional ChunkDeduplicator; chunks it reports as
+                duplicates are dropped before embedding, and their files
+                count as stored once the first copy is
+            token_budget: Optional token_utils.TokenBudget; chunks longer than
+                the embedding model reads are counted in truncated_chunks
+            split_workers: Processes splitting documents (0 = the split
+                thread itself). text_splitter and token_budget must be
+                picklable; split_seconds then adds up time across workers
+            retry_attempts: Retry passes over failed batches once the stream
+                is drained; from the second pass on, still-failing batches
+                are split in half so one bad chunk cannot sink its neighbours
+            retry_delay: Seconds before the first retry pass, growing linearly per pass
+            on_files_complete: Called with source paths once every chunk of
+                those files has been stored (used for build checkpoints)
+            on_batch_stored: Called with a snapshot of the stats after each
+                successfully stored batch (used for progress reporting)
+        """
+        self.text_splitter = text_splitter
+        self.embed_batch = embed_batch
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.write_batch_size = max(self.batch_size, write_batch_size or self.batch_size * 4)
+        self.max_workers = max(1, max_workers)
+        self.queue_depth = queue_depth or self.max_workers * 2
+        self.token_count_method = token_count_method
+        self.length_bucket_batches = max(0, length_bucket_batches)
+        self.deduplicator = deduplicator
+        self.token_budget = token_budget
+        self.split_workers = max(0, split_workers)
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_delay = max(0.0, retry_delay)
+        self.on_files_complete = on_files_complete
+        self.on_batch_stored = on_batch_stored
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._errors = []
+        self._retry_queue = []
+        self.stats = {}
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocks until item is queued; returns False if the pipeline was stopped"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocks until an item is available; returns _SENTINEL if the pipeline was stopped"""
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _SENTINEL
+
+    def _fail(self, stage: str, error: Exception) -> None:
+        with self._lock:
+            self._errors.append((stage, error))
+        self._stop.set()
+
+    def _add_stat(self, key: str, value) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def _files_complete(self, sources: List[str]) -> None:
+        if sources:
+            self._add_stat("files_completed", len(sources))
+            if self.on_files_complete:
+                self.on_files_complete(sources)
+
+    def _load_stage(self, documents: Iterable, doc_q: queue.Queue) -> None:
+        try:
+            for doc in documents:
+                self._add_stat("documents", 1)
+                if not self._put(doc_q, doc):
+                    return
+        except Exception as e:
+            self._fail("load", e)
+        finally:
+            if self._stop.is_set() and hasattr(documents, "close"):
+                # Release the loader's thread pool when aborting mid-stream
+                documents.close()
+            self._put(doc_q, _SENTINEL)
+
+    def _take_documents(self, doc_q: queue.Queue, block: bool):
+        """Next split task: up to SPLIT_TASK_DOCS ready documents, [] if none is ready, None at the end"""
+        if block:
+            doc = self._get(doc_q)
+        else:
+            try:
+                doc = doc_q.get_nowait()
+            except queue.Empty:
+                return []
+        if doc is _SENTINEL:
+            return None
+        docs, size = [doc], len(doc.page_content)
+        while len(docs) < SPLIT_TASK_DOCS and size < SPLIT_TASK_CHARS:
+            try:
+                doc = doc_q.get_nowait()
+            except queue.Empty:
+                break
+            if doc is _SENTINEL:
+                # Leave the end marker for the next call
+                doc_q.put(_SENTINEL)
+                break
+            docs.append(doc)
+            size += len(doc.page_content)
+        return docs
+
+    def _split_documents(self, doc_q: queue.Queue):
+        """Yields (doc, split_document result) in document order"""
+        if not self.split_workers:
+            while True:
+                doc = self._get(doc_q)
+                if doc is _SENTINEL:
+                    return
+                yield doc, split_document(self.text_splitter, self.token_budget, doc)
+
+        # spawn: the pipeline already runs threads, which makes fork unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=self.split_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_split_worker,
+            initargs=(self.text_splitter, self.token_budget)
+        )
+        in_flight = deque()
+        finished = False
+        try:
+            while in_flight or not finished:
+                while not finished and len(in_flight) < self.split_workers * 2:
+                    # Only wait for documents when no task is running
+                    docs = self._take_documents(doc_q, block=not in_flight)
+                    if docs is None:
+                        finished = True
+                    elif not docs:
+                        break
+                    else:
+                        in_flight.append((docs, pool.submit(_split_in_worker, docs)))
+                if in_flight:
+                    docs, future = in_flight.popleft()
+                    yield from zip(docs, future.result())
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _split_stage(self, doc_q: queue.Queue, chunk_q: queue.Queue) -> None:
+        # The loader yields all documents of a file consecutively (e.g. PDF
+        # pages), so a new source means the previous one has no more chunks
+        last_source = None
+        doc_index = 0
+        results = self._split_documents(doc_q)
+        try:
+            for doc, (chunks, truncated, seconds) in results:
+                source = doc.metadata.get("source", "")
+                if source != last_source:
+                    if last_source is not None:
+                        self._files_complete(self._tracker.seal(last_source))
+                    last_source, doc_index = source, 0
+                else:
+                    doc_index += 1
+                self._add_stat("split_seconds", seconds)
+                self._add_stat("truncated_chunks", truncated)
+                if not chunks:
+                    continue
+                ids = [make_chunk_id(source, doc_index, i) for i in range(len(chunks))]
+                if self.deduplicator is not None:
+                    chunks, ids = self._drop_duplicates(source, chunks, ids)
+                    if not chunks:
+                        continue
+                self._tracker.add(source, len(chunks))
+                if not self._put(chunk_q, (chunks, ids)):
+                    return
+            if last_source is not None and not self._stop.is_set():
+                self._files_complete(self._tracker.seal(last_source))
+        except Exception as e:
+            self._fail("split", e)
+        finally:
+            results.close()
+            self._put(chunk_q, _SENTINEL)
+
+    def _drop_duplicates(self, source: str, chunks: List, ids: List[str]):
+        kept_chunks, kept_ids = [], []
+        for chunk, chunk_id in zip(chunks, ids):
+            canonical_id = self.deduplicator.add(chunk, chunk_id)
+            if canonical_id is None:
+                kept_chunks.append(chunk)
+                kept_ids.append(chunk_id)
+            else:
+                self._tracker.add_duplicate(canonical_id, source)
+        self._add_stat("duplicate_chunks", len(chunks) - len(kept_chunks))
+        return kept_chunks, kept_ids
+
+    def _batch_stage(self, chunk_q: queue.Queue, batch_q: queue.Queue) -> None:
+        # pending holds (tokens, chunk, id) waiting to be batched
+        pending = []
+        window = self.batch_size * max(1, self.length_bucket_batches)
+        batch_num = 0
+
+        def emit(entries) -> bool:
+            nonlocal batch_num
+            batch_num += 1
+            return self._put(batch_q, ([c for _, c, _ in entries], batch_num, [i for _, _, i in entries]))
+
+        try:
+            while True:
+                item = self._get(chunk_q)
+                if item is _SENTINEL:
+                    break
+                chunks, ids = item
+                started = time.time()
+                tokens = [count_tokens(c.page_content, self.token_count_method) for c in chunks]
+                self._add_stat("count_seconds", time.time() - started)
+                self._add_stat("chunks", len(chunks))
+                self._add_stat("tokens", sum(tokens))
+                pending.extend(zip(tokens, chunks, ids))
+                if len(pending) < window:
+                    continue
+                if self.length_bucket_batches:
+                    pending.sort(key=lambda entry: entry[0])
+                while len(pending) >= self.batch_size:
+                    if not emit(pending[:self.batch_size]):
+                        return
+                    pending = pending[self.batch_size:]
+            if pending and not self._stop.is_set():
+                if self.length_bucket_batches:
+                    pending.sort(key=lambda entry: entry[0])
+                for i in range(0, len(pending), self.batch_size):
+                    if not emit(pending[i:i + self.batch_size]):
+                        return
+        except Exception as e:
+            self._fail("batch", e)
+        finally:
+            with self._lock:
+                self.stats["batches"] = batch_num
+            for _ in range(self.max_workers):
+                self._put(batch_q, _SENTINEL)
+
+    def _batch_done(self, batch: List, ids: List[str], stored: int) -> None:
+        """Updates counters and checkpoints once a batch was stored (or failed)"""
+        sources = Counter(c.metadata.get("source", "") for c in batch)
+        with self._lock:
+            self.stats["chunks_stored"] += stored
+            if stored and self.stats["first_write_seconds"] is None:
+                self.stats["first_write_seconds"] = time.time() - self._started
+            if stored < len(batch):
+                self.stats["failed_batches"] += 1
+                self.stats["chunks_failed"] += len(batch) - stored
+        if stored < len(batch):
+            # Files touching a failed batch stay incomplete and are retried on resume
+            self._tracker.failed(sources, ids)
+            return
+        self._files_complete(self._tracker.stored(sources, ids))
+        with self._lock:
+            self.stats["batches_stored"] += 1
+            snapshot = dict(self.stats)
+        if self.on_batch_stored:
+            self.on_batch_stored(snapshot)
+
+    def _batch_failed(self, batch: List, batch_num: int, ids: List[str], vectors) -> None:
+        """Queues a failed batch for the retry passes, or records it as failed"""
+        if not self.retry_attempts:
+            self._batch_done(batch, ids, 0)
+            return
+        with self._lock:
+            # Vectors of a failed write are kept so the retry only writes again
+            self._retry_queue.append((batch, batch_num, ids, vectors))
+
+    def _write(self, chunks: List, ids: List[str], vectors: List) -> int:
+        started = time.time()
+        stored = self.write_batch(chunks, ids, vectors)
+        with self._lock:
+            self.stats["write_seconds"] += time.time() - started
+            self.stats["writes"] += 1
+        return stored
+
+    def _retry_one(self, batch: List, batch_num: int, ids: List[str], vectors) -> bool:
+        if vectors is None:
+            vectors = self.embed_batch(batch, batch_num)
+            if vectors is None:
+                return False
+        return self._write(batch, ids, vectors) >= len(batch)
+
+    def _run_retries(self) -> None:
+        """
+        Retries failed batches after the stream is drained
+
+        Each pass waits longer than the previous one, giving a transient
+        outage (rate limit, locked database) time to clear. From the second
+        pass on, multi-chunk batches are split in half before retrying.
+        """
+        for attempt in range(1, self.retry_attempts + 1):
+            pending, self._retry_queue = self._retry_queue, []
+            if not pending:
+                return
+            time.sleep(self.retry_delay * attempt)
+            for batch, batch_num, ids, vectors in pending:
+                if attempt > 1 and len(batch) > 1:
+                    half = len(batch) // 2
+                    parts = [
+                        (batch[:half], batch_num, ids[:half], vectors[:half] if vectors else None),
+                        (batch[half:], batch_num, ids[half:], vectors[half:] if vectors else None),
+                    ]
+                    self._add_stat("split_batches", 1)
+                else:
+                    parts = [(batch, batch_num, ids, vectors)]
+                for part in parts:
+                    self._add_stat("retried_batches", 1)
+                    if self._retry_one(*part):
+                        self._add_stat("chunks_recovered", len(part[0]))
+                        self._batch_done(part[0], part[2], len(part[0]))
+                    else:
+                        self._retry_queue.append(part)
+        # Out of attempts: whatever is left is reported as missing
+        for batch, _, ids, _ in self._retry_queue:
+            self._batch_done(batch, ids, 0)
+        self._retry_queue = []
+
+    def _embed_stage(self, batch_q: queue.Queue, write_q: queue.Queue) -> None:
+        try:
+            while True:
+                item = self._get(batch_q)
+                if item is _SENTINEL:
+                    return
+                batch, batch_num, ids = item
+                started = time.time()
+                vectors = self.embed_batch(batch, batch_num)
+                self._add_stat("embed_seconds", time.time() - started)
+                if vectors is None:
+                    self._batch_failed(batch, batch_num, ids, None)
+                    continue
+                if not self._put(write_q, (batch, batch_num, ids, vectors)):
+                    return
+        except Exception as e:
+            self._fail("embed", e)
+
+    def _write_stage(self, write_q: queue.Queue) -> None:
+        # Batches that arrive while a write is in progress are merged into the
+        # next write, so a slow store gets fewer, larger inserts
+        done = False
+        try:
+            while not done:
+                item = self._get(write_q)
+                if item is _SENTINEL:
+                    return
+                group, size = [item], len(item[0])
+                while size < self.write_batch_size:
+                    try:
+                        item = write_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _SENTINEL:
+                        done = True
+                        break
+                    group.append(item)
+                    size += len(item[0])
+
+                chunks = [c for batch, _, _, _ in group for c in batch]
+                ids = [i for _, _, batch_ids, _ in group for i in batch_ids]
+                vectors = [v for _, _, _, batch_vectors in group for v in batch_vectors]
+                stored = self._write(chunks, ids, vectors)
+                for batch, batch_num, batch_ids, batch_vectors in group:
+                    # A write is all-or-nothing: a failure fails every merged batch
+                    if stored >= size:
+                        self._batch_done(batch, batch_ids, len(batch))
+                    else:
+                        self._batch_failed(batch, batch_num, batch_ids, batch_vectors)
+        except Exception as e:
+            self._fail("write", e)
+
+    def run(self, documents: Iterable) -> dict:
+        """
+        Runs every stage until the document iterable is exhausted
+
+        Args:
+            documents: Iterable of LangChain documents (consumed lazily)
+
+        Returns:
+            Dict with counters (documents, chunks, duplicate_chunks, tokens,
+            batches, writes, chunks_stored, chunks_failed, failed_batches,
+            retried_batches, split_batches, chunks_recovered,
+            files_completed),
+            per-stage busy time (embed_seconds and write_seconds are
+            measured separately) and first_write_seconds
+
+        Raises:
+            Exception: The first error raised by any stage
+        """
+        self._stop.clear()
+        self._errors = []
+        self._retry_queue = []
+        self.stats = {
+            "documents": 0,
+            "chunks": 0,
+            "duplicate_chunks": 0,
+            "truncated_chunks": 0,
+            "tokens": 0,
+            "batches": 0,
+            "batches_stored": 0,
+            "chunks_stored": 0,
+            "chunks_failed": 0,
+            "failed_batches": 0,
+            "retried_batches": 0,
+            "split_batches": 0,
+            "chunks_recovered": 0,
+            "files_completed": 0,
+            "split_seconds": 0.0,
+            "count_seconds": 0.0,
+            "embed_seconds": 0.0,
+            "writes": 0,
+            "write_seconds": 0.0,
+            "first_write_seconds": None,
+            "elapsed_seconds": 0.0
+        }
+        self._started = time.time()
+        self._tracker = _SourceTracker(track_outcomes=self.deduplicator is not None)
+
+        doc_q = queue.Queue(maxsize=self.queue_depth)
+        chunk_q = queue.Queue(maxsize=self.queue_depth)
+        batch_q = queue.Queue(maxsize=self.queue_depth)
+        write_q = queue.Queue(maxsize=self.queue_depth)
+
+        threads = [
+            threading.Thread(target=self._load_stage, args=(documents, doc_q), name="index-load", daemon=True),
+            threading.Thread(target=self._split_stage, args=(doc_q, chunk_q), name="index-split", daemon=True),
+            threading.Thread(target=self._batch_stage, args=(chunk_q, batch_q), name="index-batch", daemon=True),
+        ]
+        threads += [
+            threading.Thread(target=self._embed_stage, args=(batch_q, write_q), name=f"index-embed-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        writer = threading.Thread(target=self._write_stage, args=(write_q,), name="index-write", daemon=True)
+        writer.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Every embedding worker has finished, so nothing else reaches the writer
+        self._put(write_q, _SENTINEL)
+        writer.join()
+
+        if not self._errors:
+            try:
+                self._run_retries()
+            except Exception as e:
+                self._fail("retry", e)
+
+        self.stats["elapsed_seconds"] = time.time() - self._started
+        if self._errors:
+            stage, error = self._errors[0]
+            raise Exception(f"Indexing pipeline failed in '{stage}' stage: {error}") from error
+        return self.stats
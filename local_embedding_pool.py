@@ -0,0 +1,179 @@
+"""
+Process-pool embedding engine for sentence-transformers models
+
+Threads calling a single in-process model contend on the GIL and on torch's
+intra-op thread pool, so adding indexing workers barely raises throughput.
+This engine spawns N worker processes, each loading its own copy of the
+model with a pinned torch thread count. Vectors are written by the workers
+into shared-memory float32 buffers allocated by the parent, so results are
+not pickled back element by element.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def load_sentence_transformer(model_name: str, device: str):
+    """Default model factory (runs inside the worker process)"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def _init_worker(model_factory: Callable, model_name: str, device: str, torch_threads: int) -> None:
+    """Pins thread counts and loads the model once per worker process"""
+    global _worker_model
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TOKENIZERS_PARALLELISM"):
+        os.environ[var] = "false" if var == "TOKENIZERS_PARALLELISM" else str(torch_threads)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_model = model_factory(model_name, device)
+
+
+def _worker_dimension() -> int:
+    return int(_worker_model.get_sentence_embedding_dimension())
+
+
+def _worker_tokenizer():
+    return _worker_model.tokenizer, int(_worker_model.max_seq_length)
+
+
+def _worker_embed(texts: List[str], shm_name: str, dimension: int, normalize: bool, encode_batch_size: int) -> int:
+    """Encodes texts and writes the vectors into the parent's shared-memory buffer"""
+    vectors = _worker_model.encode(
+        texts,
+        batch_size=encode_batch_size,
+        normalize_embeddings=normalize,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+    shm = SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf)
+        out[:] = vectors
+        del out
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class LocalEmbeddingPool(Embeddings):
+    """LangChain Embeddings backed by a pool of model-holding worker processes"""
+
+    # Same vectors as the in-process HuggingFace/SentenceTransformer embeddings,
+    # so the embedding cache can share entries with them
+    embedding_family = "HuggingFaceEmbeddings"
+
+    def __init__(
+        self,
+        model_name: str,
+        num_workers: int,
+        torch_threads: int = 1,
+        normalize: bool = True,
+        device: str = "cpu",
+        encode_batch_size: int = 32,
+        model_factory: Callable = load_sentence_transformer
+    ):
+        """
+        Args:
+            model_name: sentence-transformers model name
+            num_workers: Number of worker processes (one model copy each)
+            torch_threads: torch intra-op threads per worker
+            normalize: Normalize embeddings (matches encode_kwargs of the in-process provider)
+            device: Torch device for the workers
+            encode_batch_size: Batch size passed to model.encode
+            model_factory: Picklable callable(model_name, device) returning a model
+        """
+        self.model_name = model_name
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = max(1, torch_threads)
+        self.encode_kwargs = {"normalize_embeddings": normalize}
+        self.device = device
+        self.encode_batch_size = encode_batch_size
+        self.model_factory = model_factory
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._executor is not None:
+                return
+            # spawn: forking a process that already runs threads (and torch) is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_factory, self.model_name, self.device, self.torch_threads)
+            )
+            self._dimension = self._executor.submit(_worker_dimension).result()
+            print(
+                f">>> Embedding pool started: {self.num_workers} processes x "
+                f"{self.torch_threads} torch threads ({self.model_name}, dim={self._dimension})",
+                flush=True
+            )
+
+    def tokenizer_info(self):
+        """(tokenizer, max_seq_length) of the worker model, to size chunks in model tokens"""
+        self._ensure_started()
+        return self._executor.submit(_worker_tokenizer).result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        self._ensure_started()
+
+        # Spread one call over several workers so a single large batch is not
+        # serialized. Texts are dealt round-robin in length order, so every
+        # worker gets a similar mix of short and long texts (model.encode
+        # length-sorts each slice itself before padding)
+        parts = min(self.num_workers, math.ceil(len(texts) / self.encode_batch_size))
+        by_length = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        positions = [by_length[p::parts] for p in range(parts)]
+        slices = [[texts[i] for i in part] for part in positions]
+
+        buffers = []
+        try:
+            futures = []
+            for part in slices:
+                shm = SharedMemory(create=True, size=len(part) * self._dimension * 4)
+                buffers.append(shm)
+                futures.append(self._executor.submit(
+                    _worker_embed, part, shm.name, self._dimension,
+                    self.encode_kwargs["normalize_embeddings"], self.encode_batch_size
+                ))
+            vectors = [None] * len(texts)
+            for part, shm, future in zip(positions, buffers, futures):
+                future.result()
+                array = np.ndarray((len(part), self._dimension), dtype=np.float32, buffer=shm.buf)
+                # Restore input order
+                for i, vector in zip(part, array.tolist()):
+                    vectors[i] = vector
+                del array
+            return vectors
+        finally:
+            for shm in buffers:
+                shm.close()
+                shm.unlink()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self) -> None:
+        """Stops the worker processes"""
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
@@ -1,21 +1,27 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
 from contextlib import asynccontextmanager
 from collections import defaultdict
 from langchain_chroma import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
 import asyncio
 
 from models import RetrieveRequest, DocumentFragment, RetrieveResponse
-from repo_utils import get_repo_name_from_url, clone_repo
+from repo_utils import (
+    get_repo_name_from_url, clone_repo, get_head_commit, fetch_branch,
+    ensure_commit_available, get_changed_files
+)
+from index_state import BuildManifest, load_index_state, get_indexed_commit
 from document_loader import load_documents_robustly, EXTENSOES_SUPORTADAS
-from token_utils import count_tokens, estimate_embedding_cost
-from report_utils import generate_extension_report, generate_token_report
+from token_utils import estimate_embedding_cost, get_token_budget
+from report_utils import generate_extension_report, generate_token_report, generate_cache_report
 from embedding_config import EmbeddingProvider
-from embedding_optimizer import get_optimal_config, get_processing_strategy, estimate_processing_time
+from embedding_cache import CachedEmbeddings, get_cached_embeddings
+from auth import verify_api_key
+from embedding_optimizer import get_streaming_config, get_processing_strategy
+from indexing_pipeline import IndexingPipeline, make_chunk_id
+from chunk_dedup import ChunkDeduplicator
+from chunking import LanguageAwareSplitter, parse_chunk_sizes
 
 # --- CONFIGURATION FROM ENVIRONMENT VARIABLES ---
 REPO_URL = os.environ.get("REPO_URL")
@@ -30,10 +36,73 @@ REPO_NAME = get_repo_name_from_url(REPO_URL)
 LOCAL_REPO_PATH = f"/app/repos/{REPO_NAME}" 
 DB_PATH = f"/app/chroma_db/{REPO_NAME}"
 
+# Incremental re-indexing: on startup, update an existing index from `git diff`
+INCREMENTAL_REINDEX = os.getenv("INCREMENTAL_REINDEX", "true").lower() in ("1", "true", "yes")
+DELETE_BATCH_SIZE = 500
+
+# Progressive serving: answer queries once this many batches are stored (0 = wait for full index)
+PROGRESSIVE_SERVING_BATCHES = int(os.getenv("PROGRESSIVE_SERVING_BATCHES", "0"))
+
+# Chunks per bulk upsert issued by the single vector store writer
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "2000"))
+
+# Local models: batch chunks of similar token length within windows of this many batches (0 = file order)
+LENGTH_BUCKET_BATCHES = int(os.getenv("LENGTH_BUCKET_BATCHES", "4"))
+
+# Duplicate chunks are embedded once; NEAR_DEDUP_THRESHOLD > 0 also drops MinHash near-duplicates
+CHUNK_DEDUP = os.getenv("CHUNK_DEDUP", "true").lower() in ("1", "true", "yes")
+NEAR_DEDUP_THRESHOLD = float(os.getenv("NEAR_DEDUP_THRESHOLD", "0"))
+
+# Comma-separated globs: only matching files are indexed / matching trees are pruned
+# (unset exclude = document_loader.DEFAULT_EXCLUDE_GLOBS, empty = prune nothing)
+INCLUDE_GLOBS = [g.strip() for g in os.getenv("INCLUDE_GLOBS", "").split(",") if g.strip()]
+EXCLUDE_GLOBS = (
+    [g.strip() for g in os.environ["EXCLUDE_GLOBS"].split(",") if g.strip()]
+    if "EXCLUDE_GLOBS" in os.environ else None
+)
+
+# PDFs are parsed in separate processes with a per-file timeout and memory cap (0 workers = loader threads)
+HEAVY_PARSER_WORKERS = int(os.getenv("HEAVY_PARSER_WORKERS")) if os.getenv("HEAVY_PARSER_WORKERS") else None
+HEAVY_PARSER_TIMEOUT = float(os.getenv("HEAVY_PARSER_TIMEOUT", "120"))
+HEAVY_PARSER_MEMORY_MB = int(os.getenv("HEAVY_PARSER_MEMORY_MB", "2048"))
+
+# Clone without a working tree and read files straight from the git object database
+GIT_BLOB_INGEST = os.getenv("GIT_BLOB_INGEST", "false").lower() in ("1", "true", "yes")
+
+# Load files in a fixed order (largest first) instead of completion order, for reproducible indexes
+LOADER_ORDERED = os.getenv("LOADER_ORDERED", "false").lower() in ("1", "true", "yes")
+
+# Skip lockfiles, minified and generated files (name patterns, header markers, line length)
+SKIP_LOW_VALUE_FILES = os.getenv("SKIP_LOW_VALUE_FILES", "true").lower() in ("1", "true", "yes")
+
+# Per-language chunk sizes, e.g. "python=2000:250,markdown=1000" (size[:overlap]; "default" = other files)
+CHUNK_SIZES = parse_chunk_sizes(os.getenv("CHUNK_SIZES", ""))
+# Python files: one chunk per function/class from the syntax tree, with symbol/kind/line metadata
+PYTHON_AST_CHUNKING = os.getenv("PYTHON_AST_CHUNKING", "true").lower() in ("1", "true", "yes")
+# Keep chunks within the embedding model's input length, in its own tokens:
+# 'auto' = the model's limit (max_seq_length / 8191 for OpenAI), a number = lower cap, 'off' = characters only
+CHUNK_TOKEN_BUDGET = os.getenv("CHUNK_TOKEN_BUDGET", "auto").lower()
+# Processes splitting documents into chunks while loading and embedding continue (0 = the pipeline's split thread)
+SPLIT_WORKERS = int(os.getenv("SPLIT_WORKERS")) if os.getenv("SPLIT_WORKERS") else min(4, os.cpu_count() or 1)
+
+LOADER_OPTIONS = {
+    "include_globs": INCLUDE_GLOBS,
+    "exclude_globs": EXCLUDE_GLOBS,
+    "heavy_workers": HEAVY_PARSER_WORKERS,
+    "heavy_timeout": HEAVY_PARSER_TIMEOUT,
+    "heavy_memory_mb": HEAVY_PARSER_MEMORY_MB,
+    "ordered": LOADER_ORDERED,
+    "skip_low_value": SKIP_LOW_VALUE_FILES
+}
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await asyncio.to_thread(index_repository)
+    if PROGRESSIVE_SERVING_BATCHES > 0:
+        # Accept HTTP connections right away; /retrieve opens once enough batches are stored
+        app.state.indexing_task = asyncio.create_task(asyncio.to_thread(run_background_indexing))
+    else:
+        await asyncio.to_thread(index_repository)
     yield
     # Shutdown - cleanup if necessary
     pass
@@ -54,6 +123,463 @@ discarded_extensions = defaultdict(int)
 total_tokens_generated = 0
 
 server_ready = False  # Flag global
+refresh_lock = threading.Lock()
+
+# Progress of the build currently serving queries (partial = still indexing,
+# error = why the background build failed, incomplete = the build finished
+# with failed batches and its manifest is still unfinished)
+index_progress = {"partial": False, "files_total": 0, "files_indexed": 0, "error": None, "incomplete": False}
+
+def is_index_partial():
+    """True while queries are answered from an index missing some files"""
+    return bool(index_progress["partial"] or index_progress["error"] or index_progress["incomplete"])
+
+def sync_index_completeness():
+    """Flags the index as incomplete until a build marks its manifest complete"""
+    index_progress["incomplete"] = BuildManifest(DB_PATH).is_building()
+
+def get_indexed_fraction():
+    """Fraction of files indexed so far (1.0 once the index is complete)"""
+    if not is_index_partial():
+        return 1.0
+    if not index_progress["files_total"]:
+        return 0.0
+    return round(min(1.0, index_progress["files_indexed"] / index_progress["files_total"]), 4)
+
+def enable_partial_serving(vectorstore):
+    """Starts answering queries from an index that is still being built"""
+    global retriever, server_ready
+    if server_ready:
+        return
+    retriever = vectorstore.as_retriever()
+    index_progress["partial"] = True
+    server_ready = True
+    print(f">>> Serving queries from partial index ({get_indexed_fraction():.1%} of files indexed)", flush=True)
+
+def make_batch_embedder(vectorstore):
+    """Returns an embed_batch(batch, batch_num) callable suited to the embedding provider"""
+    is_openai = EMBEDDING_PROVIDER == "openai"
+    embeddings = vectorstore.embeddings
+
+    def embed_batch(batch, batch_num):
+        """Rate limits, concurrency and retries live in the embeddings client (OpenAI) or pool (local)"""
+        total_chars = sum(len(doc.page_content) for doc in batch)
+        print(f"  -> Batch {batch_num} ({len(batch)} docs, ~{total_chars} chars)...", flush=True)
+        if is_openai:
+            print("     Sending to OpenAI API...", flush=True)
+        try:
+            vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+            print(f"     ✅ Batch {batch_num} embedded!", flush=True)
+            return vectors
+        except Exception as e:
+            print(f"     ❌ ERROR in batch {batch_num}: {e}", flush=True)
+            return None
+
+    return embed_batch
+
+def make_batch_writer(vectorstore):
+    """Returns a write_batch(chunks, ids, vectors) callable doing bulk upserts into Chroma"""
+    collection = vectorstore._collection
+
+    def write_batch(chunks, ids, vectors):
+        try:
+            collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                documents=[doc.page_content for doc in chunks],
+                # Chroma rejects empty metadata dicts
+                metadatas=[doc.metadata or None for doc in chunks]
+            )
+            print(f"     💾 Stored {len(chunks)} chunks", flush=True)
+            return len(chunks)
+        except Exception as e:
+            print(f"     ❌ ERROR storing {len(chunks)} chunks: {e}", flush=True)
+            return 0
+
+    return write_batch
+
+def get_write_batch_size(vectorstore):
+    """WRITE_BATCH_SIZE capped by the largest batch the Chroma client accepts"""
+    try:
+        return min(WRITE_BATCH_SIZE, vectorstore._client.get_max_batch_size())
+    except Exception:
+        return WRITE_BATCH_SIZE
+
+def resolve_token_budget(vectorstore):
+    """Returns the embedding model's TokenBudget per CHUNK_TOKEN_BUDGET, or None to size chunks by characters only"""
+    if CHUNK_TOKEN_BUDGET in ("off", "false", "no", "0"):
+        return None
+    try:
+        budget = get_token_budget(
+            vectorstore.embeddings, EMBEDDING_PROVIDER,
+            max_tokens=None if CHUNK_TOKEN_BUDGET == "auto" else int(CHUNK_TOKEN_BUDGET)
+        )
+    except Exception as e:
+        print(f">>> AVISO: could not load the embedding model's tokenizer, chunks sized by characters only: {e}", flush=True)
+        return None
+    if budget is not None:
+        print(f">>> Chunk token budget: {budget.max_tokens} tokens ({budget.name or EMBEDDING_PROVIDER})", flush=True)
+    return budget
+
+def build_text_splitter(token_budget=None):
+    """Returns the splitter used to chunk documents before embedding (separators chosen per language)"""
+    return LanguageAwareSplitter(sizes=CHUNK_SIZES, python_ast=PYTHON_AST_CHUNKING, token_budget=token_budget)
+
+def index_documents(vectorstore, documents, on_files_complete=None, on_batch_stored=None):
+    """
+    Streams documents through split → token count → embed → bulk write
+
+    Documents are consumed lazily, so the first vectors are stored while
+    the repository is still being loaded and memory stays bounded by the
+    pipeline's queue depth.
+
+    Args:
+        vectorstore: Chroma instance receiving the chunks
+        documents: Iterable of loaded documents
+        on_files_complete: Optional checkpoint callback (see IndexingPipeline)
+        on_batch_stored: Optional progress callback (see IndexingPipeline)
+
+    Returns:
+        Pipeline statistics (documents, chunks, tokens, batches, timings)
+    """
+    global total_tokens_generated
+
+    batch_size, max_workers, queue_depth = get_streaming_config(EMBEDDING_PROVIDER)
+    print(f">>> Streaming configuration: batch_size={batch_size}, workers={max_workers}, queue_depth={queue_depth}", flush=True)
+    deduplicator = ChunkDeduplicator(NEAR_DEDUP_THRESHOLD) if CHUNK_DEDUP else None
+    strategy = get_processing_strategy(EMBEDDING_PROVIDER)
+    token_budget = resolve_token_budget(vectorstore)
+
+    pipeline = IndexingPipeline(
+        text_splitter=build_text_splitter(token_budget),
+        batch_size=batch_size,
+        max_workers=max_workers,
+        embed_batch=make_batch_embedder(vectorstore),
+        write_batch=make_batch_writer(vectorstore),
+        write_batch_size=get_write_batch_size(vectorstore),
+        queue_depth=queue_depth,
+        token_count_method=TOKEN_COUNT_METHOD,
+        # API providers bill per token, not per padded sequence
+        length_bucket_batches=LENGTH_BUCKET_BATCHES if EMBEDDING_PROVIDER in ("sentence-transformers", "huggingface") else 0,
+        deduplicator=deduplicator,
+        token_budget=token_budget,
+        split_workers=SPLIT_WORKERS,
+        retry_attempts=strategy["retry_attempts"],
+        retry_delay=strategy["retry_delay"],
+        on_files_complete=on_files_complete,
+        on_batch_stored=on_batch_stored
+    )
+    stats = pipeline.run(documents)
+    total_tokens_generated += stats["tokens"]
+
+    first_write = stats["first_write_seconds"]
+    print(
+        f">>> Indexed {stats['documents']} documents → {stats['chunks']} chunks "
+        f"({stats['chunks_stored']} stored) in {stats['batches']} batches, "
+        f"{stats['elapsed_seconds']:.1f}s total"
+        + (f", first vectors stored after {first_write:.1f}s" if first_write is not None else ""),
+        flush=True
+    )
+    print(
+        f">>> Embedding: {stats['embed_seconds']:.1f}s across workers | "
+        f"Writing: {stats['write_seconds']:.1f}s in {stats['writes']} bulk upserts",
+        flush=True
+    )
+    if deduplicator is not None and stats["duplicate_chunks"]:
+        record_duplicate_sources(vectorstore, deduplicator.duplicate_copies())
+        print(
+            f">>> Skipped {stats['duplicate_chunks']} duplicate chunks "
+            f"({deduplicator.exact_duplicates} exact, {deduplicator.near_duplicates} near)",
+            flush=True
+        )
+    if stats["truncated_chunks"]:
+        print(
+            f">>> AVISO: {stats['truncated_chunks']} chunks exceed the model's {token_budget.max_tokens}-token input "
+            f"and are truncated when embedded",
+            flush=True
+        )
+    if stats["retried_batches"]:
+        print(
+            f">>> Retried {stats['retried_batches']} batches ({stats['split_batches']} split), "
+            f"recovered {stats['chunks_recovered']} chunks",
+            flush=True
+        )
+    if stats["failed_batches"]:
+        print(
+            f">>> AVISO: {stats['failed_batches']} batches failed after {strategy['retry_attempts']} retries "
+            f"({stats['chunks_failed']} chunks missing from the index)",
+            flush=True
+        )
+    return stats
+
+def _duplicate_metadata(copies):
+    """Metadata describing every copy of a shared chunk ((source, chunk id, near) tuples, stored copy first)"""
+    return {
+        "duplicate_sources": "\n".join(source for source, _, _ in copies),
+        "duplicate_ids": "\n".join(chunk_id for _, chunk_id, _ in copies),
+        "near_duplicate_sources": "\n".join(source for source, _, near in copies if near),
+        "duplicate_count": len(copies)
+    }
+
+def _stored_copies(chunk_id, metadata):
+    """Parses the copies recorded by _duplicate_metadata"""
+    sources = metadata["duplicate_sources"].split("\n")
+    ids = metadata.get("duplicate_ids", "").split("\n")
+    if len(ids) != len(sources):
+        # Recorded before copy ids were kept: derive one from each copy's path
+        ids = [chunk_id] + [make_chunk_id(source, chunk_id, 0) for source in sources[1:]]
+    near = set(filter(None, metadata.get("near_duplicate_sources", "").split("\n")))
+    return [(source, copy_id, source in near) for source, copy_id in zip(sources, ids)]
+
+def record_duplicate_sources(vectorstore, duplicate_copies):
+    """Stores the paths and chunk ids of every copy in the metadata of each deduplicated chunk"""
+    items = list(duplicate_copies.items())
+    for i in range(0, len(items), DELETE_BATCH_SIZE):
+        batch = items[i:i + DELETE_BATCH_SIZE]
+        try:
+            # update merges keys into the existing metadata ('source' stays the first copy)
+            vectorstore._collection.update(
+                ids=[chunk_id for chunk_id, _ in batch],
+                metadatas=[_duplicate_metadata(copies) for _, copies in batch]
+            )
+        except Exception as e:
+            print(f">>> AVISO: could not record duplicate sources: {e}", flush=True)
+
+def delete_sources(vectorstore, sources):
+    """
+    Removes every chunk whose 'source' metadata is one of the given paths
+
+    Removed paths are also dropped from the copies recorded on shared
+    chunks. A shared chunk whose stored copy is removed moves to a
+    remaining exact copy, under the id that copy's own chunk would have,
+    so re-adding the removed file later cannot overwrite it. Near-duplicate
+    copies were never stored with their own text: their chunks are deleted
+    too and their paths returned so the caller re-indexes them.
+
+    Returns:
+        Paths (not among sources) that must be re-indexed
+    """
+    collection = vectorstore._collection
+    removed, reindex = set(), []
+    pending = list(dict.fromkeys(sources))
+    while pending:
+        removing = set(pending)
+        removed |= removing
+        moved = []
+        shared = collection.get(where={"duplicate_count": {"$gt": 1}}, include=["metadatas"])
+        for chunk_id, metadata in zip(shared["ids"], shared["metadatas"]):
+            copies = _stored_copies(chunk_id, metadata)
+            if not any(source in removing for source, _, _ in copies):
+                continue
+            if metadata["source"] not in removing:
+                collection.update(ids=[chunk_id], metadatas=[
+                    _duplicate_metadata([copy for copy in copies if copy[0] not in removing])
+                ])
+                continue
+            # The stored copy goes away with its source below
+            remaining = [copy for copy in copies[1:] if copy[0] not in removed]
+            reindex += [source for source, _, near in remaining if near and source not in reindex]
+            exact = [copy for copy in remaining if not copy[2]]
+            if exact:
+                moved.append((chunk_id, exact))
+        if moved:
+            stored = collection.get(
+                ids=[chunk_id for chunk_id, _ in moved], include=["metadatas", "documents", "embeddings"]
+            )
+            by_id = {
+                chunk_id: (metadata, document, embedding)
+                for chunk_id, metadata, document, embedding
+                in zip(stored["ids"], stored["metadatas"], stored["documents"], stored["embeddings"])
+            }
+        for i in range(0, len(pending), DELETE_BATCH_SIZE):
+            collection.delete(where={"source": {"$in": pending[i:i + DELETE_BATCH_SIZE]}})
+        for chunk_id, exact in moved:
+            metadata, document, embedding = by_id[chunk_id]
+            new_source, new_id, _ = exact[0]
+            metadata = {**metadata, "source": new_source, **_duplicate_metadata(exact)}
+            collection.upsert(ids=[new_id], embeddings=[embedding], documents=[document], metadatas=[metadata])
+        # Near copies re-indexed from scratch: drop their own chunks and recorded copies as well
+        pending = [source for source in reindex if source not in removed]
+    return reindex
+
+def record_indexed_commit(repo_branch):
+    """Marks the index complete at the commit it now reflects"""
+    commit = get_head_commit(LOCAL_REPO_PATH)
+    BuildManifest(DB_PATH).complete(commit, repo_branch)
+    if commit:
+        print(f">>> Index recorded at commit {commit[:12]}", flush=True)
+
+def build_index(vectorstore, repo_branch, resume=False):
+    """
+    Indexes the whole working tree, checkpointing progress in the build manifest
+
+    Every file whose chunks are all stored is appended to the manifest, so a
+    build interrupted by a crash resumes with the remaining files instead of
+    starting over. The index is only marked complete when no batch failed;
+    otherwise the next start resumes with the files of the failed batches.
+
+    Args:
+        vectorstore: Chroma instance receiving the chunks
+        repo_branch: Branch being indexed
+        resume: Continue a previous build recorded in the manifest
+
+    Returns:
+        Pipeline statistics
+    """
+    manifest = BuildManifest(DB_PATH)
+    commit = get_head_commit(LOCAL_REPO_PATH)
+    completed = manifest.load_completed() if resume else set()
+
+    previous_commit = manifest.state.get("commit")
+    if resume and previous_commit and commit and previous_commit != commit:
+        # The clone moved since the interrupted build: files it already
+        # stored may have changed, so drop them from the completed set
+        if ensure_commit_available(LOCAL_REPO_PATH, previous_commit):
+            changes = get_changed_files(LOCAL_REPO_PATH, previous_commit, commit)
+            stale = [
+                os.path.abspath(os.path.join(LOCAL_REPO_PATH, rel))
+                for rel in changes["modified"] + changes["deleted"]
+            ]
+            stale += delete_sources(vectorstore, stale)
+            manifest.forget_files(stale)
+            completed.difference_update(stale)
+        else:
+            vectorstore.reset_collection()
+            completed = set()
+            resume = False
+
+    if resume:
+        print(f">>> Resuming interrupted build: {len(completed)} files already indexed", flush=True)
+    manifest.start(commit, repo_branch, resume=resume)
+
+    load_progress = {}
+    already_indexed = len(completed)
+
+    def on_batch_stored(batch_stats):
+        index_progress["files_total"] = already_indexed + load_progress.get("files_total", 0)
+        index_progress["files_indexed"] = already_indexed + batch_stats["files_completed"]
+        if PROGRESSIVE_SERVING_BATCHES and batch_stats["batches_stored"] >= PROGRESSIVE_SERVING_BATCHES:
+            enable_partial_serving(vectorstore)
+
+    documents = load_documents_robustly(
+        LOCAL_REPO_PATH, processed_extensions, discarded_extensions,
+        exclude_paths=completed, progress=load_progress,
+        git_ref=(commit or "HEAD") if GIT_BLOB_INGEST else None, **LOADER_OPTIONS
+    )
+    try:
+        stats = index_documents(
+            vectorstore, documents,
+            on_files_complete=manifest.mark_files_complete,
+            on_batch_stored=on_batch_stored
+        )
+    finally:
+        manifest.close()
+
+    if not stats["documents"] and not resume:
+        # Leave the build unfinished so the next start tries again
+        raise Exception("No documents loaded. Check file patterns.")
+
+    if stats["failed_batches"]:
+        manifest.update(failed_batches=stats["failed_batches"], chunks_failed=stats["chunks_failed"])
+        print(">>> AVISO: Index left incomplete - failed files will be retried on next start", flush=True)
+    else:
+        record_indexed_commit(repo_branch)
+    return stats
+
+def refresh_index(vectorstore):
+    """
+    Brings an existing index up to date with the remote branch
+
+    Fetches the branch, diffs the indexed commit against the new HEAD and
+    re-embeds only added/modified files, deleting chunks of modified and
+    removed ones. Falls back to a full rebuild of the collection when the
+    indexed commit cannot be diffed (unknown or no longer fetchable). An
+    unfinished build (crashed, or ended with failed batches) is resumed
+    instead: its recorded commit does not describe what the index holds.
+
+    Returns:
+        Dict summarizing what was done
+    """
+    repo_branch = os.getenv("REPO_BRANCH", "main")
+    state = load_index_state(DB_PATH)
+    old_commit = state.get("commit")
+
+    clone_repo(
+        REPO_URL, repo_branch, LOCAL_REPO_PATH,
+        github_token=os.getenv("GITHUB_TOKEN"), checkout=not GIT_BLOB_INGEST
+    )
+    new_commit = fetch_branch(LOCAL_REPO_PATH, repo_branch, checkout=not GIT_BLOB_INGEST)
+
+    if BuildManifest(DB_PATH).is_building():
+        print(">>> Previous build unfinished - resuming it instead of diffing", flush=True)
+        stats = build_index(vectorstore, repo_branch, resume=True)
+        chunks_missing = stats.get("chunks_failed", 0)
+        return {
+            "status": "resumed" if not chunks_missing else "incomplete",
+            "old_commit": old_commit,
+            "new_commit": new_commit,
+            "chunks_indexed": stats["chunks"],
+            "chunks_missing": chunks_missing
+        }
+
+    if old_commit and old_commit == new_commit and state.get("branch", repo_branch) == repo_branch:
+        print(f">>> Index is up to date with {repo_branch}@{new_commit[:12]}", flush=True)
+        return {"status": "up_to_date", "old_commit": old_commit, "new_commit": new_commit}
+
+    if old_commit and ensure_commit_available(LOCAL_REPO_PATH, old_commit):
+        changes = get_changed_files(LOCAL_REPO_PATH, old_commit, new_commit)
+        to_delete = changes["modified"] + changes["deleted"]
+        to_index = changes["added"] + changes["modified"]
+        print(
+            f">>> Incremental re-index {old_commit[:12]}..{new_commit[:12]}: "
+            f"{len(changes['added'])} added, {len(changes['modified'])} modified, "
+            f"{len(changes['deleted'])} deleted",
+            flush=True
+        )
+        reindex = delete_sources(
+            vectorstore,
+            [os.path.abspath(os.path.join(LOCAL_REPO_PATH, rel)) for rel in to_delete]
+        )
+        # Near-duplicate copies of deleted chunks get chunks of their own
+        to_index += [os.path.relpath(path, LOCAL_REPO_PATH) for path in reindex]
+    else:
+        print(">>> Indexed commit unavailable - rebuilding the whole collection", flush=True)
+        # Mark the build as in progress first so a crash resumes the rebuild
+        BuildManifest(DB_PATH).start(new_commit, repo_branch)
+        vectorstore.reset_collection()
+        stats = build_index(vectorstore, repo_branch)
+        return {
+            "status": "rebuilt",
+            "old_commit": old_commit,
+            "new_commit": new_commit,
+            "chunks_indexed": stats["chunks"],
+            "chunks_missing": stats.get("chunks_failed", 0)
+        }
+
+    stats = {"chunks": 0}
+    if to_index:
+        documents = load_documents_robustly(
+            LOCAL_REPO_PATH, processed_extensions, discarded_extensions,
+            file_paths=to_index, git_ref=new_commit if GIT_BLOB_INGEST else None, **LOADER_OPTIONS
+        )
+        stats = index_documents(vectorstore, documents)
+
+    chunks_missing = stats.get("chunks_failed", 0)
+    if chunks_missing:
+        # Keep the old commit so the next refresh diffs (and re-indexes) these files again
+        print(f">>> {chunks_missing} chunks missing - commit not recorded, next refresh retries", flush=True)
+    else:
+        record_indexed_commit(repo_branch)
+
+    summary = {
+        "status": "updated" if not chunks_missing else "incomplete",
+        "old_commit": old_commit,
+        "new_commit": new_commit,
+        "chunks_indexed": stats["chunks"],
+        "chunks_missing": chunks_missing
+    }
+    summary.update({kind: len(paths) for kind, paths in changes.items()})
+    return summary
 
 def index_repository():
     global vectorstore, retriever, total_tokens_generated, server_ready
@@ -77,9 +603,16 @@ def index_repository():
         print("Tentando fallback para sentence-transformers...", flush=True)
         embeddings = EmbeddingProvider.get_embeddings("sentence-transformers")
 
-    if not os.path.exists(DB_PATH):
+    embeddings = get_cached_embeddings(embeddings)
+
+    resume = os.path.exists(DB_PATH) and BuildManifest(DB_PATH).is_building()
+
+    if not os.path.exists(DB_PATH) or resume:
         print("\n" + "="*60, flush=True)
-        print("STARTING INDEXATION PROCESS (FIRST RUN)", flush=True)
+        if resume:
+            print("RESUMING INTERRUPTED INDEXATION PROCESS", flush=True)
+        else:
+            print("STARTING INDEXATION PROCESS (FIRST RUN)", flush=True)
         print(f"Repository: {REPO_NAME}", flush=True)
         print("="*60, flush=True)
 
@@ -90,152 +623,139 @@ def index_repository():
         if github_token:
             print(">>> GitHub token detected - will use for authentication", flush=True)
         
-        clone_repo(REPO_URL, repo_branch, LOCAL_REPO_PATH, github_token=github_token)
-
-        documents = list(load_documents_robustly(LOCAL_REPO_PATH, processed_extensions, discarded_extensions))
-        if not documents:
-            raise Exception("No documents loaded. Check file patterns.")
-
-        print(f">>> SUCCESS: Step 1 completed.", flush=True)
-
-        print("\n--- STEP 2 of 3: Splitting Documents ---", flush=True)
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
-        chunks = text_splitter.split_documents(documents)
-        print(f">>> SUCCESS: Documents split into {len(chunks)} chunks.", flush=True)
-
-        # Efficient counting de tokens
-        print(">>> Calculating tokens...", flush=True)
-        total_tokens_generated = sum(count_tokens(doc.page_content, TOKEN_COUNT_METHOD) for doc in chunks)
-        
-        # Cost estimation
-        cost_info = estimate_embedding_cost(total_tokens_generated, EMBEDDING_PROVIDER)
-        print(f">>> Total estimated tokens: {total_tokens_generated}", flush=True)
-        print(f">>> Estimated cost: {cost_info}", flush=True)
+        clone_repo(REPO_URL, repo_branch, LOCAL_REPO_PATH, github_token=github_token, checkout=not GIT_BLOB_INGEST)
 
-        print("\n--- STEP 3 of 3: Generating and Storing Embeddings ---", flush=True)
+        print("\n--- STEPS 2-3 of 3: Splitting, Embedding and Storing (streaming) ---", flush=True)
         vectorstore = Chroma(
             persist_directory=DB_PATH,
             embedding_function=embeddings
         )
 
-        # Configuration otimizada baseada no provedor e recursos
-        batch_size, max_workers = get_optimal_config(EMBEDDING_PROVIDER, len(chunks))
-        strategy = get_processing_strategy(EMBEDDING_PROVIDER)
-        
-        # Estimar tempo de processamento
-        avg_doc_size = sum(len(doc.page_content) for doc in chunks) // len(chunks)
-        time_estimate = estimate_processing_time(EMBEDDING_PROVIDER, len(chunks), avg_doc_size)
-        
-        print(f">>> Optimized configuration: batch_size={batch_size}, workers={max_workers}", flush=True)
-        print(f">>> Estimated time: {time_estimate['estimated_time_str']}", flush=True)
-        
-        is_openai = EMBEDDING_PROVIDER == "openai"
-        TOKEN_LIMIT_PER_MINUTE = strategy.get("token_limit_per_minute")
-
-        total_batches = (len(chunks) - 1) // batch_size + 1
-        tokens_this_minute = 0
-        minute_start = time.time()
-
-        def send_batch_openai(batch, batch_num, total_batches, total_chars):
-            """Version with rate limiting for OpenAI"""
-            nonlocal tokens_this_minute, minute_start
-            batch_tokens = sum(count_tokens(doc.page_content, "local") for doc in batch)
-
-            # Wait if exceeding token limit per minute
-            while tokens_this_minute + batch_tokens > TOKEN_LIMIT_PER_MINUTE:
-                elapsed = time.time() - minute_start
-                if elapsed < 60:
-                    wait_time = 60 - elapsed
-                    print(f"     Waiting {wait_time:.1f}s to respect the limit of {TOKEN_LIMIT_PER_MINUTE} tokens/minute...", flush=True)
-                    time.sleep(wait_time)
-                tokens_this_minute = 0
-                minute_start = time.time()
-
-            print(f"  -> Batch {batch_num}/{total_batches} ({len(batch)} docs, ~{total_chars} chars)...", flush=True)
-            print("     Sending to OpenAI API...", flush=True)
-            try:
-                vectorstore.add_documents(documents=batch)
-                tokens_this_minute += batch_tokens
-                print(f"     ✅ Batch {batch_num} processed! ({batch_tokens} tokens)", flush=True)
-                return len(batch)
-            except Exception as e:
-                print(f"     ❌ ERROR in batch {batch_num}: {e}", flush=True)
-                return 0
-
-        def send_batch_local(batch, batch_num, total_batches, total_chars):
-            """Optimized version for local embeddings"""
-            print(f"  -> Batch {batch_num}/{total_batches} ({len(batch)} docs, ~{total_chars} chars)...", flush=True)
-            try:
-                vectorstore.add_documents(documents=batch)
-                print(f"     ✅ Batch {batch_num} processed!", flush=True)
-                return len(batch)
-            except Exception as e:
-                print(f"     ❌ ERROR in batch {batch_num}: {e}", flush=True)
-                return 0
-
-        # Choose processing function
-        send_batch = send_batch_openai if is_openai else send_batch_local
+        stats = build_index(vectorstore, repo_branch, resume=resume)
 
-        print(f">>> Processing {len(chunks)} documents in {total_batches} batches (batch_size={batch_size}, workers={max_workers})", flush=True)
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                current_batch_num = i // batch_size + 1
-                total_chars = sum(len(doc.page_content) for doc in batch)
-                futures.append(executor.submit(send_batch, batch, current_batch_num, total_batches, total_chars))
-            
-            # Wait for completion
-            for future in as_completed(futures):
-                pass
+        # Cost estimation
+        cost_info = estimate_embedding_cost(stats["tokens"], EMBEDDING_PROVIDER)
+        print(f">>> Total estimated tokens: {stats['tokens']}", flush=True)
+        print(f">>> Estimated cost: {cost_info}", flush=True)
 
         print("\n" + "="*60, flush=True)
-        print("INDEXATION COMPLETED SUCCESSFULLY!", flush=True)
+        if stats["failed_batches"]:
+            print(f"INDEXATION FINISHED WITH {stats['chunks_failed']} CHUNKS MISSING", flush=True)
+        else:
+            print("INDEXATION COMPLETED SUCCESSFULLY!", flush=True)
         print("="*60 + "\n", flush=True)
 
         generate_extension_report(processed_extensions, discarded_extensions)
         generate_token_report(total_tokens_generated)
+        if isinstance(embeddings, CachedEmbeddings):
+            generate_cache_report(embeddings.cache.stats())
     else:
         print("\n" + "="*60, flush=True)
         print(f"Carregando base de dados vetorial existente para '{REPO_NAME}'...", flush=True)
         vectorstore = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
         print(">>> SUCCESS: Database loaded from memory.", flush=True)
         print("="*60 + "\n", flush=True)
+
+        if INCREMENTAL_REINDEX and get_indexed_commit(DB_PATH):
+            try:
+                refresh_index(vectorstore)
+            except Exception as e:
+                # Serving the previous index is better than not serving at all
+                print(f">>> AVISO: Incremental re-index failed, serving existing index: {e}", flush=True)
         generate_extension_report(processed_extensions, discarded_extensions)
 
     retriever = vectorstore.as_retriever()
+    index_progress["partial"] = False
+    index_progress["error"] = None
+    sync_index_completeness()
     print(f"Server ready. Repository '{REPO_NAME}' is loaded and ready for queries.", flush=True)
     server_ready = True
     print(">>> Server ACCEPTING HTTP connections on port 8000.", flush=True)
 
+def record_indexing_failure(error):
+    """Marks the build as failed: /health reports it and /refresh retries the build"""
+    index_progress["partial"] = False
+    index_progress["error"] = str(error) or type(error).__name__
+
+def run_background_indexing():
+    """Runs index_repository in the background (progressive serving mode)"""
+    try:
+        index_repository()
+    except Exception as e:
+        print(f">>> ERRO: Background indexing failed: {e}", flush=True)
+        record_indexing_failure(e)
+
 # Event handler removido - agora usando lifespan
 
 @app.get("/", summary="Status Check")
 def read_root():
+    if index_progress["error"]:
+        return {"status": f"Indexing failed: {index_progress['error']}"}
     if not server_ready:
         return {"status": "Server initializing, please wait..."}
     return {"status": f"MCP Server online for repository: {REPO_NAME}"}
 
 @app.get("/health", summary="Health Check")
 def health_check():
+    if index_progress["error"]:
+        status = "error"
+    elif index_progress["incomplete"]:
+        status = "incomplete"
+    else:
+        status = "healthy" if server_ready else "initializing"
     return {
-        "status": "healthy" if server_ready else "initializing",
+        "status": status,
         "repository": REPO_NAME,
-        "ready": server_ready
+        "ready": server_ready,
+        "partial": is_index_partial(),
+        "indexed_fraction": get_indexed_fraction() if server_ready else 0.0,
+        "error": index_progress["error"]
     }
 
 @app.get("/embedding-info", summary="Embedding Information")
 def embedding_info():
     """Returns information about available embedding providers"""
     providers = EmbeddingProvider.get_available_providers()
+    embedding_function = getattr(vectorstore, "embeddings", None)
     return {
         "current_provider": EMBEDDING_PROVIDER,
         "token_count_method": TOKEN_COUNT_METHOD,
         "available_providers": providers,
-        "total_tokens_processed": total_tokens_generated if server_ready else 0
+        "total_tokens_processed": total_tokens_generated if server_ready else 0,
+        "embedding_cache": embedding_function.cache.stats() if isinstance(embedding_function, CachedEmbeddings) else None
     }
 
+@app.post("/refresh", summary="Incremental re-index")
+async def refresh_repository(api_key: str = Depends(verify_api_key)):
+    """
+    Fetches the branch and re-indexes only the files changed since the indexed commit
+
+    After a failed background build, retries the build instead (it resumes
+    from its last checkpoint).
+    """
+    retry_build = bool(index_progress["error"])
+    if not server_ready and not retry_build:
+        raise HTTPException(status_code=503, detail="Server is still initializing. Please try again in a few seconds.")
+    if index_progress["partial"]:
+        raise HTTPException(status_code=409, detail="The initial indexation is still running.")
+    if not refresh_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A refresh is already in progress.")
+    try:
+        if retry_build:
+            await asyncio.to_thread(index_repository)
+            status = "incomplete" if index_progress["incomplete"] else "rebuilt"
+            return {"status": status, "indexed_fraction": get_indexed_fraction()}
+        return await asyncio.to_thread(refresh_index, vectorstore)
+    except Exception as e:
+        print(f"Erro durante o refresh: {e}", flush=True)
+        if retry_build:
+            record_indexing_failure(e)
+        raise HTTPException(status_code=500, detail=f"Erro interno durante o refresh: {str(e)}")
+    finally:
+        # A refresh resuming an unfinished build may have completed it (or left it unfinished)
+        sync_index_completeness()
+        refresh_lock.release()
+
 @app.post("/retrieve", response_model=RetrieveResponse, summary="Search context fragments")
 def retrieve_context(request: RetrieveRequest):
     if not server_ready:
@@ -254,7 +774,12 @@ def retrieve_context(request: RetrieveRequest):
             for doc in relevant_docs
         ]
 
-        return RetrieveResponse(query=request.query, fragments=response_fragments)
+        return RetrieveResponse(
+            query=request.query,
+            fragments=response_fragments,
+            partial=is_index_partial(),
+            indexed_fraction=get_indexed_fraction()
+        )
     
     except Exception as e:
         print(f"Erro durante a busca: {e}", flush=True)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Optional
 import re
 
 class RetrieveRequest(BaseModel):
@@ -40,4 +40,6 @@ class DocumentFragment(BaseModel):
 
 class RetrieveResponse(BaseModel):
     query: str
-    fragments: List[DocumentFragment]
\ No newline at end of file
+    fragments: List[DocumentFragment]
+    partial: bool = Field(default=False, description="True while the index is still being built")
+    indexed_fraction: Optional[float] = Field(default=None, description="Fraction of files indexed so far (0-1)")
\ No newline at end of file
@@ -0,0 +1,296 @@
+"""
+Asynchronous OpenAI embedding client with shared rate limiting
+
+Every embedding request, from any indexing thread, goes through one event
+loop and one token+request bucket. The bucket is refilled continuously and
+corrected from the x-ratelimit-* response headers; a 429 pauses the bucket
+for the advertised reset time and halves the allowed concurrency, which then
+grows back by one step per successful window (AIMD). Transient failures are
+retried with jittered exponential backoff.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import List, Optional
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+from token_utils import count_tokens
+
+DEFAULT_MODEL = "text-embedding-ada-002"
+DEFAULT_REQUEST_SIZE = 100
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parses OpenAI reset durations such as '1s', '6m0s', '20ms' or '0.5'
+
+    Returns:
+        Seconds, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    return sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+
+
+def _header_int(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitBucket:
+    """Thread-safe token + request bucket refilled continuously over a minute"""
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Takes one request and `tokens` tokens if available
+
+        Returns:
+            0 if acquired, otherwise the seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            # A request larger than the whole budget waits for a full bucket instead of forever
+            tokens = min(tokens, self.tokens_per_minute)
+            if self._tokens >= tokens and self._requests >= 1:
+                self._tokens -= tokens
+                self._requests -= 1
+                return 0.0
+            token_wait = (tokens - self._tokens) * 60 / self.tokens_per_minute
+            request_wait = (1 - self._requests) * 60 / self.requests_per_minute
+            return max(token_wait, request_wait, 0.01)
+
+    async def acquire(self, tokens: int) -> None:
+        """Waits without blocking the event loop until the request fits the budget"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers) -> None:
+        """Adopts the provider's limits and clamps the local budget to what it reports as remaining"""
+        with self._lock:
+            self._refill(time.monotonic())
+            limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+            limit_requests = _header_int(headers, "x-ratelimit-limit-requests")
+            if limit_tokens:
+                self.tokens_per_minute = limit_tokens
+            if limit_requests:
+                self.requests_per_minute = limit_requests
+            remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+            remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, remaining_tokens)
+            if remaining_requests is not None:
+                self._requests = min(self._requests, remaining_requests)
+
+    def pause(self, seconds: float) -> None:
+        """Blocks every acquirer for `seconds` (after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight requests: +1 per window of successes, halved on throttling"""
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def __aenter__(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+class AsyncOpenAIEmbeddings(Embeddings):
+    """LangChain Embeddings issuing concurrent, rate-limited OpenAI requests from one event loop"""
+
+    # Same vectors as langchain's OpenAIEmbeddings, so the embedding cache keeps its entries
+    embedding_family = "OpenAIEmbeddings"
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        tokens_per_minute: int = 900000,
+        requests_per_minute: int = 3000,
+        max_concurrency: int = 16,
+        initial_concurrency: int = 4,
+        retry_attempts: int = 3,
+        retry_delay: float = 5,
+        request_size: int = DEFAULT_REQUEST_SIZE,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 60
+    ):
+        """
+        Args:
+            model: OpenAI embedding model
+            tokens_per_minute: Initial token budget (replaced by x-ratelimit-limit-tokens)
+            requests_per_minute: Initial request budget (replaced by x-ratelimit-limit-requests)
+            max_concurrency: Upper bound for in-flight requests
+            initial_concurrency: In-flight requests allowed before any feedback
+            retry_attempts: Retries per request after the first attempt
+            retry_delay: Base delay in seconds for the jittered exponential backoff
+            request_size: Texts per API request
+            api_key: OpenAI key (default OPENAI_API_KEY)
+            base_url: API base URL (default OPENAI_BASE_URL or api.openai.com)
+            timeout: Per-request timeout in seconds
+        """
+        self.model = model
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_delay = retry_delay
+        self.request_size = max(1, request_size)
+        self.bucket = RateLimitBucket(tokens_per_minute, requests_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_concurrency)
+        self._client_kwargs = {"api_key": api_key, "base_url": base_url, "timeout": timeout, "max_retries": 0}
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="openai-embeddings", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _backoff(self, attempt: int, minimum: Optional[float]) -> float:
+        delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        return max(delay, minimum or 0.0)
+
+    async def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(**self._client_kwargs)
+        tokens = sum(count_tokens(text, "local") for text in texts)
+
+        for attempt in range(self.retry_attempts + 1):
+            await self.bucket.acquire(tokens)
+            wait = None
+            async with self.concurrency:
+                try:
+                    self.requests += 1
+                    raw = await self._client.embeddings.with_raw_response.create(model=self.model, input=texts)
+                except openai.RateLimitError as e:
+                    self.throttled += 1
+                    error = e
+                    headers = e.response.headers
+                    retry_after_ms = parse_reset_seconds(headers.get("retry-after-ms"))
+                    wait = (
+                        retry_after_ms / 1000 if retry_after_ms is not None
+                        else parse_reset_seconds(headers.get("retry-after"))
+                        or parse_reset_seconds(headers.get("x-ratelimit-reset-tokens"))
+                        or parse_reset_seconds(headers.get("x-ratelimit-reset-requests"))
+                    )
+                    self.bucket.update_from_headers(headers)
+                    self.bucket.pause(wait or self.retry_delay)
+                    self.concurrency.on_throttle()
+                except (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError) as e:
+                    error = e
+                else:
+                    self.bucket.update_from_headers(raw.headers)
+                    self.concurrency.on_success()
+                    response = raw.parse()
+                    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+            if attempt == self.retry_attempts:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, wait))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        parts = [texts[i:i + self.request_size] for i in range(0, len(texts), self.request_size)]
+        results = await asyncio.gather(*(self._embed_request(part) for part in parts))
+        return [vector for part in results for vector in part]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._embed_request([text]))[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return asyncio.run_coroutine_threadsafe(self.aembed_documents(list(texts)), self._ensure_loop()).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return asyncio.run_coroutine_threadsafe(self.aembed_query(text), self._ensure_loop()).result()
+
+    def stats(self) -> dict:
+        """Request counters and the current rate-limit view"""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "concurrency_limit": int(self.concurrency.limit),
+            "tokens_per_minute": self.bucket.tokens_per_minute,
+            "requests_per_minute": self.bucket.requests_per_minute
+        }
+
+    def close(self) -> None:
+        """Closes the HTTP client and stops the event loop thread"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
@@ -5,7 +5,8 @@ Supports: GitHub, Bitbucket, GitLab
 import os
 import re
 import subprocess
-from typing import Optional, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 
@@ -204,7 +205,8 @@ def clone_repo(
     repo_branch: str, 
     local_path: str,
     github_token: Optional[str] = None,
-    depth: int = 1
+    depth: int = 1,
+    checkout: bool = True
 ) -> None:
     """
     Clone a Git repository with support for private repositories
@@ -221,6 +223,8 @@ def clone_repo(
         local_path: Local path to clone into
         github_token: Optional token for backward compatibility (deprecated, use env vars)
         depth: Clone depth (1 = shallow clone, 0 = full history)
+        checkout: False clones with --no-checkout: only the object database
+            is written and files are read as blobs (see GitBlobReader)
         
     Environment Variables:
         GitHub:
@@ -280,6 +284,8 @@ def clone_repo(
     
     if depth > 0:
         git_command.extend(["--depth", str(depth)])
+    if not checkout:
+        git_command.append("--no-checkout")
     
     git_command.extend(["--branch", repo_branch, auth_url, local_path])
     
@@ -334,4 +340,262 @@ def clone_repo(
         raise Exception(
             "Git is not installed or not found in PATH. "
             "Please install git: https://git-scm.com/downloads"
-        )
\ No newline at end of file
+        )
+
+def _run_git(args: List[str], cwd: str) -> str:
+    """
+    Run a git command inside a repository and return its stdout
+
+    Raises:
+        subprocess.CalledProcessError: If git exits with a non-zero status
+    """
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+    )
+    return result.stdout
+
+
+def _ls_tree(local_path: str, ref: str) -> Dict[str, Tuple[str, int]]:
+    """
+    Map every regular file in a tree to its (blob SHA, size)
+
+    Raises:
+        subprocess.CalledProcessError: If the ref does not exist
+    """
+    tree = _run_git(["ls-tree", "-r", "-l", "-z", ref], local_path)
+    blobs = {}
+    for entry in tree.split("\0"):
+        if not entry:
+            continue
+        # "<mode> <type> <object> <size>\t<path>"
+        info, _, rel_path = entry.partition("\t")
+        mode, obj_type, sha, size = info.split(None, 3)
+        if obj_type == "blob" and mode in ("100644", "100755") and size.isdigit():
+            blobs[rel_path] = (sha, int(size))
+    return blobs
+
+
+def list_git_files(local_path: str) -> Optional[Dict[str, Optional[int]]]:
+    """
+    List the files git knows about under a directory, with their sizes
+
+    Uses `git ls-files` (tracked plus untracked-but-not-ignored files, so
+    .gitignore is respected and .git/ is never walked) and takes blob sizes
+    from `git ls-tree -l HEAD` instead of stat-ing every file.
+
+    Args:
+        local_path: Directory inside a git work tree
+
+    Returns:
+        Dict of path (relative to local_path) → size in bytes, or None when
+        git has no size for it (untracked, not a regular blob). Returns None
+        if local_path is not a git work tree or git is unavailable.
+    """
+    try:
+        listed = _run_git(["ls-files", "-z", "--cached", "--others", "--exclude-standard"], local_path)
+        try:
+            blobs = _ls_tree(local_path, "HEAD")
+        except subprocess.CalledProcessError:
+            blobs = {}  # No commit yet: every size comes from stat
+    except (subprocess.CalledProcessError, FileNotFoundError, OSError, UnicodeDecodeError):
+        return None
+
+    files = {}
+    for rel_path in listed.split("\0"):
+        if rel_path:
+            blob = blobs.get(rel_path)
+            files[rel_path] = blob[1] if blob else None
+    return files
+
+
+def list_git_blobs(local_path: str, ref: str = "HEAD") -> Optional[Dict[str, Tuple[str, int]]]:
+    """
+    List the regular files of a commit straight from the object database
+
+    Works without a working tree (bare or --no-checkout clones).
+
+    Args:
+        local_path: Path of the local clone
+        ref: Commit, branch or tree to list
+
+    Returns:
+        Dict of path (relative to the repository root) → (blob SHA, size),
+        or None if the ref cannot be listed
+    """
+    try:
+        return _ls_tree(local_path, ref)
+    except (subprocess.CalledProcessError, FileNotFoundError, OSError, UnicodeDecodeError):
+        return None
+
+
+class GitBlobReader:
+    """
+    Reads blob contents through one persistent `git cat-file --batch` process
+
+    Thread-safe: concurrent callers take turns on the pipe, which is far
+    cheaper than a process (or a file read) per blob.
+    """
+
+    def __init__(self, local_path: str):
+        self.local_path = local_path
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def read(self, sha: str) -> bytes:
+        """
+        Return the content of a blob
+
+        Raises:
+            KeyError: If the object does not exist
+        """
+        with self._lock:
+            if self._process is None:
+                self._process = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.local_path,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+                )
+            self._process.stdin.write(sha.encode("ascii") + b"\n")
+            self._process.stdin.flush()
+            # "<sha> <type> <size>" or "<sha> missing"
+            header = self._process.stdout.readline().split()
+            if len(header) != 3:
+                raise KeyError(sha)
+            data = self._process.stdout.read(int(header[2]))
+            self._process.stdout.read(1)  # trailing newline
+            return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+                self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_head_commit(local_path: str) -> Optional[str]:
+    """
+    Return the commit SHA currently checked out in a local clone
+
+    Args:
+        local_path: Path of the local clone
+
+    Returns:
+        Full commit SHA, or None if it cannot be determined
+    """
+    try:
+        return _run_git(["rev-parse", "HEAD"], local_path).strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+        return None
+
+
+def fetch_branch(local_path: str, repo_branch: str, depth: int = 1, checkout: bool = True) -> str:
+    """
+    Fetch the latest commit of a branch and move the working tree to it
+
+    Args:
+        local_path: Path of the local clone
+        repo_branch: Branch to fetch
+        depth: Fetch depth (1 = shallow, 0 = full history)
+        checkout: False only moves HEAD (clones without a working tree)
+
+    Returns:
+        SHA of the new HEAD
+
+    Raises:
+        Exception: If fetch or checkout fails
+    """
+    fetch_command = ["fetch", "origin", repo_branch]
+    if depth > 0:
+        fetch_command[1:1] = ["--depth", str(depth)]
+
+    try:
+        _run_git(fetch_command, local_path)
+        _run_git(["reset", "--hard" if checkout else "--soft", "FETCH_HEAD"], local_path)
+    except subprocess.CalledProcessError as e:
+        safe_error = re.sub(r'://[^@]+@', '://***@', (e.stderr or "").strip())
+        raise Exception(f"Failed to fetch branch '{repo_branch}': {safe_error}")
+
+    return get_head_commit(local_path)
+
+
+def ensure_commit_available(local_path: str, commit: str, depth: int = 1) -> bool:
+    """
+    Make sure a commit object exists locally, fetching it if necessary
+
+    Shallow clones only contain the tip of the branch, so an older indexed
+    commit may have to be fetched explicitly before it can be diffed.
+
+    Args:
+        local_path: Path of the local clone
+        commit: Commit SHA that must be available
+        depth: Fetch depth used when the commit is missing
+
+    Returns:
+        True if the commit is available locally
+    """
+    try:
+        _run_git(["cat-file", "-e", f"{commit}^{{commit}}"], local_path)
+        return True
+    except subprocess.CalledProcessError:
+        pass
+
+    fetch_command = ["fetch", "origin", commit]
+    if depth > 0:
+        fetch_command[1:1] = ["--depth", str(depth)]
+    try:
+        _run_git(fetch_command, local_path)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def get_changed_files(local_path: str, old_commit: str, new_commit: str) -> Dict[str, List[str]]:
+    """
+    List files changed between two commits using `git diff --name-status`
+
+    Renames are reported as a deletion plus an addition so the caller only
+    has to handle three kinds of change.
+
+    Args:
+        local_path: Path of the local clone
+        old_commit: Commit the index was built from
+        new_commit: Commit to update the index to
+
+    Returns:
+        Dict with 'added', 'modified' and 'deleted' lists of paths relative
+        to the repository root
+    """
+    output = _run_git(
+        ["diff", "--name-status", "--no-renames", "-z", old_commit, new_commit],
+        local_path
+    )
+
+    changes = {"added": [], "modified": [], "deleted": []}
+    fields = output.split("\0")
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if not status:
+            continue
+        if status.startswith("A"):
+            changes["added"].append(path)
+        elif status.startswith("D"):
+            changes["deleted"].append(path)
+        else:
+            # M (modified), T (type change) and anything else is re-indexed
+            changes["modified"].append(path)
+
+    return changes
@@ -7,15 +7,40 @@ def generate_extension_report(extensoes_processadas, extensoes_descartadas):
     else:
         print("  No files processed.")
 
+    # Files and directories skipped by the include/exclude globs and low-value
+    # files (lockfiles, minified, generated) are reported on their own
+    pruned = {k: v for k, v in (extensoes_descartadas or {}).items() if k in ("[pruned]", "[pruned_dirs]")}
+    low_value = {
+        k: v for k, v in (extensoes_descartadas or {}).items()
+        if k in ("[lockfile]", "[minified]", "[generated]")
+    }
+    discarded = {k: v for k, v in (extensoes_descartadas or {}).items() if k not in pruned and k not in low_value}
+
     print("\nDiscarded:")
-    if extensoes_descartadas:
-        for ext, count in sorted(extensoes_descartadas.items(), key=lambda x: -x[1]):
+    if discarded:
+        for ext, count in sorted(discarded.items(), key=lambda x: -x[1]):
             print(f"  {ext or '[no extension]'}: {count}")
     else:
         print("  No files discarded.")
+
+    if pruned:
+        print("\nPruned (include/exclude globs):")
+        print(f"  files: {pruned.get('[pruned]', 0)}")
+        print(f"  directories: {pruned.get('[pruned_dirs]', 0)}")
+
+    if low_value:
+        print("\nLow-value (skipped):")
+        for category, count in sorted(low_value.items(), key=lambda x: -x[1]):
+            print(f"  {category.strip('[]')}: {count}")
     print("=============================================\n")
 
 def generate_token_report(total_tokens_gerados):
     print(f"===== TOKEN REPORT =====")
     print(f"Total estimated tokens sent for embeddings: {total_tokens_gerados}")
-    print("="*40)
\ No newline at end of file
+    print("="*40)
+
+def generate_cache_report(cache_stats):
+    print("===== EMBEDDING CACHE REPORT =====")
+    print(f"Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | Hit rate: {cache_stats['hit_rate']:.1%}")
+    print(f"Entries: {cache_stats['entries']} | Size: {cache_stats['size_mb']}MB / {cache_stats['max_size_mb']}MB | Evictions: {cache_stats['evictions']}")
+    print("="*40)
@@ -3,12 +3,24 @@ Global test configuration for pytest
 """
 import pytest
 import os
+import subprocess
+import sys
+from collections import defaultdict
 from unittest.mock import Mock, MagicMock
 
 # Configure environment variables for tests
 os.environ["REPO_URL"] = "https://github.com/octocat/Hello-World.git"
 os.environ["REPO_BRANCH"] = "master"
 os.environ["EMBEDDING_PROVIDER"] = "sentence-transformers"
+os.environ["EMBEDDING_CACHE"] = "false"
+
+@pytest.fixture(autouse=True)
+def isolated_index_paths(tmp_path, monkeypatch):
+    """Keeps the index state written by main.py out of /app during tests"""
+    main = sys.modules.get("main")
+    if main is not None:
+        monkeypatch.setattr(main, "DB_PATH", str(tmp_path / "chroma_db"))
+        monkeypatch.setattr(main, "LOCAL_REPO_PATH", str(tmp_path / "repo"))
 
 @pytest.fixture
 def mock_vectorstore():
@@ -34,3 +46,24 @@ def mock_embeddings():
     mock.embed_query.return_value = [0.1] * 384  # Fake vector
     mock.embed_documents.return_value = [[0.1] * 384]
     return mock
+
+@pytest.fixture
+def git():
+    """Runs a git command in a directory, with a committer identity set"""
+    def run(cwd, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=cwd, check=True, capture_output=True
+        )
+    return run
+
+@pytest.fixture
+def load_repo():
+    """Loads a directory with load_documents_robustly; returns (documents, processed, discarded)"""
+    from document_loader import load_documents_robustly
+
+    def load(root, **kwargs):
+        processed, discarded = defaultdict(int), defaultdict(int)
+        documents = list(load_documents_robustly(str(root), processed, discarded, **kwargs))
+        return documents, processed, discarded
+    return load
@@ -0,0 +1,64 @@
+"""
+Tests for benchmark_indexing.py - Synthetic repository generator and benchmark report
+"""
+import os
+
+import pytest
+
+from benchmark_indexing import (
+    FakeEmbeddings,
+    generate_synthetic_repo,
+    parse_mix,
+    run_benchmark,
+)
+
+
+def _tree(path):
+    contents = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            with open(full, encoding="utf-8") as f:
+                contents[os.path.relpath(full, path)] = f.read()
+    return contents
+
+
+class TestGenerator:
+    def test_counts_and_mix(self, tmp_path):
+        counts = generate_synthetic_repo(str(tmp_path), 40, {"py": 1, "md": 1})
+        assert sum(counts.values()) == 40
+        assert set(counts) == {"py", "md"}
+        assert len(_tree(tmp_path)) == 40
+
+    def test_same_seed_same_tree(self, tmp_path):
+        generate_synthetic_repo(str(tmp_path / "a"), 15, seed=7)
+        generate_synthetic_repo(str(tmp_path / "b"), 15, seed=7)
+        assert _tree(tmp_path / "a") == _tree(tmp_path / "b")
+
+    def test_unknown_language(self, tmp_path):
+        with pytest.raises(ValueError, match="cobol"):
+            generate_synthetic_repo(str(tmp_path), 1, {"cobol": 1})
+
+    def test_parse_mix(self):
+        assert parse_mix("py=3,.ts=2,md") == {"py": 3.0, "ts": 2.0, "md": 1.0}
+
+
+class TestFakeEmbeddings:
+    def test_deterministic(self):
+        embeddings = FakeEmbeddings(dimension=8)
+        assert embeddings.embed_documents(["a", "b"]) == embeddings.embed_documents(["a", "b"])
+        assert embeddings.embed_query("a") != embeddings.embed_query("b")
+        assert len(embeddings.embed_query("a")) == 8
+
+
+class TestRunBenchmark:
+    def test_report(self, tmp_path):
+        generate_synthetic_repo(str(tmp_path / "repo"), 20, {"py": 1, "md": 1})
+
+        report = run_benchmark(str(tmp_path / "repo"), FakeEmbeddings(dimension=16), "fake")
+
+        assert report["files"] == 20
+        assert report["chunks_stored"] == report["chunks"] > 0
+        assert report["peak_rss_mb"] > 0
+        assert set(report["stages"]) == {"load", "split", "token_count", "embed", "write"}
+        assert report["files_per_second"] > 0
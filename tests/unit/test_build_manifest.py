@@ -0,0 +1,136 @@
+"""
+Tests for checkpointed, resumable indexing (BuildManifest + main.build_index)
+"""
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from index_state import BuildManifest, load_index_state
+
+
+class TestBuildManifest:
+    def test_start_marks_building(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        manifest = BuildManifest(db_path)
+        manifest.start("abc", "main")
+
+        assert BuildManifest(db_path).is_building()
+        assert load_index_state(db_path)["commit"] == "abc"
+
+    def test_completed_files_survive_restart(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        manifest = BuildManifest(db_path)
+        manifest.start("abc", "main")
+        manifest.mark_files_complete(["/repo/a.py", "/repo/b.py"])
+        manifest.close()
+
+        assert BuildManifest(db_path).load_completed() == {"/repo/a.py", "/repo/b.py"}
+
+    def test_start_without_resume_clears_log(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        manifest = BuildManifest(db_path)
+        manifest.start("abc", "main")
+        manifest.mark_files_complete(["/repo/a.py"])
+        manifest.start("abc", "main")
+
+        assert manifest.load_completed() == set()
+
+    def test_resume_keeps_log(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        manifest = BuildManifest(db_path)
+        manifest.start("abc", "main")
+        manifest.mark_files_complete(["/repo/a.py"])
+
+        resumed = BuildManifest(db_path)
+        resumed.start("abc", "main", resume=True)
+        assert resumed.load_completed() == {"/repo/a.py"}
+
+    def test_forget_files(self, tmp_path):
+        manifest = BuildManifest(str(tmp_path / "db"))
+        manifest.start("abc", "main")
+        manifest.mark_files_complete(["/repo/a.py", "/repo/b.py"])
+        manifest.forget_files(["/repo/a.py"])
+
+        assert manifest.load_completed() == {"/repo/b.py"}
+
+    def test_complete(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        manifest = BuildManifest(db_path)
+        manifest.start("abc", "main")
+        manifest.mark_files_complete(["/repo/a.py"])
+        manifest.complete("def", "main")
+
+        state = load_index_state(db_path)
+        assert state["status"] == "complete"
+        assert state["commit"] == "def"
+        assert not os.path.exists(manifest.log_path)
+
+    def test_legacy_state_is_not_building(self, tmp_path):
+        db_path = tmp_path / "db"
+        db_path.mkdir()
+        (db_path / "index_state.json").write_text('{"commit": "abc"}')
+        assert BuildManifest(str(db_path)).is_building() is False
+
+
+class TestBuildIndex:
+    def _stats(self, **overrides):
+        stats = {"documents": 2, "chunks": 2, "tokens": 10, "failed_batches": 0, "chunks_failed": 0}
+        stats.update(overrides)
+        return stats
+
+    def test_resume_skips_completed_files(self):
+        import main
+        manifest = BuildManifest(main.DB_PATH)
+        manifest.start("a" * 40, "master")
+        manifest.mark_files_complete(["/repo/done.py"])
+        manifest.close()
+
+        with patch("main.get_head_commit", return_value="a" * 40), \
+             patch("main.load_documents_robustly", return_value=[]) as mock_load, \
+             patch("main.index_documents", return_value=self._stats()):
+            main.build_index(MagicMock(), "master", resume=True)
+
+        assert mock_load.call_args.kwargs["exclude_paths"] == {"/repo/done.py"}
+        assert load_index_state(main.DB_PATH)["status"] == "complete"
+
+    def test_failed_batches_leave_build_incomplete(self):
+        import main
+        with patch("main.get_head_commit", return_value="a" * 40), \
+             patch("main.load_documents_robustly", return_value=[]), \
+             patch("main.index_documents", return_value=self._stats(failed_batches=1, chunks_failed=5)):
+            main.build_index(MagicMock(), "master")
+
+        state = load_index_state(main.DB_PATH)
+        assert state["status"] == "building"
+        assert state["chunks_failed"] == 5
+
+    def test_no_documents_leaves_build_incomplete(self):
+        import main
+        with patch("main.get_head_commit", return_value="a" * 40), \
+             patch("main.load_documents_robustly", return_value=[]), \
+             patch("main.index_documents", return_value=self._stats(documents=0)):
+            with pytest.raises(Exception, match="No documents"):
+                main.build_index(MagicMock(), "master")
+
+        assert BuildManifest(main.DB_PATH).is_building()
+
+    def test_resume_after_commit_moved_drops_changed_files(self):
+        import main
+        manifest = BuildManifest(main.DB_PATH)
+        manifest.start("a" * 40, "master")
+        changed = os.path.abspath(os.path.join(main.LOCAL_REPO_PATH, "changed.py"))
+        manifest.mark_files_complete([changed, "/repo/other.py"])
+        manifest.close()
+
+        vectorstore = MagicMock()
+        changes = {"added": [], "modified": ["changed.py"], "deleted": []}
+        with patch("main.get_head_commit", return_value="b" * 40), \
+             patch("main.ensure_commit_available", return_value=True), \
+             patch("main.get_changed_files", return_value=changes), \
+             patch("main.load_documents_robustly", return_value=[]) as mock_load, \
+             patch("main.index_documents", return_value=self._stats()):
+            main.build_index(vectorstore, "master", resume=True)
+
+        assert mock_load.call_args.kwargs["exclude_paths"] == {"/repo/other.py"}
+        vectorstore._collection.delete.assert_called_once()
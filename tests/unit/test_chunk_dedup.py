@@ -0,0 +1,184 @@
+"""
+Tests for chunk_dedup.py - Exact and near-duplicate chunk elimination
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from chunk_dedup import ChunkDeduplicator, MinHashLSH
+from indexing_pipeline import IndexingPipeline
+
+LICENSE = "Licensed under the Apache License, Version 2.0 (the License); you may not use this file except in compliance."
+CODE = " ".join(f"def handler_{i}(request): return process(request, option={i})" for i in range(20))
+
+
+def chunk(text, source):
+    return Document(page_content=text, metadata={"source": source})
+
+
+class TestChunkDeduplicator:
+    def test_exact_duplicates_collect_sources(self):
+        dedup = ChunkDeduplicator()
+        assert dedup.add(chunk(LICENSE, "a.py"), "id-a") is None
+        assert dedup.add(chunk(LICENSE + "\n", "b.py"), "id-b") == "id-a"
+        assert dedup.add(chunk(LICENSE, "c.py"), "id-c") == "id-a"
+        assert dedup.add(chunk("something else", "d.py"), "id-d") is None
+
+        assert dedup.duplicate_sources() == {"id-a": ["a.py", "b.py", "c.py"]}
+        assert dedup.exact_duplicates == 2
+        assert dedup.near_duplicates == 0
+
+    def test_near_duplicates_only_when_enabled(self):
+        edited = CODE.replace("option=19", "option=190")
+        exact_only = ChunkDeduplicator()
+        exact_only.add(chunk(CODE, "a.py"), "id-a")
+        assert exact_only.add(chunk(edited, "b.py"), "id-b") is None
+
+        near = ChunkDeduplicator(near_threshold=0.8)
+        near.add(chunk(CODE, "a.py"), "id-a")
+        assert near.add(chunk(edited, "b.py"), "id-b") == "id-a"
+        assert near.add(chunk("completely unrelated prose about cats and dogs", "c.md"), "id-c") is None
+        assert near.near_duplicates == 1
+
+
+class TestMinHashLSH:
+    def test_band_layout_tracks_threshold(self):
+        assert MinHashLSH(0.9).bands < MinHashLSH(0.5).bands
+
+    def test_empty_text_is_never_a_duplicate(self):
+        lsh = MinHashLSH(0.8)
+        assert lsh.query_and_insert("a", "   ") is None
+        assert lsh.query_and_insert("b", "   ") is None
+
+
+def run_pipeline(docs, fail_source=None):
+    written, completed = [], []
+
+    def embed(batch, batch_num):
+        return [[1.0] for _ in batch]
+
+    def write(chunks, ids, vectors):
+        if any(c.metadata["source"] == fail_source for c in chunks):
+            return 0
+        written.extend(ids)
+        return len(chunks)
+
+    pipeline = IndexingPipeline(
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+        batch_size=1,
+        max_workers=1,
+        embed_batch=embed,
+        write_batch=write,
+        # One batch per write, so a failing batch never takes others down with it
+        write_batch_size=1,
+        deduplicator=ChunkDeduplicator(),
+        on_files_complete=completed.extend
+    )
+    return pipeline.run(iter(docs)), written, completed
+
+
+class TestPipelineDedup:
+    def test_duplicates_are_not_embedded(self):
+        docs = [chunk(LICENSE, "a.py"), chunk(LICENSE, "vendor/a.py"), chunk(CODE, "b.py")]
+        stats, written, completed = run_pipeline(docs)
+
+        assert stats["duplicate_chunks"] == 1
+        assert stats["chunks"] == len(written)
+        assert len(set(written)) == len(written)
+        assert sorted(completed) == ["a.py", "b.py", "vendor/a.py"]
+
+    def test_copy_stays_incomplete_when_first_copy_fails(self):
+        docs = [chunk(LICENSE, "bad.py"), chunk(LICENSE, "copy.py"), chunk(CODE, "ok.py")]
+        stats, _, completed = run_pipeline(docs, fail_source="bad.py")
+
+        assert completed == ["ok.py"]
+        assert stats["failed_batches"] == 1
+
+
+@pytest.fixture
+def chroma_store():
+    import chromadb
+    collection = chromadb.EphemeralClient().create_collection(f"dedup-{uuid.uuid4().hex[:8]}")
+    return SimpleNamespace(_collection=collection)
+
+
+def index_into(store, docs, near_threshold=0.0):
+    """Runs docs through a deduplicating pipeline writing into a Chroma collection"""
+    import main
+    dedup = ChunkDeduplicator(near_threshold)
+    IndexingPipeline(
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=0),
+        batch_size=4,
+        max_workers=1,
+        embed_batch=lambda batch, batch_num: [[float(len(c.page_content))] for c in batch],
+        write_batch=main.make_batch_writer(store),
+        deduplicator=dedup
+    ).run(iter(docs))
+    main.record_duplicate_sources(store, dedup.duplicate_copies())
+
+
+def stored(store, source):
+    result = store._collection.get(where={"source": source}, include=["metadatas", "documents"])
+    return list(zip(result["ids"], result["documents"], result["metadatas"]))
+
+
+class TestDuplicateMetadata:
+    def test_reassigned_chunk_survives_readding_the_file(self, chroma_store):
+        import main
+        index_into(chroma_store, [chunk(LICENSE, "/repo/x.py"), chunk(LICENSE, "/repo/y.py")])
+
+        assert main.delete_sources(chroma_store, ["/repo/x.py"]) == []
+        [(moved_id, text, metadata)] = stored(chroma_store, "/repo/y.py")
+        assert text == LICENSE
+        assert metadata["duplicate_sources"] == "/repo/y.py"
+        assert metadata["duplicate_count"] == 1
+
+        # x.py comes back with other content: y.py's chunk must not be overwritten
+        index_into(chroma_store, [chunk(CODE, "/repo/x.py")])
+
+        assert stored(chroma_store, "/repo/y.py") == [(moved_id, LICENSE, metadata)]
+        assert [text for _, text, _ in stored(chroma_store, "/repo/x.py")] == [CODE]
+
+    def test_removed_copy_is_dropped_while_stored_copy_stays(self, chroma_store):
+        import main
+        index_into(chroma_store, [chunk(LICENSE, "/repo/x.py"), chunk(LICENSE, "/repo/y.py"), chunk(LICENSE, "/repo/z.py")])
+
+        main.delete_sources(chroma_store, ["/repo/y.py"])
+
+        [(_, _, metadata)] = stored(chroma_store, "/repo/x.py")
+        assert metadata["duplicate_sources"] == "/repo/x.py\n/repo/z.py"
+        assert metadata["duplicate_count"] == 2
+
+        # Deleting the stored copy afterwards must not resurrect y.py
+        main.delete_sources(chroma_store, ["/repo/x.py"])
+        assert stored(chroma_store, "/repo/y.py") == []
+        [(_, text, metadata)] = stored(chroma_store, "/repo/z.py")
+        assert text == LICENSE
+        assert metadata["duplicate_count"] == 1
+
+    def test_near_duplicate_copy_is_reindexed_not_reassigned(self, chroma_store):
+        import main
+        edited = CODE.replace("option=19", "option=190")
+        index_into(
+            chroma_store,
+            [chunk(CODE, "/repo/x.py"), chunk(edited, "/repo/y.py"), chunk(LICENSE, "/repo/y.py")],
+            near_threshold=0.8
+        )
+        [(_, _, metadata)] = stored(chroma_store, "/repo/x.py")
+        assert metadata["near_duplicate_sources"] == "/repo/y.py"
+
+        assert main.delete_sources(chroma_store, ["/repo/x.py"]) == ["/repo/y.py"]
+
+        # x.py's text is never served as y.py; y.py's own chunks go too, to be re-indexed whole
+        assert chroma_store._collection.count() == 0
+
+    def test_delete_removes_chunk_when_every_copy_goes(self, chroma_store):
+        import main
+        index_into(chroma_store, [chunk(LICENSE, "/repo/x.py"), chunk(LICENSE, "/repo/y.py")])
+
+        assert main.delete_sources(chroma_store, ["/repo/x.py", "/repo/y.py"]) == []
+
+        assert chroma_store._collection.count() == 0
@@ -0,0 +1,182 @@
+"""
+Tests for chunking.py - Language-aware chunking
+"""
+import pytest
+from langchain_core.documents import Document
+
+from chunking import LanguageAwareSplitter, PythonAstSplitter, detect_language, parse_chunk_sizes
+
+PYTHON = "\n".join(
+    f"def handler_{i}(request):\n    value = process(request, option={i})\n    return value\n"
+    for i in range(10)
+)
+
+
+def doc(text, source, **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+
+class TestParseChunkSizes:
+    def test_sizes_and_optional_overlap(self):
+        assert parse_chunk_sizes("python=2000:250, markdown=1000,,") == {
+            "python": (2000, 250),
+            "markdown": (1000, None),
+        }
+
+    def test_aliases_and_empty(self):
+        assert parse_chunk_sizes("TypeScript=800") == {"ts": (800, None)}
+        assert parse_chunk_sizes("") == {}
+
+    def test_invalid_entry(self):
+        with pytest.raises(ValueError):
+            parse_chunk_sizes("python")
+
+
+class TestDetectLanguage:
+    def test_by_extension(self):
+        assert detect_language({"source": "/repo/app/Main.PY"}) == "python"
+        assert detect_language({"source": "infra/main.tf"}) == "terraform"
+        assert detect_language({"source": "notes.txt"}) is None
+        assert detect_language({}) is None
+
+    def test_notebook_cells(self):
+        assert detect_language({"source": "a.ipynb", "type": "notebook", "cell_type": "markdown"}) == "markdown"
+        assert detect_language({"source": "a.ipynb", "type": "notebook", "cell_type": "code", "language": "JavaScript"}) == "js"
+        assert detect_language({"source": "a.ipynb", "type": "notebook", "cell_type": "code"}) is None
+
+
+class TestLanguageAwareSplitter:
+    def test_python_chunks_end_at_function_boundaries(self):
+        splitter = LanguageAwareSplitter(chunk_size=200, chunk_overlap=0)
+        chunks = splitter.split_documents([doc(PYTHON, "handlers.py")])
+
+        assert len(chunks) > 1
+        assert all(c.page_content.startswith("def handler_") for c in chunks)
+        assert all(c.metadata["source"] == "handlers.py" for c in chunks)
+
+    def test_sql_splits_between_statements(self):
+        sql = "".join(f"CREATE TABLE t{i} (\n  id int,\n  name text\n);\n" for i in range(6))
+        splitter = LanguageAwareSplitter(chunk_size=120, chunk_overlap=0)
+        chunks = splitter.split_documents([doc(sql, "schema.sql")])
+
+        assert len(chunks) > 1
+        assert all(c.page_content.startswith("CREATE TABLE") for c in chunks)
+        assert all(c.page_content.rstrip().endswith(");") for c in chunks)
+
+    def test_terraform_splits_between_blocks(self):
+        hcl = "".join(f'resource "null_resource" "r{i}" {{\n  triggers = {{ id = "{i}" }}\n}}\n\n' for i in range(6))
+        splitter = LanguageAwareSplitter(chunk_size=120, chunk_overlap=0)
+        chunks = splitter.split_documents([doc(hcl, "main.tf")])
+
+        assert len(chunks) > 1
+        assert all(c.page_content.startswith("resource ") for c in chunks)
+
+    def test_per_language_sizes(self):
+        splitter = LanguageAwareSplitter(sizes=parse_chunk_sizes("python=400:0,default=1000:100"), python_ast=False)
+
+        python = splitter.splitter_for({"source": "a.py"})
+        assert (python._chunk_size, python._chunk_overlap) == (400, 0)
+        markdown = splitter.splitter_for({"source": "README.md"})
+        assert (markdown._chunk_size, markdown._chunk_overlap) == (1000, 100)
+        assert splitter.splitter_for({"source": "notes.txt"}) is splitter.generic
+
+    def test_overlap_scales_with_size(self):
+        splitter = LanguageAwareSplitter(chunk_size=1500, chunk_overlap=300, sizes={"python": (3000, None)})
+        assert splitter.splitter_for({"source": "a.py"}).fallback._chunk_overlap == 600
+
+    def test_unknown_extension_uses_generic_splitter(self):
+        text = "word " * 100
+        splitter = LanguageAwareSplitter(chunk_size=100, chunk_overlap=0)
+        chunks = splitter.split_documents([doc(text, "notes.txt"), doc(text, "data.unknown")])
+
+        assert chunks
+        assert all(len(c.page_content) <= 100 for c in chunks)
+
+
+MODULE = '''"""Payment handlers"""
+import os
+
+TIMEOUT = 30
+
+
+@retry(3)
+def charge(card, amount):
+    return gateway.charge(card, amount)
+
+
+class Refunds:
+    """Refund workflow"""
+
+    limit = 100
+
+    def create(self, payment):
+        return self.gateway.refund(payment)
+
+    async def status(self, refund_id):
+        return await self.gateway.status(refund_id)
+'''
+
+
+def ast_splitter(chunk_size=1000):
+    return LanguageAwareSplitter(chunk_size=chunk_size, chunk_overlap=0).splitter_for({"source": "a.py"})
+
+
+class TestPythonAstSplitter:
+    def test_top_level_definitions(self):
+        chunks = ast_splitter().split_documents([doc(MODULE, "payments.py")])
+
+        assert [(c.metadata["symbol"], c.metadata["kind"]) for c in chunks] == [
+            ("", "module"), ("charge", "function"), ("Refunds", "class")
+        ]
+        charge = chunks[1]
+        assert charge.page_content.startswith("@retry(3)\ndef charge")
+        assert (charge.metadata["start_line"], charge.metadata["end_line"]) == (7, 9)
+        assert charge.metadata["source"] == "payments.py"
+        # Segments cover the file without overlap
+        assert "\n".join(c.page_content for c in chunks).replace("\n", "") == MODULE.replace("\n", "")
+
+    def test_large_class_is_split_per_method(self):
+        chunks = ast_splitter(chunk_size=150).split_documents([doc(MODULE, "payments.py")])
+        by_symbol = {c.metadata["symbol"]: c for c in chunks}
+
+        assert by_symbol["Refunds"].metadata["kind"] == "class"
+        assert by_symbol["Refunds"].page_content.startswith("class Refunds:")
+        assert "limit = 100" in by_symbol["Refunds"].page_content
+        assert by_symbol["Refunds.create"].metadata["kind"] == "method"
+        status = by_symbol["Refunds.status"]
+        assert status.page_content.strip().startswith("async def status")
+        assert (status.metadata["start_line"], status.metadata["end_line"]) == (20, 21)
+
+    def test_oversized_function_is_split_by_lines(self):
+        body = "".join(f"    step_{i}()\n" for i in range(40))
+        chunks = ast_splitter(chunk_size=100).split_documents([doc(f"def pipeline():\n{body}", "a.py")])
+
+        assert len(chunks) > 1
+        assert all(c.metadata["symbol"] == "pipeline" for c in chunks)
+        assert all(len(c.page_content) <= 100 for c in chunks)
+        assert chunks[0].metadata["start_line"] == 1
+        assert chunks[-1].metadata["end_line"] == 41
+
+    def test_syntax_error_falls_back_to_text_splitter(self):
+        chunks = ast_splitter().split_documents([doc("print 'python 2'\n", "legacy.py")])
+
+        assert [c.page_content for c in chunks] == ["print 'python 2'"]
+        assert "symbol" not in chunks[0].metadata
+
+    def test_comment_only_file_falls_back_to_text_splitter(self):
+        source = "# Copyright 2024 Example Corp\n# Licensed under the Apache License, Version 2.0\n"
+        chunks = ast_splitter().split_documents([doc(source, "pkg/__init__.py"), doc("\n\n", "empty.py")])
+
+        assert [c.page_content for c in chunks] == [source.strip()]
+        assert chunks[0].metadata["source"] == "pkg/__init__.py"
+
+    def test_notebook_python_cells_use_ast(self):
+        splitter = LanguageAwareSplitter()
+        cell = {"source": "a.ipynb", "type": "notebook", "cell_type": "code", "language": "python"}
+
+        assert isinstance(splitter.splitter_for(cell), PythonAstSplitter)
+        assert splitter.split_documents([doc("def f():\n    return 1\n", **cell)])[0].metadata["symbol"] == "f"
+
+    def test_disabled(self):
+        splitter = LanguageAwareSplitter(python_ast=False)
+        assert not isinstance(splitter.splitter_for({"source": "a.py"}), PythonAstSplitter)
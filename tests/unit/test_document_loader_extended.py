@@ -11,7 +11,9 @@ from document_loader import (
     process_file,
     load_documents_robustly,
     EXTENSOES_SUPORTADAS,
-    SPECIAL_FILES
+    SPECIAL_FILES,
+    BINARY_CONTENT,
+    is_binary
 )
 
 
@@ -411,3 +413,58 @@ class TestExtensionsAndSpecialFiles:
     def test_license_in_special_files(self):
         """Test that LICENSE is in special files"""
         assert "LICENSE" in SPECIAL_FILES
+
+
+class TestBinarySniffing:
+    """Tests for binary content detection"""
+
+    def test_is_binary(self):
+        """Test null bytes and control-character density"""
+        assert is_binary(b"ELF\x02\x01\x00\x00\x00")
+        assert is_binary(bytes(range(1, 32)) * 10)
+        assert not is_binary(b"#!/bin/sh\nexec python3 \"$@\"\n")
+        assert not is_binary("ação = 'código'\n".encode("utf-8"))
+        assert not is_binary(b"")
+
+    def test_process_file_rejects_binary(self):
+        """Test that binary content is not turned into a document"""
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(b"text header\x00\x01\x02" * 100)
+            temp_path = f.name
+
+        try:
+            ext, docs, error = process_file(temp_path, ".txt")
+            assert docs == []
+            assert error == BINARY_CONTENT
+        finally:
+            os.unlink(temp_path)
+
+    def test_process_file_normalizes_newlines(self):
+        """Test that CRLF text reads the same as in text mode"""
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+            f.write(b"line one\r\nline two\r\n")
+            temp_path = f.name
+
+        try:
+            ext, docs, error = process_file(temp_path, ".txt")
+            assert docs[0].page_content == "line one\nline two\n"
+        finally:
+            os.unlink(temp_path)
+
+    def test_binary_files_counted_as_discarded(self):
+        """Test that extensionless binaries are counted per extension"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "README"), "w") as f:
+                f.write("# Project readme content")
+            with open(os.path.join(tmpdir, "pre-commit"), "wb") as f:
+                f.write(b"\x7fELF" + bytes(200))
+            with open(os.path.join(tmpdir, "data.txt"), "wb") as f:
+                f.write(bytes(range(256)) * 4)
+
+            processed = defaultdict(int)
+            discarded = defaultdict(int)
+            docs = list(load_documents_robustly(tmpdir, processed, discarded))
+
+            assert [os.path.basename(d.metadata["source"]) for d in docs] == ["README"]
+            assert discarded["_binary"] == 1
+            assert discarded[".txt_binary"] == 1
@@ -0,0 +1,147 @@
+"""
+Tests for embedding_cache.py - Persistent content-addressed embedding cache
+"""
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from embedding_cache import (
+    EmbeddingCache,
+    CachedEmbeddings,
+    get_cached_embeddings,
+    get_embedding_model_id,
+    hash_text,
+)
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record every text they embed"""
+
+    def __init__(self):
+        self.model_name = "fake-model"
+        self.encode_kwargs = {"normalize_embeddings": True}
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5, -1.0] for t in texts]
+
+    def embed_query(self, text):
+        return [0.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    yield c
+    c.close()
+
+
+class TestModelId:
+    def test_includes_model_and_normalization(self):
+        model_id = get_embedding_model_id(FakeEmbeddings())
+        assert "fake-model" in model_id
+        assert "normalize=True" in model_id
+
+    def test_normalization_changes_id(self):
+        a, b = FakeEmbeddings(), FakeEmbeddings()
+        b.encode_kwargs = {"normalize_embeddings": False}
+        assert get_embedding_model_id(a) != get_embedding_model_id(b)
+
+
+class TestEmbeddingCache:
+    def test_put_and_get(self, cache):
+        cache.put_many({hash_text("hello"): [1.0, 2.0]}, "m")
+        found = cache.get_many([hash_text("hello"), hash_text("other")], "m")
+        assert found == {hash_text("hello"): [1.0, 2.0]}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_model_isolation(self, cache):
+        cache.put_many({hash_text("hello"): [1.0]}, "model-a")
+        assert cache.get_many([hash_text("hello")], "model-b") == {}
+
+    def test_persistence(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        first = EmbeddingCache(path)
+        first.put_many({hash_text("x"): [3.0]}, "m")
+        first.close()
+
+        second = EmbeddingCache(path)
+        assert second.get_many([hash_text("x")], "m") == {hash_text("x"): [3.0]}
+        second.close()
+
+    def test_lru_eviction(self, tmp_path):
+        # Each vector is 4 floats = 16 bytes; budget fits only a few entries
+        c = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_size_mb=48 / (1024 * 1024))
+        c.put_many({"old": [0.0] * 4}, "m")
+        c.put_many({"mid": [0.0] * 4}, "m")
+        c.get_many(["old"], "m")  # touch "old" so "mid" is least recently used
+        c.put_many({"new1": [0.0] * 4, "new2": [0.0] * 4}, "m")
+
+        remaining = c.get_many(["old", "mid", "new1", "new2"], "m")
+        assert "mid" not in remaining
+        assert "new1" in remaining and "new2" in remaining
+        assert c.evictions >= 1
+        assert c.stats()["size_mb"] <= c.stats()["max_size_mb"]
+        c.close()
+
+    def test_repeated_put_is_counted_once(self, cache):
+        for _ in range(3):
+            cache.put_many({hash_text("same"): [0.0] * 384}, "m")
+
+        stored = cache._conn.execute("SELECT SUM(LENGTH(vector)) FROM embeddings").fetchone()[0]
+        assert stored == 1536
+        assert cache._size_bytes == stored
+
+    def test_stats(self, cache):
+        cache.put_many({"a": [1.0]}, "m")
+        cache.get_many(["a", "b"], "m")
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class TestCachedEmbeddings:
+    def test_only_misses_are_embedded(self, cache):
+        inner = FakeEmbeddings()
+        cached = CachedEmbeddings(inner, cache)
+
+        first = cached.embed_documents(["aaa", "bb"])
+        second = cached.embed_documents(["bb", "cccc"])
+
+        assert inner.calls == [["aaa", "bb"], ["cccc"]]
+        assert first == [[3.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+        assert second == [[2.0, 0.5, -1.0], [4.0, 0.5, -1.0]]
+
+    def test_duplicates_in_batch_embedded_once(self, cache):
+        inner = FakeEmbeddings()
+        cached = CachedEmbeddings(inner, cache)
+
+        result = cached.embed_documents(["same", "same", "same"])
+
+        assert inner.calls == [["same"]]
+        assert len(result) == 3
+
+    def test_embed_query_passthrough(self, cache):
+        inner = FakeEmbeddings()
+        assert CachedEmbeddings(inner, cache).embed_query("q") == [0.0, 0.0, 0.0]
+        assert cache.hits == 0 and cache.misses == 0
+
+
+class TestGetCachedEmbeddings:
+    def test_disabled(self):
+        inner = MagicMock()
+        with patch.dict(os.environ, {"EMBEDDING_CACHE": "false"}):
+            assert get_cached_embeddings(inner) is inner
+
+    def test_enabled(self, tmp_path):
+        inner = FakeEmbeddings()
+        with patch.dict(os.environ, {
+            "EMBEDDING_CACHE": "true",
+            "EMBEDDING_CACHE_PATH": str(tmp_path / "cache.sqlite3")
+        }):
+            wrapped = get_cached_embeddings(inner)
+        assert isinstance(wrapped, CachedEmbeddings)
+        wrapped.cache.close()
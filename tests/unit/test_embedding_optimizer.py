@@ -5,11 +5,68 @@ import pytest
 from unittest.mock import patch, MagicMock
 from embedding_optimizer import (
     get_optimal_config,
+    get_streaming_config,
+    get_embedding_process_config,
     get_processing_strategy,
     estimate_processing_time
 )
 
 
+class TestGetStreamingConfig:
+    """Tests for get_streaming_config function"""
+    
+    @patch('os.cpu_count')
+    def test_openai_streaming_config(self, mock_cpu):
+        """Test OpenAI workers do not depend on CPUs (the client paces requests)"""
+        mock_cpu.return_value = 1
+        batch_size, max_workers, queue_depth = get_streaming_config("openai")
+        
+        assert batch_size > 0
+        assert max_workers == 4
+        assert queue_depth == max_workers * 2
+    
+    @patch('psutil.virtual_memory')
+    @patch('os.cpu_count')
+    def test_local_streaming_config_low_memory(self, mock_cpu, mock_memory):
+        """Test local providers use smaller batches on small machines"""
+        mock_cpu.return_value = 2
+        mock_memory.return_value = MagicMock(total=4 * 1024**3)  # 4GB
+        
+        batch_size, max_workers, queue_depth = get_streaming_config("sentence-transformers")
+        
+        assert batch_size == 64
+        assert max_workers == 3
+        assert queue_depth == 6
+
+
+class TestGetEmbeddingProcessConfig:
+    """Tests for get_embedding_process_config function"""
+    
+    def test_disabled(self):
+        """Test '0' keeps the model in-process"""
+        assert get_embedding_process_config("0")[0] == 0
+        assert get_embedding_process_config("invalid")[0] == 0
+    
+    @patch('psutil.virtual_memory')
+    @patch('os.cpu_count')
+    def test_explicit_processes_split_cores(self, mock_cpu, mock_memory):
+        """Test torch threads are divided between worker processes"""
+        mock_cpu.return_value = 8
+        mock_memory.return_value = MagicMock(total=16 * 1024**3)
+        
+        assert get_embedding_process_config("4") == (4, 2)
+        assert get_embedding_process_config("auto") == (4, 2)
+    
+    @patch('psutil.virtual_memory')
+    @patch('os.cpu_count')
+    def test_auto_limited_by_memory(self, mock_cpu, mock_memory):
+        """Test auto mode does not start more model copies than memory allows"""
+        mock_cpu.return_value = 16
+        mock_memory.return_value = MagicMock(total=2 * 1024**3)
+        
+        assert get_embedding_process_config("auto") == (2, 8)
+
+
 class TestGetOptimalConfig:
     """Tests for get_optimal_config function"""
     
@@ -0,0 +1,108 @@
+"""
+Tests for git-aware file enumeration and blob ingestion (repo_utils + document_loader)
+"""
+import os
+import subprocess
+
+import pytest
+
+from repo_utils import GitBlobReader, clone_repo, fetch_branch, get_head_commit, list_git_blobs, list_git_files
+
+
+@pytest.fixture
+def repo(tmp_path, git):
+    repo = tmp_path / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "node_modules").mkdir()
+    git(repo, "init", "-q")
+    (repo / ".gitignore").write_text("node_modules/\n*.log\n")
+    (repo / "src" / "app.py").write_text("print('tracked file')\n")
+    (repo / "node_modules" / "lib.js").write_text("module.exports = 'ignored';\n")
+    (repo / "debug.log").write_text("ignored log output\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "first")
+    (repo / "notes.md").write_text("# untracked but not ignored\n")
+    return repo
+
+
+class TestListGitFiles:
+    def test_respects_gitignore_and_includes_untracked(self, repo):
+        files = list_git_files(str(repo))
+        assert set(files) == {".gitignore", "src/app.py", "notes.md"}
+
+    def test_sizes_come_from_tree(self, repo):
+        files = list_git_files(str(repo))
+        assert files["src/app.py"] == len("print('tracked file')\n")
+        # Untracked files have no blob yet
+        assert files["notes.md"] is None
+
+    def test_not_a_repository(self, tmp_path):
+        assert list_git_files(str(tmp_path)) is None
+
+
+class TestLoaderEnumeration:
+    def test_git_repo_skips_ignored_and_git_dir(self, repo, load_repo):
+        docs, _, _ = load_repo(repo)
+        sources = {os.path.relpath(d.metadata["source"], repo) for d in docs}
+        assert sources == {".gitignore", "src/app.py", "notes.md"}
+
+    def test_plain_directory_skips_git_internals(self, tmp_path, load_repo):
+        # A stray .git directory that is not a valid repository falls back to the walk
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".git" / "config.txt").write_text("should never be indexed\n")
+        (tmp_path / "readme.md").write_text("# plain directory\n")
+
+        docs, _, _ = load_repo(tmp_path)
+
+        assert [os.path.basename(d.metadata["source"]) for d in docs] == ["readme.md"]
+
+
+def _branch(repo):
+    return subprocess.run(
+        ["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def no_checkout_clone(repo, tmp_path):
+    clone = tmp_path / "clone"
+    clone_repo(f"file://{repo}", _branch(repo), str(clone), checkout=False)
+    return clone
+
+
+class TestGitBlobIngestion:
+    def test_blob_listing_and_reader(self, repo):
+        blobs = list_git_blobs(str(repo))
+        sha, size = blobs["src/app.py"]
+        assert "notes.md" not in blobs  # untracked
+        with GitBlobReader(str(repo)) as reader:
+            assert reader.read(sha) == b"print('tracked file')\n"
+            assert len(reader.read(sha)) == size
+            with pytest.raises(KeyError):
+                reader.read("0" * 40)
+
+    def test_clone_without_checkout_loads_blobs(self, repo, no_checkout_clone, load_repo):
+        assert sorted(os.listdir(no_checkout_clone)) == [".git"]
+
+        docs, _, _ = load_repo(no_checkout_clone, git_ref="HEAD")
+
+        by_source = {os.path.relpath(d.metadata["source"], no_checkout_clone): d for d in docs}
+        assert set(by_source) == {".gitignore", "src/app.py"}
+        assert by_source["src/app.py"].page_content == "print('tracked file')\n"
+        assert by_source["src/app.py"].metadata["blob_sha"] == list_git_blobs(str(repo))["src/app.py"][0]
+
+    def test_file_paths_select_blobs(self, no_checkout_clone, load_repo):
+        docs, _, _ = load_repo(no_checkout_clone, git_ref="HEAD", file_paths=["src/app.py", "missing.py"])
+
+        assert [os.path.basename(d.metadata["source"]) for d in docs] == ["app.py"]
+
+    def test_fetch_without_checkout_moves_head_only(self, repo, no_checkout_clone, git, load_repo):
+        (repo / "src" / "app.py").write_text("print('second version')\n")
+        git(repo, "commit", "-q", "-am", "second")
+
+        new_commit = fetch_branch(str(no_checkout_clone), _branch(repo), checkout=False)
+
+        assert new_commit == get_head_commit(str(repo))
+        assert sorted(os.listdir(no_checkout_clone)) == [".git"]
+        docs, _, _ = load_repo(no_checkout_clone, git_ref=new_commit, file_paths=["src/app.py"])
+        assert docs[0].page_content == "print('second version')\n"
@@ -0,0 +1,94 @@
+"""
+Tests for process-pool parsing of heavy formats (PDF) in document_loader.py
+"""
+import os
+import time
+from unittest.mock import patch
+
+import document_loader
+from document_loader import _process_heavy_file
+
+
+def minimal_pdf(text):
+    """Builds a one-page PDF showing `text`"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+class TestProcessPool:
+    def test_pdf_parsed_in_worker_process(self, tmp_path, load_repo):
+        (tmp_path / "manual.pdf").write_bytes(minimal_pdf("Installation guide"))
+        (tmp_path / "notes.md").write_text("# Plain text stays on the thread path\n")
+
+        docs, processed, _ = load_repo(tmp_path, heavy_workers=1)
+
+        by_name = {os.path.basename(d.metadata["source"]): d for d in docs}
+        assert "Installation guide" in by_name["manual.pdf"].page_content
+        assert "notes.md" in by_name
+        assert processed == {".pdf": 1, ".md": 1}
+
+    def test_corrupt_pdf_does_not_stop_loading(self, tmp_path, capsys, load_repo):
+        (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4\nthis is not really a pdf at all\n")
+        (tmp_path / "ok.pdf").write_bytes(minimal_pdf("Still loaded"))
+
+        docs, _, _ = load_repo(tmp_path, heavy_workers=2)
+
+        assert [os.path.basename(d.metadata["source"]) for d in docs] == ["ok.pdf"]
+        assert "broken.pdf" in capsys.readouterr().out
+
+    def test_zero_workers_keeps_pdfs_on_threads(self, tmp_path, load_repo):
+        (tmp_path / "doc.pdf").write_bytes(b"%PDF-1.4 placeholder content")
+        with patch("document_loader.PyPDFLoader") as mock_loader:
+            mock_loader.return_value.lazy_load.return_value = iter([])
+
+            load_repo(tmp_path, heavy_workers=0)
+
+        mock_loader.assert_called_once()
+
+
+class TestTimeout:
+    def test_slow_parse_is_abandoned(self):
+        def slow(full_path, ext, *args, **kwargs):
+            try:
+                time.sleep(5)
+            except Exception as e:
+                return ext, [], f"AVISO: Erro ao processar '{full_path}': {e}"
+            return ext, ["late"], None
+
+        with patch.object(document_loader, "process_file", slow):
+            started = time.time()
+            ext, docs, error = _process_heavy_file("/repo/slow.pdf", ".pdf", 0.2)
+
+        assert time.time() - started < 2
+        assert docs == []
+        assert "timed out" in error
+
+
+def test_pdf_blob_parsed_in_worker_process(tmp_path, git, load_repo):
+    (tmp_path / "manual.pdf").write_bytes(minimal_pdf("Read from the object database"))
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-q", "-m", "pdf")
+    (tmp_path / "manual.pdf").unlink()
+
+    docs, _, _ = load_repo(tmp_path, heavy_workers=1, git_ref="HEAD")
+
+    assert "Read from the object database" in docs[0].page_content
+    assert docs[0].metadata["blob_sha"]
@@ -0,0 +1,216 @@
+"""
+Tests for incremental re-indexing (git diff between indexed commit and HEAD)
+"""
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from index_state import load_index_state, save_index_state, get_indexed_commit
+from repo_utils import get_head_commit, get_changed_files, ensure_commit_available
+
+
+@pytest.fixture
+def git_repo(tmp_path, git):
+    """Creates a small git repository with one commit"""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    (repo / "keep.py").write_text("print('unchanged file')\n")
+    (repo / "edit.py").write_text("print('original version')\n")
+    (repo / "gone.md").write_text("# This file will be deleted\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "first")
+    return repo
+
+
+class TestGitDiff:
+    """Tests for git helpers used by the refresh path"""
+
+    def test_get_head_commit(self, git_repo):
+        commit = get_head_commit(str(git_repo))
+        assert commit is not None
+        assert len(commit) == 40
+
+    def test_get_head_commit_not_a_repo(self, tmp_path):
+        assert get_head_commit(str(tmp_path)) is None
+
+    def test_get_changed_files(self, git_repo, git):
+        old = get_head_commit(str(git_repo))
+        (git_repo / "edit.py").write_text("print('new version')\n")
+        (git_repo / "gone.md").unlink()
+        (git_repo / "new file.ts").write_text("export const x = 1;\n")
+        git(git_repo, "add", "-A")
+        git(git_repo, "commit", "-q", "-m", "second")
+        new = get_head_commit(str(git_repo))
+
+        changes = get_changed_files(str(git_repo), old, new)
+
+        assert changes["added"] == ["new file.ts"]
+        assert changes["modified"] == ["edit.py"]
+        assert changes["deleted"] == ["gone.md"]
+
+    def test_rename_is_delete_plus_add(self, git_repo, git):
+        old = get_head_commit(str(git_repo))
+        git(git_repo, "mv", "keep.py", "moved.py")
+        git(git_repo, "commit", "-q", "-m", "rename")
+        new = get_head_commit(str(git_repo))
+
+        changes = get_changed_files(str(git_repo), old, new)
+
+        assert changes["added"] == ["moved.py"]
+        assert changes["deleted"] == ["keep.py"]
+        assert changes["modified"] == []
+
+    def test_ensure_commit_available_existing(self, git_repo):
+        commit = get_head_commit(str(git_repo))
+        assert ensure_commit_available(str(git_repo), commit) is True
+
+    def test_ensure_commit_available_missing(self, git_repo):
+        assert ensure_commit_available(str(git_repo), "0" * 40) is False
+
+
+class TestIndexState:
+    """Tests for the persisted index state"""
+
+    def test_missing_state_is_empty(self, tmp_path):
+        assert load_index_state(str(tmp_path / "db")) == {}
+        assert get_indexed_commit(str(tmp_path / "db")) is None
+
+    def test_roundtrip(self, tmp_path):
+        db_path = str(tmp_path / "db")
+        save_index_state(db_path, {"commit": "abc123", "branch": "main"})
+        assert load_index_state(db_path)["branch"] == "main"
+        assert get_indexed_commit(db_path) == "abc123"
+
+    def test_corrupted_state_is_empty(self, tmp_path):
+        db_path = tmp_path / "db"
+        db_path.mkdir()
+        (db_path / "index_state.json").write_text("{not json")
+        assert load_index_state(str(db_path)) == {}
+
+
+class TestLoadSelectedFiles:
+    """Tests for loading only a subset of files"""
+
+    def test_file_paths_restricts_loading(self, git_repo, load_repo):
+        docs, _, _ = load_repo(git_repo, file_paths=["edit.py", "missing.py"])
+        assert [os.path.basename(d.metadata["source"]) for d in docs] == ["edit.py"]
+
+    def test_empty_file_paths_loads_nothing(self, git_repo, load_repo):
+        assert load_repo(git_repo, file_paths=[])[0] == []
+
+
+class TestRefreshIndex:
+    """Tests for main.refresh_index"""
+
+    def test_up_to_date(self):
+        import main
+        vectorstore = MagicMock()
+        with patch("main.load_index_state", return_value={"commit": "a" * 40, "branch": "master"}), \
+             patch.dict(os.environ, {"REPO_BRANCH": "master"}), \
+             patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="a" * 40), \
+             patch("main.index_documents") as mock_index:
+            result = main.refresh_index(vectorstore)
+
+        assert result["status"] == "up_to_date"
+        mock_index.assert_not_called()
+        vectorstore._collection.delete.assert_not_called()
+
+    def test_incremental_update(self, sample_documents):
+        import main
+        vectorstore = MagicMock()
+        changes = {"added": ["new.py"], "modified": ["edit.py"], "deleted": ["gone.md"]}
+        with patch("main.load_index_state", return_value={"commit": "a" * 40}), \
+             patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="b" * 40), \
+             patch("main.ensure_commit_available", return_value=True), \
+             patch("main.get_changed_files", return_value=changes), \
+             patch("main.load_documents_robustly", return_value=sample_documents) as mock_load, \
+             patch("main.index_documents", return_value={"chunks": 3}) as mock_index, \
+             patch("main.record_indexed_commit") as mock_record:
+            result = main.refresh_index(vectorstore)
+
+        assert result["status"] == "updated"
+        assert result["added"] == 1 and result["modified"] == 1 and result["deleted"] == 1
+        assert mock_load.call_args.kwargs["file_paths"] == ["new.py", "edit.py"]
+        deleted = vectorstore._collection.delete.call_args.kwargs["where"]["source"]["$in"]
+        assert [os.path.basename(p) for p in deleted] == ["edit.py", "gone.md"]
+        assert result["chunks_indexed"] == 3
+        mock_index.assert_called_once()
+        mock_record.assert_called_once()
+
+    def test_rebuild_when_commit_unavailable(self, sample_documents):
+        import main
+        vectorstore = MagicMock()
+        with patch("main.load_index_state", return_value={"commit": "a" * 40}), \
+             patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="b" * 40), \
+             patch("main.ensure_commit_available", return_value=False), \
+             patch("main.build_index", return_value={"chunks": 3}) as mock_build:
+            result = main.refresh_index(vectorstore)
+
+        assert result["status"] == "rebuilt"
+        assert result["chunks_indexed"] == 3
+        vectorstore.reset_collection.assert_called_once()
+        mock_build.assert_called_once()
+        # The rebuild is recorded as in progress so a crash resumes it
+        assert main.BuildManifest(main.DB_PATH).is_building()
+
+    def test_unfinished_build_is_resumed_not_diffed(self):
+        import main
+        manifest = main.BuildManifest(main.DB_PATH)
+        manifest.start("a" * 40, "master")
+        manifest.mark_files_complete(["/repo/ok.py"])
+        manifest.update(failed_batches=1, chunks_failed=5)
+        manifest.close()
+        vectorstore = MagicMock()
+        with patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="b" * 40), \
+             patch("main.get_changed_files") as mock_diff, \
+             patch("main.build_index", return_value={"chunks": 5, "chunks_failed": 0}) as mock_build, \
+             patch("main.record_indexed_commit") as mock_record:
+            result = main.refresh_index(vectorstore)
+
+        assert result["status"] == "resumed"
+        assert mock_build.call_args.kwargs["resume"] is True
+        mock_diff.assert_not_called()
+        mock_record.assert_not_called()
+        # The completed-files log survives for the resumed build
+        assert main.BuildManifest(main.DB_PATH).load_completed() == {"/repo/ok.py"}
+
+    def test_missing_chunks_keep_old_commit(self, sample_documents):
+        import main
+        vectorstore = MagicMock()
+        changes = {"added": ["new.py"], "modified": [], "deleted": []}
+        with patch("main.load_index_state", return_value={"commit": "a" * 40}), \
+             patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="b" * 40), \
+             patch("main.ensure_commit_available", return_value=True), \
+             patch("main.get_changed_files", return_value=changes), \
+             patch("main.load_documents_robustly", return_value=sample_documents), \
+             patch("main.index_documents", return_value={"chunks": 3, "chunks_failed": 2}), \
+             patch("main.record_indexed_commit") as mock_record:
+            result = main.refresh_index(vectorstore)
+
+        assert result["status"] == "incomplete"
+        assert result["chunks_missing"] == 2
+        mock_record.assert_not_called()
+
+    def test_near_duplicate_copies_are_reindexed(self, sample_documents):
+        import main
+        changes = {"added": [], "modified": [], "deleted": ["gone.md"]}
+        near_copy = os.path.join(main.LOCAL_REPO_PATH, "docs", "copy.md")
+        with patch("main.load_index_state", return_value={"commit": "a" * 40}), \
+             patch("main.clone_repo"), \
+             patch("main.fetch_branch", return_value="b" * 40), \
+             patch("main.ensure_commit_available", return_value=True), \
+             patch("main.get_changed_files", return_value=changes), \
+             patch("main.delete_sources", return_value=[near_copy]), \
+             patch("main.load_documents_robustly", return_value=sample_documents) as mock_load, \
+             patch("main.index_documents", return_value={"chunks": 1}), \
+             patch("main.record_indexed_commit"):
+            main.refresh_index(MagicMock())
+
+        assert mock_load.call_args.kwargs["file_paths"] == [os.path.join("docs", "copy.md")]
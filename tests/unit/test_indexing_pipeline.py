@@ -0,0 +1,380 @@
+"""
+Tests for indexing_pipeline.py - Bounded streaming indexing pipeline
+"""
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from indexing_pipeline import IndexingPipeline, make_chunk_id
+
+
+def make_documents(count, size=120):
+    return [Document(page_content=f"doc {i} " + "x" * size, metadata={"source": f"f{i}.py"}) for i in range(count)]
+
+
+class RecordingEmbedder:
+    """embed_batch stand-in that records batches"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, batch, batch_num):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append((batch_num, len(batch)))
+        return fake_embed(batch, batch_num)
+
+
+class RecordingWriter:
+    """write_batch stand-in that records every bulk write and its thread"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.writes = []
+        self.ids = []
+        self.threads = set()
+        self.delay = delay
+        self.fail = fail
+
+    def __call__(self, chunks, ids, vectors):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.writes.append((list(ids), vectors))
+        self.ids.extend(ids)
+        return 0 if self.fail else len(chunks)
+
+
+def fake_embed(batch, batch_num):
+    return [[float(len(c.page_content))] for c in batch]
+
+
+def make_pipeline(embed, writer=None, batch_size=4, max_workers=2, queue_depth=2):
+    return IndexingPipeline(
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+        embed_batch=embed,
+        write_batch=writer or RecordingWriter(),
+        batch_size=batch_size,
+        max_workers=max_workers,
+        queue_depth=queue_depth,
+        token_count_method="local"
+    )
+
+
+class TestIndexingPipeline:
+    def test_all_chunks_stored(self):
+        embedder, writer = RecordingEmbedder(), RecordingWriter()
+        stats = make_pipeline(embedder, writer).run(iter(make_documents(10)))
+
+        assert stats["documents"] == 10
+        assert stats["chunks"] == 10
+        assert stats["chunks_stored"] == 10
+        assert stats["batches"] == 3
+        assert sorted(n for _, n in embedder.batches) == [2, 4, 4]
+        assert stats["tokens"] > 0
+        assert stats["first_write_seconds"] is not None
+        assert len(set(writer.ids)) == 10
+
+    def test_chunk_ids_are_deterministic(self):
+        first, second = RecordingWriter(), RecordingWriter()
+        make_pipeline(fake_embed, first, max_workers=1).run(iter(make_documents(6)))
+        make_pipeline(fake_embed, second, max_workers=1).run(iter(make_documents(6)))
+        assert first.ids == second.ids
+        assert make_chunk_id("a.py", 0, 0) != make_chunk_id("a.py", 0, 1)
+
+    def test_files_complete_callback(self):
+        completed = []
+        docs = [
+            Document(page_content="a" * 50, metadata={"source": "a.pdf"}),
+            Document(page_content="b" * 50, metadata={"source": "a.pdf"}),
+            Document(page_content="c" * 50, metadata={"source": "c.py"}),
+        ]
+        pipeline = make_pipeline(fake_embed, batch_size=1)
+        pipeline.on_files_complete = completed.extend
+        stats = pipeline.run(iter(docs))
+
+        assert sorted(completed) == ["a.pdf", "c.py"]
+        assert stats["files_completed"] == 2
+
+    def test_failed_batch_keeps_file_incomplete(self):
+        completed = []
+
+        def flaky_embed(batch, batch_num):
+            return None if batch[0].metadata["source"] == "bad.py" else fake_embed(batch, batch_num)
+
+        docs = [
+            Document(page_content="ok" * 20, metadata={"source": "good.py"}),
+            Document(page_content="no" * 20, metadata={"source": "bad.py"}),
+        ]
+        pipeline = make_pipeline(flaky_embed, batch_size=1)
+        pipeline.on_files_complete = completed.extend
+        stats = pipeline.run(iter(docs))
+
+        assert completed == ["good.py"]
+        assert stats["failed_batches"] == 1
+        assert stats["chunks_failed"] == 1
+
+    def test_empty_input(self):
+        embedder = RecordingEmbedder()
+        stats = make_pipeline(embedder).run(iter([]))
+        assert stats["documents"] == 0
+        assert stats["batches"] == 0
+        assert embedder.batches == []
+
+    def test_backpressure_bounds_consumption(self):
+        """A slow embed stage must stop the loader from racing ahead"""
+        consumed = []
+
+        def documents():
+            for doc in make_documents(200):
+                consumed.append(doc)
+                yield doc
+
+        gate = threading.Event()
+
+        def blocked_embed(batch, batch_num):
+            gate.wait(timeout=5)
+            return fake_embed(batch, batch_num)
+
+        pipeline = make_pipeline(blocked_embed, batch_size=1, max_workers=1, queue_depth=2)
+        runner = threading.Thread(target=pipeline.run, args=(documents(),))
+        runner.start()
+        time.sleep(0.5)
+        in_flight = len(consumed)
+        gate.set()
+        runner.join(timeout=10)
+
+        # worker (1) + the queues of depth 2 ahead of the embed stage + one item held by each stage thread
+        assert in_flight < 20
+        assert len(consumed) == 200
+
+    def test_stage_error_is_raised(self):
+        def failing_embed(batch, batch_num):
+            raise RuntimeError("boom")
+
+        with pytest.raises(Exception, match="embed"):
+            make_pipeline(failing_embed).run(iter(make_documents(5)))
+
+    def test_loader_error_is_raised(self):
+        def documents():
+            yield make_documents(1)[0]
+            raise OSError("disk gone")
+
+        with pytest.raises(Exception, match="load"):
+            make_pipeline(fake_embed).run(documents())
+
+
+def make_split_pipeline(writer, embed=fake_embed, batch_size=2, write_batch_size=None):
+    return IndexingPipeline(
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+        batch_size=batch_size,
+        max_workers=3,
+        embed_batch=embed,
+        write_batch=writer,
+        write_batch_size=write_batch_size,
+        queue_depth=4,
+        token_count_method="local"
+    )
+
+
+class TestBulkWriter:
+    def test_single_writer_stores_precomputed_vectors(self):
+        writer = RecordingWriter()
+        stats = make_split_pipeline(writer).run(iter(make_documents(10)))
+
+        assert writer.threads == {"index-write"}
+        ids = [i for batch_ids, _ in writer.writes for i in batch_ids]
+        vectors = [v for _, batch_vectors in writer.writes for v in batch_vectors]
+        assert len(set(ids)) == 10 and len(vectors) == 10
+        assert stats["chunks_stored"] == 10
+        assert stats["batches_stored"] == 5
+        assert stats["writes"] == len(writer.writes)
+        assert stats["write_seconds"] >= 0 and stats["embed_seconds"] >= 0
+
+    def test_slow_writes_are_merged(self):
+        writer = RecordingWriter(delay=0.2)
+        stats = make_split_pipeline(writer, batch_size=1, write_batch_size=8).run(iter(make_documents(12)))
+
+        assert stats["chunks_stored"] == 12
+        assert stats["writes"] < 12
+        assert max(len(batch_ids) for batch_ids, _ in writer.writes) <= 8
+
+    def test_failed_write_fails_merged_batches(self):
+        completed = []
+        pipeline = make_split_pipeline(RecordingWriter(fail=True))
+        pipeline.on_files_complete = completed.extend
+        stats = pipeline.run(iter(make_documents(4)))
+
+        assert completed == []
+        assert stats["failed_batches"] == 2
+        assert stats["chunks_failed"] == 4
+
+    def test_failed_embedding_skips_writer(self):
+        writer = RecordingWriter()
+        stats = make_split_pipeline(writer, embed=lambda batch, batch_num: None).run(iter(make_documents(4)))
+
+        assert writer.writes == []
+        assert stats["failed_batches"] == 2
+
+
+class TestLengthBucketing:
+    def _mixed_documents(self):
+        sizes = [20, 900, 40, 800, 30, 700, 50, 600]
+        return [
+            Document(page_content="x" * size, metadata={"source": f"f{i}.py"})
+            for i, size in enumerate(sizes)
+        ]
+
+    def _run(self, length_bucket_batches):
+        embedded = []
+
+        def embed(batch, batch_num):
+            embedded.append([len(c.page_content) for c in batch])
+            return [[float(len(c.page_content))] for c in batch]
+
+        written = {}
+
+        def write(chunks, ids, vectors):
+            for chunk, chunk_id, vector in zip(chunks, ids, vectors):
+                written[chunk_id] = (chunk.metadata["source"], vector)
+            return len(chunks)
+
+        pipeline = IndexingPipeline(
+            text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+            batch_size=2,
+            max_workers=1,
+            embed_batch=embed,
+            write_batch=write,
+            length_bucket_batches=length_bucket_batches
+        )
+        stats = pipeline.run(iter(self._mixed_documents()))
+        return embedded, written, stats
+
+    def test_batches_group_similar_lengths(self):
+        embedded, _, stats = self._run(length_bucket_batches=4)
+        assert embedded == [[20, 30], [40, 50], [600, 700], [800, 900]]
+        assert stats["chunks_stored"] == 8
+
+    def test_file_order_without_bucketing(self):
+        embedded, _, _ = self._run(length_bucket_batches=0)
+        assert embedded[0] == [20, 900]
+
+    def test_vectors_written_under_their_own_ids(self):
+        _, written, _ = self._run(length_bucket_batches=4)
+        for doc in self._mixed_documents():
+            source, vector = written[make_chunk_id(doc.metadata["source"], 0, 0)]
+            assert source == doc.metadata["source"]
+            assert vector == [float(len(doc.page_content))]
+
+
+class TestRetryQueue:
+    def _pipeline(self, embed, write, retry_attempts, batch_size=4):
+        return IndexingPipeline(
+            text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+            batch_size=batch_size,
+            max_workers=2,
+            embed_batch=embed,
+            write_batch=write,
+            retry_attempts=retry_attempts,
+            retry_delay=0
+        )
+
+    def test_transient_embed_failure_is_recovered(self):
+        calls = []
+
+        def flaky_embed(batch, batch_num):
+            calls.append(batch_num)
+            return None if calls.count(batch_num) == 1 and batch_num == 1 else [[1.0]] * len(batch)
+
+        completed = []
+        pipeline = self._pipeline(flaky_embed, lambda chunks, ids, vectors: len(chunks), retry_attempts=2)
+        pipeline.on_files_complete = completed.extend
+        stats = pipeline.run(iter(make_documents(8)))
+
+        assert stats["chunks_stored"] == 8
+        assert stats["failed_batches"] == 0
+        assert stats["chunks_recovered"] == 4
+        assert len(completed) == 8
+
+    def test_failed_write_is_retried_without_reembedding(self):
+        embedded, writes = [], []
+
+        def embed(batch, batch_num):
+            embedded.append(batch_num)
+            return [[1.0]] * len(batch)
+
+        def write(chunks, ids, vectors):
+            writes.append(len(chunks))
+            return 0 if len(writes) == 1 else len(chunks)
+
+        stats = self._pipeline(embed, write, retry_attempts=1).run(iter(make_documents(4)))
+
+        assert stats["chunks_stored"] == 4
+        assert embedded == [1]
+
+    def test_repeat_failure_splits_batch(self):
+        def write(chunks, ids, vectors):
+            # One poisoned chunk fails every write that contains it
+            return 0 if any(c.metadata["source"] == "f2.py" for c in chunks) else len(chunks)
+
+        stats = self._pipeline(fake_embed, write, retry_attempts=3).run(iter(make_documents(4)))
+
+        assert stats["split_batches"] >= 2
+        assert stats["chunks_stored"] == 3
+        assert stats["chunks_failed"] == 1
+        assert stats["failed_batches"] == 1
+
+    def test_without_retries_failures_are_final(self):
+        stats = self._pipeline(lambda batch, n: None, lambda c, i, v: len(c), retry_attempts=0).run(
+            iter(make_documents(4))
+        )
+        assert stats["retried_batches"] == 0
+        assert stats["chunks_failed"] == 4
+
+
+class FailingSplitter:
+    """Picklable splitter that fails on one source"""
+
+    def split_documents(self, documents):
+        if documents[0].metadata["source"] == "f3.pdf":
+            raise ValueError("cannot split f3.pdf")
+        return list(documents)
+
+
+class TestSplitWorkers:
+    def _documents(self):
+        # Several documents per source (PDF pages), enough text for several chunks each
+        return [
+            Document(page_content=f"page {page} of file {i} " + "word " * 150, metadata={"source": f"f{i}.pdf"})
+            for i in range(12)
+            for page in range(3)
+        ]
+
+    def _run(self, split_workers, text_splitter=None):
+        writer, completed = RecordingWriter(), []
+        pipeline = IndexingPipeline(
+            text_splitter=text_splitter or RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20),
+            embed_batch=fake_embed,
+            write_batch=writer,
+            batch_size=8,
+            max_workers=1,
+            token_count_method="local",
+            split_workers=split_workers,
+            on_files_complete=completed.extend
+        )
+        return pipeline.run(iter(self._documents())), writer, completed
+
+    def test_process_pool_matches_in_thread_splitting(self):
+        inline_stats, inline, inline_completed = self._run(0)
+        pooled_stats, pooled, pooled_completed = self._run(2)
+
+        assert pooled.ids == inline.ids
+        assert pooled_stats["chunks"] == inline_stats["chunks"] > 36
+        assert sorted(pooled_completed) == sorted(inline_completed) == sorted({f"f{i}.pdf" for i in range(12)})
+
+    def test_worker_error_fails_split_stage(self):
+        with pytest.raises(Exception, match="split"):
+            self._run(2, text_splitter=FailingSplitter())
@@ -0,0 +1,71 @@
+"""
+Tests for the bounded submission window and size-aware scheduling of load_documents_robustly
+"""
+import os
+import random
+import time
+from collections import defaultdict
+from unittest.mock import patch
+
+import document_loader
+from document_loader import load_documents_robustly
+
+
+def make_files(root, sizes):
+    for name, size in sizes.items():
+        (root / name).write_text("x" * size)
+
+
+def names(docs):
+    return [os.path.basename(d.metadata["source"]) for d in docs]
+
+
+class TestScheduling:
+    def test_largest_files_first(self, tmp_path, load_repo):
+        make_files(tmp_path, {"small.txt": 20, "large.txt": 5000, "medium.txt": 300})
+
+        docs, _, _ = load_repo(tmp_path, max_load_workers=1)
+
+        assert names(docs) == ["large.txt", "medium.txt", "small.txt"]
+
+    def test_ordered_output_is_deterministic(self, tmp_path, load_repo):
+        sizes = {f"f{i:02d}.txt": 20 + i * 7 for i in range(30)}
+        make_files(tmp_path, sizes)
+        real_process_file = document_loader.process_file
+
+        def jittery(*args):
+            time.sleep(random.uniform(0, 0.005))
+            return real_process_file(*args)
+
+        with patch.object(document_loader, "process_file", jittery):
+            first = names(load_repo(tmp_path, max_load_workers=6, ordered=True)[0])
+            second = names(load_repo(tmp_path, max_load_workers=6, ordered=True)[0])
+
+        assert first == second == sorted(sizes, key=lambda name: -sizes[name])
+
+
+class TestWindow:
+    def test_submissions_are_bounded(self, tmp_path):
+        make_files(tmp_path, {f"f{i:03d}.txt": 50 for i in range(100)})
+        started = []
+        real_process_file = document_loader.process_file
+
+        def tracking(full_path, *args):
+            started.append(full_path)
+            return real_process_file(full_path, *args)
+
+        with patch.object(document_loader, "process_file", tracking):
+            # Consumed lazily, so the window is observed mid-stream
+            documents = load_documents_robustly(
+                str(tmp_path), defaultdict(int), defaultdict(int), max_load_workers=2, max_in_flight=3
+            )
+            next(documents)
+            assert len(started) <= 3
+            assert len(list(documents)) == 99
+
+    def test_ordered_window_holds_finished_results(self, tmp_path, load_repo):
+        make_files(tmp_path, {f"f{i:03d}.txt": 500 - i for i in range(40)})
+
+        docs, _, _ = load_repo(tmp_path, max_load_workers=4, max_in_flight=2, ordered=True)
+
+        assert names(docs) == [f"f{i:03d}.txt" for i in range(40)]
@@ -0,0 +1,106 @@
+"""
+Tests for the pluggable loader registry in document_loader.py
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from langchain_core.documents import Document
+
+import document_loader
+from document_loader import get_loader, register_loader
+
+
+@pytest.fixture(autouse=True)
+def restore_registry():
+    by_extension = dict(document_loader._LOADERS_BY_EXTENSION)
+    by_name = list(document_loader._LOADERS_BY_NAME)
+    supported = list(document_loader.EXTENSOES_SUPORTADAS)
+    yield
+    document_loader._LOADERS_BY_EXTENSION.clear()
+    document_loader._LOADERS_BY_EXTENSION.update(by_extension)
+    document_loader._LOADERS_BY_NAME[:] = by_name
+    document_loader.EXTENSOES_SUPORTADAS[:] = supported
+
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    """An importable in-house loader module that is not imported yet"""
+    name = f"inhouse_loader_{os.getpid()}_{id(tmp_path)}"
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    (plugins / f"{name}.py").write_text(textwrap.dedent('''
+        from langchain_core.documents import Document
+
+        def load_schema(full_path, data):
+            if data is None:
+                with open(full_path, "rb") as f:
+                    data = f.read()
+            fields = [line.split(":")[0] for line in data.decode().splitlines() if ":" in line]
+            return [Document(page_content="fields: " + ", ".join(fields), metadata={"source": full_path, "pid": __import__("os").getpid()})]
+    '''))
+    monkeypatch.syspath_prepend(str(plugins))
+    yield name
+    sys.modules.pop(name, None)
+
+
+class TestRegistry:
+    def test_builtin_loaders(self):
+        assert get_loader("data.json", ".json").target is document_loader.load_json
+        assert get_loader("paper.pdf", ".pdf").heavy
+        assert get_loader("main.py", ".py") is None
+
+    def test_callable_for_new_extension(self, tmp_path, load_repo):
+        def load_proto(full_path, data):
+            return [Document(page_content="proto: " + os.path.basename(full_path), metadata={"source": full_path})]
+
+        register_loader(load_proto, extensions=[".proto"])
+        (tmp_path / "api.proto").write_text('syntax = "proto3";\nmessage Ping {}\n')
+
+        docs, processed, _ = load_repo(tmp_path)
+
+        assert ".proto" in document_loader.EXTENSOES_SUPORTADAS
+        assert [d.page_content for d in docs] == ["proto: api.proto"]
+        assert processed == {".proto": 1}
+
+    def test_name_glob_without_extension(self, tmp_path, load_repo):
+        register_loader(lambda path, data: [Document(page_content="pipeline", metadata={"source": path})], names=["jenkinsfile"])
+        (tmp_path / "Jenkinsfile").write_text("pipeline { agent any }\n")
+
+        docs, _, _ = load_repo(tmp_path)
+
+        assert [d.page_content for d in docs] == ["pipeline"]
+
+    def test_string_loader_is_imported_on_first_match(self, tmp_path, plugin_module, load_repo):
+        register_loader(f"{plugin_module}:load_schema", extensions=[".schema"])
+        assert plugin_module not in sys.modules
+
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        (repo / "user.schema").write_text("id: int\nname: str\n")
+        docs, _, _ = load_repo(repo)
+
+        assert plugin_module in sys.modules
+        assert docs[0].page_content == "fields: id, name"
+
+    def test_heavy_string_loader_runs_in_worker_process(self, tmp_path, plugin_module, load_repo):
+        register_loader(f"{plugin_module}:load_schema", extensions=[".schema"], heavy=True)
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        (repo / "order.schema").write_text("total: float\n")
+
+        docs, _, _ = load_repo(repo, heavy_workers=1)
+
+        assert docs[0].page_content == "fields: total"
+        assert docs[0].metadata["pid"] != os.getpid()
+
+
+def test_import_does_not_load_langchain_community():
+    code = "import sys, document_loader; print('langchain_community' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(document_loader.__file__))
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,68 @@
+"""
+Tests for local_embedding_pool.py - Process-pool embedding engine
+"""
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from embedding_cache import get_embedding_model_id
+from embedding_config import EmbeddingProvider
+from local_embedding_pool import LocalEmbeddingPool
+
+
+class FakeModel:
+    """Picklable stand-in for SentenceTransformer (loaded in the workers)"""
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size, normalize_embeddings, convert_to_numpy, show_progress_bar):
+        return np.array([[len(t), os.getpid(), 1.0 if normalize_embeddings else 0.0] for t in texts], dtype=np.float32)
+
+
+def fake_factory(model_name, device):
+    return FakeModel()
+
+
+@pytest.fixture
+def pool():
+    p = LocalEmbeddingPool("fake-model", num_workers=2, encode_batch_size=2, model_factory=fake_factory)
+    yield p
+    p.close()
+
+
+class TestLocalEmbeddingPool:
+    def test_vectors_keep_input_order(self, pool):
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        vectors = pool.embed_documents(texts)
+
+        assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert all(v[2] == 1.0 for v in vectors)
+
+    def test_work_runs_outside_parent_process(self, pool):
+        vectors = pool.embed_documents(["x"] * 8)
+        pids = {int(v[1]) for v in vectors}
+        assert os.getpid() not in pids
+
+    def test_embed_query_and_empty_input(self, pool):
+        assert pool.embed_documents([]) == []
+        assert pool.embed_query("abcd")[0] == 4.0
+
+    def test_cache_id_matches_in_process_embeddings(self):
+        pool = LocalEmbeddingPool("all-MiniLM-L6-v2", num_workers=1, model_factory=fake_factory)
+        assert get_embedding_model_id(pool) == "HuggingFaceEmbeddings:all-MiniLM-L6-v2:normalize=True"
+
+
+class TestProviderSelection:
+    def test_pool_enabled_by_env(self):
+        with patch.dict(os.environ, {"EMBEDDING_PROCESSES": "2"}):
+            embeddings = EmbeddingProvider.get_embeddings("sentence-transformers")
+        assert isinstance(embeddings, LocalEmbeddingPool)
+        assert embeddings.num_workers == 2
+        assert embeddings.model_name == "all-MiniLM-L6-v2"
+
+    def test_pool_disabled_by_default(self):
+        with patch.dict(os.environ, {"EMBEDDING_PROCESSES": "0"}):
+            assert EmbeddingProvider._get_process_pool("all-MiniLM-L6-v2") is None
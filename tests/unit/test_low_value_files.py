@@ -0,0 +1,95 @@
+"""
+Tests for lockfile, minified and generated-file detection in document_loader.py
+"""
+import os
+
+from document_loader import (
+    GENERATED_CONTENT,
+    MINIFIED_CONTENT,
+    classify_low_value_content,
+    classify_low_value_name,
+)
+from report_utils import generate_extension_report
+
+MINIFIED_JS = b"!function(e){" + b"var a=1,b=2;e.x=function(t){return t*a+b};" * 200 + b"}(window);\n"
+READABLE_JS = b"".join(b"function handler%d(request) {\n  return process(request);\n}\n\n" % i for i in range(50))
+
+
+class TestClassifiers:
+    def test_names(self):
+        assert classify_low_value_name("package-lock.json") == "lockfile"
+        assert classify_low_value_name("Cargo.lock") == "lockfile"
+        assert classify_low_value_name("vendor.min.js") == "minified"
+        assert classify_low_value_name("service.pb.go") == "generated"
+        assert classify_low_value_name("model_pb2.py") == "generated"
+        assert classify_low_value_name("package.json") is None
+        assert classify_low_value_name("app.js") is None
+
+    def test_generated_header(self):
+        assert classify_low_value_content(".go", b"// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n") == GENERATED_CONTENT
+        assert classify_low_value_content(".ts", (
+            b"/* tslint:disable */\n/**\n * NOTE: This class is auto generated by OpenAPI Generator.\n"
+            b" * Do not edit the class manually.\n */\nexport class Api {}\n"
+        )) == GENERATED_CONTENT
+        assert classify_low_value_content(".py", (
+            b"# -*- coding: utf-8 -*-\n# Generated by the protocol buffer compiler.  DO NOT EDIT!\n"
+        )) == GENERATED_CONTENT
+        assert classify_low_value_content(".rs", b"\n// @generated by tooling\n") == GENERATED_CONTENT
+        assert classify_low_value_content(".js", READABLE_JS) is None
+
+    def test_mentions_outside_the_comment_header_are_kept(self):
+        docstring = b'"""\nHelpers for the auto-generated API clients.\nGenerated by protoc; do not edit them by hand.\n"""\nimport os\n'
+        assert classify_low_value_content(".py", docstring) is None
+        code_first = b"package api\n\n// Code generated by protoc-gen-go. DO NOT EDIT.\n"
+        assert classify_low_value_content(".go", code_first) is None
+
+    def test_non_canonical_markers_are_kept(self):
+        assert classify_low_value_content(".py", b"# Auto-generated clients live in api/\nimport os\n") is None
+        assert classify_low_value_content(".sh", b"#!/bin/sh\n# Do not edit without running the tests\nmake\n") is None
+
+    def test_prose_is_never_generated(self):
+        readme = b"<!-- do not edit this section: generated by the docs tool -->\n# Project\n"
+        assert classify_low_value_content(".md", readme) is None
+        assert classify_low_value_content("", b"# @generated\nNOTES\n") is None
+        assert classify_low_value_content(".txt", b"Do not edit this section, it is auto-generated.\n") is None
+
+    def test_marker_after_header_is_ignored(self):
+        body = READABLE_JS + b"// callers must not edit: generated by hand\n"
+        assert classify_low_value_content(".js", body) is None
+
+    def test_minified(self):
+        assert classify_low_value_content(".js", MINIFIED_JS) == MINIFIED_CONTENT
+        # Prose often keeps whole paragraphs on one line
+        assert classify_low_value_content(".md", b"A long paragraph. " * 200) is None
+
+
+class TestLoader:
+    def make_repo(self, root):
+        (root / "package-lock.json").write_text('{"lockfileVersion": 3}')
+        (root / "app.js").write_bytes(READABLE_JS)
+        (root / "bundle.js").write_bytes(MINIFIED_JS)
+        (root / "client.ts").write_text("// Code generated by openapi-generator. DO NOT EDIT.\nexport class Api {}\n")
+        (root / "api.pb.go").write_text("package api\n\nfunc Marshal() {}\n")
+
+    def test_low_value_files_are_skipped_and_counted(self, tmp_path, load_repo):
+        self.make_repo(tmp_path)
+
+        docs, _, discarded = load_repo(tmp_path)
+
+        assert [os.path.basename(d.metadata["source"]) for d in docs] == ["app.js"]
+        assert discarded == {"[lockfile]": 1, "[minified]": 1, "[generated]": 2}
+
+    def test_detection_can_be_disabled(self, tmp_path, load_repo):
+        self.make_repo(tmp_path)
+
+        docs, _, _ = load_repo(tmp_path, skip_low_value=False)
+
+        assert len(docs) == 5
+
+
+def test_report_lists_low_value_categories(capsys):
+    generate_extension_report({".js": 1}, {".png": 2, "[generated]": 7, "[lockfile]": 3})
+
+    output = capsys.readouterr().out
+    assert "Low-value (skipped):\n  generated: 7\n  lockfile: 3" in output
+    assert "[generated]" not in output
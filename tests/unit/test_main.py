@@ -221,7 +221,7 @@ class TestBatchProcessing:
              patch("main.load_documents_robustly") as mock_load, \
              patch("main.EmbeddingProvider.get_embeddings") as mock_embed, \
              patch("main.Chroma") as mock_chroma, \
-             patch("main.count_tokens") as mock_count:
+             patch("indexing_pipeline.count_tokens") as mock_count:
             
             # Setup mocks
             mock_exists.return_value = False
@@ -265,6 +265,30 @@ class TestBatchProcessing:
                 assert mock_chroma.called
 
 
+    def test_batch_writer_bulk_upserts(self, mock_env):
+        """Test the writer stores precomputed vectors with one upsert"""
+        from main import make_batch_writer
+        from langchain_core.documents import Document
+        
+        vectorstore = MagicMock()
+        write_batch = make_batch_writer(vectorstore)
+        chunks = [Document(page_content="a", metadata={"source": "a.py"}), Document(page_content="b")]
+        
+        assert write_batch(chunks, ["id1", "id2"], [[0.1], [0.2]]) == 2
+        kwargs = vectorstore._collection.upsert.call_args.kwargs
+        assert kwargs["ids"] == ["id1", "id2"]
+        assert kwargs["embeddings"] == [[0.1], [0.2]]
+        assert kwargs["metadatas"] == [{"source": "a.py"}, None]
+    
+    def test_batch_writer_failure_returns_zero(self, mock_env):
+        """Test a failed upsert is reported as nothing stored"""
+        from main import make_batch_writer
+        
+        vectorstore = MagicMock()
+        vectorstore._collection.upsert.side_effect = RuntimeError("locked")
+        assert make_batch_writer(vectorstore)([MagicMock()], ["id"], [[0.0]]) == 0
+
+
 class TestConfigurationValidation:
     """Tests for configuration validation"""
     
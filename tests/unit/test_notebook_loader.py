@@ -0,0 +1,90 @@
+"""
+Tests for Jupyter notebook loading in document_loader.py
+"""
+import json
+import os
+
+from document_loader import process_file
+
+PNG = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==" * 50
+
+
+def notebook(cells, language="python"):
+    return {
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {"language_info": {"name": language}},
+        "cells": cells,
+    }
+
+
+def write_notebook(path, content):
+    path.write_text(json.dumps(content))
+    return str(path)
+
+
+class TestNotebookCells:
+    def test_cells_become_documents_without_outputs(self, tmp_path):
+        path = write_notebook(tmp_path / "analysis.ipynb", notebook([
+            {"cell_type": "markdown", "metadata": {}, "source": ["# Churn analysis\n", "Load the data first."],
+             "attachments": {"plot.png": {"image/png": PNG}}},
+            {"cell_type": "code", "metadata": {}, "execution_count": 1, "source": "df = load('churn.csv')",
+             "outputs": [{"output_type": "display_data", "data": {"image/png": PNG, "text/plain": ["<Figure>"]}}]},
+            {"cell_type": "code", "metadata": {}, "source": [], "outputs": []},
+            {"cell_type": "raw", "metadata": {}, "source": "raw text"},
+            {"cell_type": "code", "metadata": {}, "source": "df.describe()", "outputs": []},
+        ]))
+
+        ext, docs, error = process_file(path, ".ipynb")
+
+        assert error is None
+        assert [d.page_content for d in docs] == [
+            "# Churn analysis\nLoad the data first.", "df = load('churn.csv')", "df.describe()"
+        ]
+        assert [d.metadata["cell_index"] for d in docs] == [0, 1, 4]
+        assert [d.metadata["cell_type"] for d in docs] == ["markdown", "code", "code"]
+        assert docs[1].metadata["language"] == "python"
+        assert "language" not in docs[0].metadata
+        assert all(PNG[:20] not in d.page_content for d in docs)
+
+    def test_inline_images_are_stripped(self, tmp_path):
+        path = write_notebook(tmp_path / "inline.ipynb", notebook([
+            {"cell_type": "markdown", "metadata": {}, "source": f"Result: ![plot](data:image/png;base64,{PNG}) done"},
+        ]))
+
+        _, docs, _ = process_file(path, ".ipynb")
+
+        assert docs[0].page_content == "Result: ![plot](data:,) done"
+
+    def test_nbformat3_worksheets(self, tmp_path):
+        path = write_notebook(tmp_path / "old.ipynb", {
+            "nbformat": 3,
+            "metadata": {},
+            "worksheets": [{"cells": [{"cell_type": "code", "input": ["x = 1\n", "y = 2"], "outputs": []}]}],
+        })
+
+        _, docs, _ = process_file(path, ".ipynb")
+
+        assert docs[0].page_content == "x = 1\ny = 2"
+
+    def test_invalid_notebook_reports_error(self, tmp_path):
+        path = tmp_path / "broken.ipynb"
+        path.write_text("{ not json")
+
+        _, docs, error = process_file(str(path), ".ipynb")
+
+        assert docs == []
+        assert "AVISO" in error
+
+
+def test_large_notebook_is_loaded(tmp_path, load_repo):
+    outputs = [{"output_type": "display_data", "data": {"image/png": "A" * (6 * 1024 * 1024)}}]
+    write_notebook(tmp_path / "heavy.ipynb", notebook([
+        {"cell_type": "code", "metadata": {}, "source": "plot(results)", "outputs": outputs},
+    ]))
+
+    docs, processed, _ = load_repo(tmp_path)
+
+    assert [d.page_content for d in docs] == ["plot(results)"]
+    assert processed[".ipynb"] == 1
+    assert os.path.getsize(tmp_path / "heavy.ipynb") > 5 * 1024 * 1024
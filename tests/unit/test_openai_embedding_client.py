@@ -0,0 +1,246 @@
+"""
+Tests for openai_embedding_client.py - Async OpenAI client against a local fake server
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from embedding_cache import get_embedding_model_id
+from openai_embedding_client import (
+    AdaptiveConcurrency,
+    AsyncOpenAIEmbeddings,
+    RateLimitBucket,
+    parse_reset_seconds,
+)
+
+
+class FakeOpenAI:
+    """State shared with the request handler: scripted 429s and observed concurrency"""
+
+    def __init__(self):
+        self.throttle_next = 0
+        self.fail_next = 0
+        self.delay = 0.0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.headers = {}
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                throttle = state.throttle_next > 0
+                fail = not throttle and state.fail_next > 0
+                state.throttle_next -= throttle
+                state.fail_next -= fail
+            try:
+                time.sleep(state.delay)
+                if throttle:
+                    self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                {"retry-after-ms": "50", "x-ratelimit-remaining-tokens": "0"})
+                    return
+                if fail:
+                    self._reply(500, {"error": {"message": "server error"}})
+                    return
+                data = [
+                    {"object": "embedding", "index": i, "embedding": [float(len(text)), float(i)]}
+                    for i, text in enumerate(payload["input"])
+                ]
+                self._reply(200, {
+                    "object": "list", "data": list(reversed(data)), "model": payload["model"],
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1}
+                }, state.headers)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+@pytest.fixture
+def fake_server():
+    state = FakeOpenAI()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(fake_server):
+    clients = []
+
+    def factory(**kwargs):
+        options = {"api_key": "test", "base_url": fake_server.base_url, "retry_delay": 0.01}
+        options.update(kwargs)
+        client = AsyncOpenAIEmbeddings(**options)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
+
+
+class TestParseResetSeconds:
+    def test_formats(self):
+        assert parse_reset_seconds("1s") == 1.0
+        assert parse_reset_seconds("6m0s") == 360.0
+        assert parse_reset_seconds("20ms") == 0.02
+        assert parse_reset_seconds("1h2m3.5s") == 3723.5
+        assert parse_reset_seconds("2") == 2.0
+
+    def test_invalid(self):
+        assert parse_reset_seconds(None) is None
+        assert parse_reset_seconds("soon") is None
+
+
+class TestRateLimitBucket:
+    def test_concurrent_acquire_never_overspends(self):
+        bucket = RateLimitBucket(tokens_per_minute=1000, requests_per_minute=10000)
+        granted = []
+
+        def worker():
+            for _ in range(50):
+                if bucket.try_acquire(10) == 0:
+                    granted.append(10)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Full bucket plus whatever refilled during the test (well under one minute)
+        assert 1000 <= sum(granted) < 1100
+
+    def test_wait_reflects_deficit(self):
+        bucket = RateLimitBucket(tokens_per_minute=600, requests_per_minute=100)
+        assert bucket.try_acquire(600) == 0
+        assert bucket.try_acquire(60) == pytest.approx(6, abs=0.1)
+
+    def test_headers_adopt_limits_and_clamp_remaining(self):
+        bucket = RateLimitBucket(tokens_per_minute=1000, requests_per_minute=100)
+        bucket.update_from_headers({
+            "x-ratelimit-limit-tokens": "5000000",
+            "x-ratelimit-remaining-tokens": "10",
+            "x-ratelimit-limit-requests": "5000",
+        })
+        assert bucket.tokens_per_minute == 5000000
+        assert bucket.requests_per_minute == 5000
+        assert bucket.try_acquire(100) > 0
+
+    def test_pause(self):
+        bucket = RateLimitBucket(tokens_per_minute=1000, requests_per_minute=100)
+        bucket.pause(5)
+        assert bucket.try_acquire(1) > 4
+
+
+class TestAdaptiveConcurrency:
+    def test_aimd(self):
+        concurrency = AdaptiveConcurrency(initial=4, maximum=8)
+        concurrency.on_throttle()
+        assert int(concurrency.limit) == 2
+        for _ in range(20):
+            concurrency.on_success()
+        assert concurrency.limit > 4
+        for _ in range(10):
+            concurrency.on_throttle()
+        assert concurrency.limit == 1
+
+
+class TestAsyncOpenAIEmbeddings:
+    def test_vectors_keep_input_order(self, fake_server, make_client):
+        client = make_client(request_size=3)
+        texts = ["a", "bb", "ccc", "dddd", "eeeee", "ffffff", "g"]
+
+        vectors = client.embed_documents(texts)
+
+        assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 1.0]
+        assert fake_server.requests == 3
+        assert client.embed_query("xyz")[0] == 3.0
+
+    def test_requests_run_concurrently_up_to_limit(self, fake_server, make_client):
+        fake_server.delay = 0.1
+        client = make_client(request_size=1, initial_concurrency=3, max_concurrency=3)
+
+        client.embed_documents([f"text {i}" for i in range(9)])
+
+        assert fake_server.max_in_flight == 3
+
+    def test_429_is_retried_and_halves_concurrency(self, fake_server, make_client):
+        fake_server.throttle_next = 1
+        client = make_client(initial_concurrency=4, max_concurrency=4)
+
+        vectors = client.embed_documents(["hello"])
+
+        assert vectors == [[5.0, 0.0]]
+        assert client.throttled == 1
+        assert client.retries == 1
+        assert client.concurrency.limit < 4
+
+    def test_server_errors_are_retried(self, fake_server, make_client):
+        fake_server.fail_next = 2
+        client = make_client(retry_attempts=2)
+
+        assert client.embed_documents(["hi"]) == [[2.0, 0.0]]
+        assert fake_server.requests == 3
+
+    def test_gives_up_after_retry_attempts(self, fake_server, make_client):
+        fake_server.fail_next = 5
+        client = make_client(retry_attempts=1)
+
+        with pytest.raises(Exception):
+            client.embed_documents(["hi"])
+        assert fake_server.requests == 2
+
+    def test_rate_limit_headers_update_bucket(self, fake_server, make_client):
+        fake_server.headers = {"x-ratelimit-limit-tokens": "1000000", "x-ratelimit-limit-requests": "500"}
+        client = make_client(tokens_per_minute=1000, requests_per_minute=10)
+
+        client.embed_documents(["hi"])
+
+        assert client.stats()["tokens_per_minute"] == 1000000
+        assert client.stats()["requests_per_minute"] == 500
+
+    def test_cache_id_matches_langchain_client(self, make_client):
+        client = make_client(model="text-embedding-3-small")
+        assert get_embedding_model_id(client) == "OpenAIEmbeddings:text-embedding-3-small:normalize=False"
+
+
+def test_provider_returns_async_client(monkeypatch):
+    from embedding_config import EmbeddingProvider
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_TPM_LIMIT", "12345")
+
+    embeddings = EmbeddingProvider.get_embeddings("openai")
+
+    assert isinstance(embeddings, AsyncOpenAIEmbeddings)
+    assert embeddings.bucket.tokens_per_minute == 12345
+    assert embeddings.retry_attempts == 3
@@ -0,0 +1,111 @@
+"""
+Tests for document_loader.PathFilter - include/exclude globs and directory pruning
+"""
+import os
+
+from document_loader import DEFAULT_EXCLUDE_GLOBS, PathFilter
+from report_utils import generate_extension_report
+
+
+def write(root, rel_path, content="print('some content here')\n"):
+    full_path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(content)
+
+
+def make_tree(root):
+    write(root, "src/app.js")
+    write(root, "src/app.min.js")
+    write(root, "node_modules/react/index.js")
+    write(root, "packages/ui/node_modules/lodash/lodash.js")
+    write(root, "dist/bundle.js")
+    write(root, "docs/generated/api.md")
+    write(root, "docs/guide.md")
+
+
+def relative_sources(root, docs):
+    return sorted(os.path.relpath(d.metadata["source"], root) for d in docs)
+
+
+class TestPathFilter:
+    def test_component_patterns_match_at_any_depth(self):
+        path_filter = PathFilter()
+        assert path_filter.prune_dir("node_modules")
+        assert path_filter.prune_dir("packages/ui/node_modules")
+        assert not path_filter.prune_dir("src")
+        assert path_filter.pruned_dirs == 2
+
+    def test_path_patterns_match_relative_path(self):
+        path_filter = PathFilter(exclude_globs=["docs/generated/*", "*.min.js"])
+        assert not path_filter.accept_file("docs/generated/api.md")
+        assert not path_filter.accept_file("src/app.min.js")
+        assert path_filter.accept_file("docs/guide.md")
+        assert path_filter.pruned_files == 2
+
+    def test_include_restricts_and_exclude_wins(self):
+        path_filter = PathFilter(include_globs=["src/*"], exclude_globs=["*.min.js"])
+        assert path_filter.accept_file("src/app.js")
+        assert not path_filter.accept_file("src/app.min.js")
+        assert not path_filter.accept_file("README.md")
+
+    def test_empty_exclude_disables_defaults(self):
+        assert PathFilter().exclude_globs == DEFAULT_EXCLUDE_GLOBS
+        assert not PathFilter(exclude_globs=[]).prune_dir("node_modules")
+
+
+class TestLoaderPruning:
+    # Minified files are kept (skip_low_value=False) so only the globs decide what is skipped
+
+    def test_walk_prunes_default_directories(self, tmp_path, load_repo):
+        make_tree(tmp_path)
+
+        docs, _, discarded = load_repo(tmp_path, skip_low_value=False)
+        sources = relative_sources(tmp_path, docs)
+
+        assert sources == ["docs/generated/api.md", "docs/guide.md", "src/app.js", "src/app.min.js"]
+        # node_modules (twice) and dist are never descended into
+        assert discarded["[pruned_dirs]"] == 3
+        assert "[pruned]" not in discarded
+
+    def test_custom_globs(self, tmp_path, load_repo):
+        make_tree(tmp_path)
+
+        docs, _, discarded = load_repo(
+            tmp_path, skip_low_value=False,
+            include_globs=["*.js", "*.md"], exclude_globs=["node_modules", "docs/generated/*", "*.min.js"]
+        )
+        sources = relative_sources(tmp_path, docs)
+
+        assert sources == ["dist/bundle.js", "docs/guide.md", "src/app.js"]
+        assert discarded["[pruned]"] == 2
+
+    def test_git_enumeration_counts_pruned_files(self, tmp_path, git, load_repo):
+        make_tree(tmp_path)
+        git(tmp_path, "init", "-q")
+
+        docs, _, discarded = load_repo(tmp_path, skip_low_value=False)
+        sources = relative_sources(tmp_path, docs)
+
+        assert sources == ["docs/generated/api.md", "docs/guide.md", "src/app.js", "src/app.min.js"]
+        assert discarded["[pruned]"] == 3
+
+    def test_incremental_paths_are_filtered(self, tmp_path, load_repo):
+        make_tree(tmp_path)
+
+        docs, _, discarded = load_repo(
+            tmp_path, skip_low_value=False, file_paths=["src/app.js", "node_modules/react/index.js"]
+        )
+        sources = relative_sources(tmp_path, docs)
+
+        assert sources == ["src/app.js"]
+        assert discarded["[pruned]"] == 1
+
+
+def test_report_lists_pruned_counts(capsys):
+    generate_extension_report({".js": 2}, {".png": 1, "[pruned]": 40, "[pruned_dirs]": 3})
+
+    output = capsys.readouterr().out
+    assert "Pruned (include/exclude globs):\n  files: 40\n  directories: 3" in output
+    assert ".png: 1" in output
+    assert "[pruned]" not in output
@@ -0,0 +1,179 @@
+"""
+Tests for progressive serving (queries answered while indexing continues)
+"""
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+@pytest.fixture
+def reset_progress():
+    """Restores the global readiness state after each test"""
+    saved = (main.server_ready, main.retriever, dict(main.index_progress))
+    main.server_ready = False
+    main.index_progress.update({"partial": False, "files_total": 0, "files_indexed": 0, "error": None, "incomplete": False})
+    yield
+    main.server_ready, main.retriever = saved[0], saved[1]
+    main.index_progress.clear()
+    main.index_progress.update(saved[2])
+
+
+class TestIndexedFraction:
+    def test_complete_index(self, reset_progress):
+        assert main.get_indexed_fraction() == 1.0
+
+    def test_partial_index(self, reset_progress):
+        main.index_progress.update({"partial": True, "files_total": 8, "files_indexed": 2})
+        assert main.get_indexed_fraction() == 0.25
+
+    def test_partial_unknown_total(self, reset_progress):
+        main.index_progress.update({"partial": True, "files_total": 0})
+        assert main.get_indexed_fraction() == 0.0
+
+
+class TestPartialServing:
+    def test_enable_partial_serving(self, reset_progress):
+        vectorstore = MagicMock()
+        main.enable_partial_serving(vectorstore)
+
+        assert main.server_ready is True
+        assert main.index_progress["partial"] is True
+        assert main.retriever is vectorstore.as_retriever.return_value
+
+    def test_enable_is_noop_when_ready(self, reset_progress):
+        main.server_ready = True
+        vectorstore = MagicMock()
+        main.enable_partial_serving(vectorstore)
+        vectorstore.as_retriever.assert_not_called()
+
+    def test_retrieve_flags_partial_results(self, reset_progress):
+        doc = MagicMock()
+        doc.metadata = {"source": "a.py"}
+        doc.page_content = "content"
+        vectorstore = MagicMock()
+        vectorstore.as_retriever.return_value.invoke.return_value = [doc]
+        vectorstore.as_retriever.return_value.search_kwargs = {}
+        main.index_progress.update({"files_total": 4, "files_indexed": 1})
+        main.enable_partial_serving(vectorstore)
+
+        response = TestClient(app).post("/retrieve", json={"query": "test query", "top_k": 3})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["partial"] is True
+        assert data["indexed_fraction"] == 0.25
+
+    def test_health_reports_partial(self, reset_progress):
+        main.index_progress.update({"files_total": 2, "files_indexed": 1})
+        main.enable_partial_serving(MagicMock())
+
+        data = TestClient(app).get("/health").json()
+
+        assert data["ready"] is True
+        assert data["partial"] is True
+        assert data["indexed_fraction"] == 0.5
+
+    def test_build_index_opens_after_threshold(self, reset_progress, tmp_path):
+        def fake_index_documents(vectorstore, documents, on_files_complete=None, on_batch_stored=None):
+            for n in (1, 2):
+                on_batch_stored({"batches_stored": n, "files_completed": n})
+                if n == 1:
+                    assert main.server_ready is False
+            return {"documents": 2, "chunks": 2, "tokens": 2, "failed_batches": 0, "chunks_failed": 0}
+
+        # tmp DB path: the autouse fixture only patches the module currently in sys.modules
+        with patch.object(main, "PROGRESSIVE_SERVING_BATCHES", 2), \
+             patch.object(main, "DB_PATH", str(tmp_path / "db")), \
+             patch.object(main, "get_head_commit", return_value="a" * 40), \
+             patch.object(main, "load_documents_robustly", return_value=[]), \
+             patch.object(main, "index_documents", side_effect=fake_index_documents):
+            main.build_index(MagicMock(), "master")
+
+        assert main.server_ready is True
+        assert main.index_progress["files_indexed"] == 2
+
+
+class TestBackgroundFailure:
+    def _fail_after_partial_serving(self):
+        def failing_index_repository():
+            main.index_progress.update({"files_total": 4, "files_indexed": 1})
+            main.enable_partial_serving(MagicMock())
+            raise RuntimeError("disk full")
+
+        with patch.object(main, "index_repository", side_effect=failing_index_repository):
+            main.run_background_indexing()
+
+    def test_failure_is_reported(self, reset_progress):
+        self._fail_after_partial_serving()
+
+        assert main.index_progress["partial"] is False
+        data = TestClient(app).get("/health").json()
+        assert data["status"] == "error"
+        assert data["error"] == "disk full"
+        assert data["indexed_fraction"] == 0.25
+        assert "disk full" in TestClient(app).get("/").json()["status"]
+
+    def test_refresh_retries_the_build(self, reset_progress, monkeypatch):
+        monkeypatch.delenv("API_KEY", raising=False)
+        self._fail_after_partial_serving()
+
+        def finish_build():
+            main.index_progress.update({"partial": False, "error": None})
+
+        with patch.object(main, "index_repository", side_effect=finish_build) as mock_index, \
+             patch.object(main, "refresh_index") as mock_refresh:
+            response = TestClient(app).post("/refresh")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "rebuilt"
+        mock_index.assert_called_once()
+        mock_refresh.assert_not_called()
+        assert TestClient(app).get("/health").json()["status"] == "healthy"
+
+    def test_failed_retry_keeps_the_error(self, reset_progress, monkeypatch):
+        monkeypatch.delenv("API_KEY", raising=False)
+        main.index_progress["error"] = "disk full"
+
+        with patch.object(main, "index_repository", side_effect=RuntimeError("still full")):
+            response = TestClient(app).post("/refresh")
+
+        assert response.status_code == 500
+        assert main.index_progress["error"] == "still full"
+
+
+class TestIncompleteBuild:
+    def _finish_with_failed_batches(self):
+        manifest = main.BuildManifest(main.DB_PATH)
+        manifest.start("a" * 40, "master")
+        manifest.update(failed_batches=1, chunks_failed=5)
+        main.index_progress.update({"files_total": 4, "files_indexed": 3})
+        main.server_ready = True
+        main.sync_index_completeness()
+
+    def test_failed_batches_keep_index_partial(self, reset_progress):
+        self._finish_with_failed_batches()
+
+        data = TestClient(app).get("/health").json()
+        assert data["status"] == "incomplete"
+        assert data["partial"] is True
+        assert data["indexed_fraction"] == 0.75
+
+    def test_refresh_completing_the_build_clears_it(self, reset_progress, monkeypatch):
+        monkeypatch.delenv("API_KEY", raising=False)
+        self._finish_with_failed_batches()
+
+        def resume(vectorstore):
+            main.BuildManifest(main.DB_PATH).complete("b" * 40, "master")
+            return {"status": "resumed"}
+
+        with patch.object(main, "refresh_index", side_effect=resume):
+            assert TestClient(app).post("/refresh").status_code == 200
+
+        data = TestClient(app).get("/health").json()
+        assert data["status"] == "healthy"
+        assert data["partial"] is False
+        assert main.get_indexed_fraction() == 1.0
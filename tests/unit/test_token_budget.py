@@ -0,0 +1,127 @@
+"""
+Tests for token-budgeted chunking (token_utils.TokenBudget, chunking.BudgetedLength)
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+
+from chunking import BudgetedLength, LanguageAwareSplitter
+from indexing_pipeline import IndexingPipeline
+from token_utils import OPENAI_EMBEDDING_MAX_TOKENS, TokenBudget, get_token_budget
+
+
+class WordTokenizer:
+    """HuggingFace-style tokenizer stand-in: one token per whitespace-separated word"""
+
+    def encode(self, text, add_special_tokens=True, verbose=True):
+        return text.split() + (["[CLS]", "[SEP]"] if add_special_tokens else [])
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+def word_budget(max_tokens):
+    return TokenBudget(WordTokenizer(), max_tokens, "words")
+
+
+class TestGetTokenBudget:
+    def test_sentence_transformers_client(self):
+        client = SimpleNamespace(tokenizer=WordTokenizer(), max_seq_length=256)
+        embeddings = SimpleNamespace(client=client, model_name="all-MiniLM-L6-v2")
+
+        budget = get_token_budget(embeddings, "sentence-transformers")
+
+        assert budget.max_tokens == 254
+        assert budget.name == "all-MiniLM-L6-v2"
+        assert budget.count("def f(): return 1") == 4
+
+    def test_process_pool_and_cache_wrapper(self):
+        pool = SimpleNamespace(tokenizer_info=lambda: (WordTokenizer(), 128), model_name="m")
+        cached = SimpleNamespace(embeddings=pool, cache=object())
+
+        assert get_token_budget(cached, "huggingface", max_tokens=64).max_tokens == 64
+        assert get_token_budget(cached, "huggingface", max_tokens=500).max_tokens == 126
+
+    def test_unknown_model(self):
+        assert get_token_budget(SimpleNamespace(), "sentence-transformers") is None
+
+    def test_openai_limit(self):
+        encoding = MagicMock()
+        with patch("token_utils.tiktoken.encoding_for_model", return_value=encoding) as mock_encoding:
+            budget = get_token_budget(SimpleNamespace(model="text-embedding-3-small"), "openai")
+
+        mock_encoding.assert_called_once_with("text-embedding-3-small")
+        assert budget.max_tokens == OPENAI_EMBEDDING_MAX_TOKENS
+        assert budget.tokenizer is encoding
+
+
+class TestBudgetedLength:
+    def test_characters_or_scaled_tokens(self):
+        length = BudgetedLength(chunk_size=100, token_budget=word_budget(10))
+
+        # 5 tokens of 10 -> 50, fewer than the 58 characters
+        assert length("a" * 50 + " b c d e") == 58
+        # 20 one-letter tokens -> 200, well over the 39 characters
+        assert length(" ".join("x" * 20)) == 200
+        assert length("") == 0
+
+    def test_dense_text_is_split_by_tokens(self):
+        text = " ".join(f"t{i}" for i in range(100))
+        doc = Document(page_content=text, metadata={"source": "notes.txt"})
+
+        plain = LanguageAwareSplitter(chunk_size=1500, chunk_overlap=0).split_documents([doc])
+        budgeted = LanguageAwareSplitter(chunk_size=1500, chunk_overlap=0, token_budget=word_budget(30)).split_documents([doc])
+
+        assert len(plain) == 1
+        assert len(budgeted) >= 4
+        assert all(len(c.page_content.split()) <= 30 for c in budgeted)
+
+    def test_python_ast_chunks_respect_budget(self):
+        body = "".join(f"    a{i} = b{i} + c{i}\n" for i in range(30))
+        doc = Document(page_content=f"def f():\n{body}", metadata={"source": "a.py"})
+
+        chunks = LanguageAwareSplitter(token_budget=word_budget(40)).split_documents([doc])
+
+        assert len(chunks) > 1
+        assert all(c.metadata["symbol"] == "f" for c in chunks)
+        assert all(len(c.page_content.split()) <= 40 for c in chunks)
+
+    def test_python_ast_tokenizes_each_line_once(self):
+        tokenized = []
+
+        class CountingTokenizer(WordTokenizer):
+            def encode(self, text, add_special_tokens=True, verbose=True):
+                tokenized.append(len(text))
+                return super().encode(text, add_special_tokens, verbose)
+
+        body = "".join(f"    a{i} = b{i} + c{i}\n" for i in range(500))
+        source = f"def f():\n{body}"
+        budget = TokenBudget(CountingTokenizer(), 40, "words")
+
+        chunks = LanguageAwareSplitter(token_budget=budget).split_documents([Document(page_content=source, metadata={"source": "a.py"})])
+
+        assert len(chunks) > 50
+        # Every line once, then every chunk once when it is checked
+        assert sum(tokenized) <= 2 * len(source)
+
+
+def test_pipeline_counts_truncated_chunks():
+    docs = [
+        Document(page_content="short text", metadata={"source": "a.md"}),
+        Document(page_content="word " * 50, metadata={"source": "b.md"}),
+    ]
+    pipeline = IndexingPipeline(
+        # Character sizing only: the long chunk stays whole
+        text_splitter=LanguageAwareSplitter(chunk_size=1000, chunk_overlap=0),
+        embed_batch=lambda batch, batch_num: [[0.0] for _ in batch],
+        write_batch=lambda chunks, ids, vectors: len(chunks),
+        batch_size=4,
+        max_workers=1,
+        token_budget=word_budget(10)
+    )
+
+    stats = pipeline.run(iter(docs))
+
+    assert stats["chunks"] == 2
+    assert stats["truncated_chunks"] == 1
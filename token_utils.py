@@ -2,6 +2,9 @@ import tiktoken
 import os
 from typing import Optional
 
+# Input limit of the OpenAI embedding models (ada-002 and text-embedding-3-*), in tiktoken tokens
+OPENAI_EMBEDDING_MAX_TOKENS = 8191
+
 def count_tokens_local(text: str) -> int:
     """
     Fast token counting using character-based approximation
@@ -75,4 +78,68 @@ def estimate_embedding_cost(total_tokens: int, provider: str = "openai") -> dict
             "cost_usd": 0.0,
             "cost_brl": 0.0,
             "note": "Local embedding - no costs"
-        }
\ No newline at end of file
+        }
+
+class TokenBudget:
+    """Counts tokens the way the embedding model does and knows how many it reads"""
+
+    def __init__(self, tokenizer, max_tokens: int, name: str = ""):
+        """
+        Args:
+            tokenizer: HuggingFace tokenizer or tiktoken encoding of the model
+            max_tokens: Tokens the model embeds before truncating (special tokens excluded)
+            name: Model name, for reports
+        """
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.name = name
+
+    def count(self, text: str) -> int:
+        if isinstance(self.tokenizer, tiktoken.Encoding):
+            return len(self.tokenizer.encode(text, disallowed_special=()))
+        return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+    def is_truncated(self, text: str) -> bool:
+        return self.count(text) > self.max_tokens
+
+
+def get_token_budget(embeddings, provider: str, max_tokens: Optional[int] = None) -> Optional[TokenBudget]:
+    """
+    Token budget of the model behind an embeddings instance
+
+    sentence-transformers/huggingface: the model's tokenizer and max_seq_length
+    (read from a worker when embeddings run in a process pool). OpenAI: the
+    model's tiktoken encoding and its 8191-token input limit.
+
+    Args:
+        embeddings: Embeddings instance (CachedEmbeddings is unwrapped)
+        provider: EMBEDDING_PROVIDER value
+        max_tokens: Optional lower cap on the model limit
+
+    Returns:
+        TokenBudget, or None when the model's tokenizer cannot be determined
+    """
+    # CachedEmbeddings wraps the model's embeddings
+    embeddings = getattr(embeddings, "embeddings", embeddings)
+    if provider == "openai":
+        model = getattr(embeddings, "model", None)
+        model = model if isinstance(model, str) else "text-embedding-ada-002"
+        try:
+            tokenizer = tiktoken.encoding_for_model(model)
+        except Exception:
+            tokenizer = tiktoken.get_encoding("cl100k_base")
+        limit = OPENAI_EMBEDDING_MAX_TOKENS
+    else:
+        model = getattr(embeddings, "model_name", "")
+        if hasattr(embeddings, "tokenizer_info"):
+            tokenizer, limit = embeddings.tokenizer_info()
+        else:
+            client = getattr(embeddings, "client", None) or getattr(embeddings, "_client", None)
+            tokenizer, limit = getattr(client, "tokenizer", None), getattr(client, "max_seq_length", None)
+        if tokenizer is None or not isinstance(limit, int):
+            return None
+        # [CLS]/[SEP] and the like count against max_seq_length
+        limit -= tokenizer.num_special_tokens_to_add(pair=False)
+    if max_tokens:
+        limit = min(limit, max_tokens)
+    return TokenBudget(tokenizer, limit, model)